@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from mysite.static_files import ASGIStaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+# Enables the in-process connection pool by default (DB_POOL overrides it)
+os.environ['DJANGO_ASGI'] = '1'
 
-application = get_asgi_application()
+# Static files are served before reaching Django's middleware chain
+application = ASGIStaticFiles(get_asgi_application())
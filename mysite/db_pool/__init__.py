@@ -0,0 +1,190 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Pool de conexiones a la base de datos dentro del propio proceso.
+# Django abre una conexión por hilo y, con CONN_MAX_AGE, solo la reutiliza ese hilo. Con ASGI cada petición
+# puede ir en un contexto distinto, así que las conexiones persistentes no se reutilizan y cada petición paga
+# un nuevo saludo TCP + TLS. Los motores de este paquete (mysite.db_pool.mysql y mysite.db_pool.sqlite3)
+# sacan las conexiones de un pool por proceso, y "cerrar" una conexión la devuelve al pool.
+# La configuración se lee de la clave POOL de la base de datos:
+#     'POOL': {'SIZE': 10, 'MAX_LIFETIME': 300, 'TIMEOUT': 5}
+
+# Pools por (alias, pid), para que un worker creado con fork nunca use las conexiones de su padre
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    # No ha quedado ninguna conexión libre antes de TIMEOUT
+    pass
+
+
+class ConnectionPool:
+    # Clase que guarda las conexiones libres de una base de datos y limita cuántas hay abiertas
+    def __init__(self, factory, size=10, max_lifetime=300, timeout=5):
+        self.factory = factory
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.condition = threading.Condition()
+        self.idle = deque()
+        self.born = {}
+        self.in_use = 0
+        self.stats = {
+            'created': 0, 'reused': 0, 'closed': 0, 'expired': 0,
+            'waits': 0, 'wait_ms_total': 0.0, 'wait_ms_max': 0.0, 'timeouts': 0,
+        }
+
+    def expired(self, conn):
+        return self.max_lifetime is not None and time.monotonic() - self.born[id(conn)] >= self.max_lifetime
+
+    def acquire(self, is_usable=None):
+        # Damos una conexión libre, abrimos otra si hay sitio o esperamos hasta TIMEOUT
+        start = time.monotonic()
+        waited = False
+        with self.condition:
+            while True:
+                while self.idle:
+                    conn = self.idle.pop()
+                    if self.expired(conn):
+                        self.stats['expired'] += 1
+                        self._close(conn)
+                        continue
+                    if is_usable is not None and not is_usable(conn):
+                        self._close(conn)
+                        continue
+                    self.in_use += 1
+                    self.stats['reused'] += 1
+                    self._record_wait(start, waited)
+                    return conn
+                if self.in_use < self.size:
+                    # Reservamos el hueco y conectamos fuera del cerrojo
+                    self.in_use += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(f"No hay ninguna conexión libre tras {self.timeout} s")
+                waited = True
+                self.condition.wait(remaining)
+            self._record_wait(start, waited)
+
+        try:
+            conn = self.factory()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.born[id(conn)] = time.monotonic()
+            self.stats['created'] += 1
+        return conn
+
+    def release(self, conn):
+        # Vuelve a las libres salvo que haya superado MAX_LIFETIME
+        with self.condition:
+            self.in_use -= 1
+            if self.expired(conn):
+                self.stats['expired'] += 1
+                self._close(conn)
+            else:
+                self.idle.append(conn)
+            self.condition.notify()
+
+    def discard(self, conn):
+        # Para las conexiones rotas o que se han quedado dentro de una transacción
+        with self.condition:
+            self.in_use -= 1
+            self._close(conn)
+            self.condition.notify()
+
+    def _close(self, conn):
+        self.born.pop(id(conn), None)
+        self.stats['closed'] += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _record_wait(self, start, waited):
+        if waited:
+            elapsed = (time.monotonic() - start) * 1000
+            self.stats['waits'] += 1
+            self.stats['wait_ms_total'] += elapsed
+            self.stats['wait_ms_max'] = max(self.stats['wait_ms_max'], elapsed)
+
+    def snapshot(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'max_lifetime': self.max_lifetime,
+                'timeout': self.timeout,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                **{key: round(value, 3) if isinstance(value, float) else value for key, value in self.stats.items()},
+            }
+
+    def close_all(self):
+        with self.condition:
+            while self.idle:
+                self._close(self.idle.pop())
+
+
+def get_pool(alias, settings_dict, factory):
+    key = (alias, os.getpid())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = settings_dict.get('POOL', {})
+            pool = _pools[key] = ConnectionPool(
+                factory,
+                size=options.get('SIZE', 10),
+                max_lifetime=options.get('MAX_LIFETIME', 300),
+                timeout=options.get('TIMEOUT', 5),
+            )
+        return pool
+
+
+def find_pool(alias):
+    # El pool de este proceso para alias, sin crearlo si no existe
+    with _pools_lock:
+        return _pools.get((alias, os.getpid()))
+
+
+def pool_stats():
+    # Estado de todos los pools de este proceso, para el endpoint de métricas
+    with _pools_lock:
+        pools = {alias: pool for (alias, pid), pool in _pools.items() if pid == os.getpid()}
+    return {alias: pool.snapshot() for alias, pool in pools.items()}
+
+
+class PooledDatabaseWrapperMixin:
+    # Se mezcla con el DatabaseWrapper de cada motor. Con CONN_MAX_AGE = 0 cada petición "cierra" su conexión
+    # al terminar, y así vuelve al pool
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict, lambda: super(PooledDatabaseWrapperMixin, self).get_new_connection(conn_params))
+        is_usable = self.raw_connection_is_usable if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        return pool.acquire(is_usable)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = find_pool(self.alias)
+        if pool is None:
+            # No es de un pool de este proceso (por ejemplo, se abrió antes de un fork): solo la cerramos
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        elif self.in_atomic_block or self.errors_occurred or not self.get_autocommit():
+            # Nunca devolvemos una conexión con una transacción abierta o con errores recientes
+            pool.discard(self.connection)
+        else:
+            pool.release(self.connection)
+
+    def raw_connection_is_usable(self, conn):
+        return True
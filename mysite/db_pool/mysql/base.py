@@ -0,0 +1,13 @@
+from django.db.backends.mysql import base
+
+from mysite.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def raw_connection_is_usable(self, conn):
+        # Comprobamos que la conexión sigue viva al sacarla del pool
+        try:
+            conn.ping()
+        except base.Database.Error:
+            return False
+        return True
@@ -0,0 +1,8 @@
+from django.db.backends.sqlite3 import base
+
+from mysite.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    # Sustituto local del motor MySQL con pool, para las pruebas y los benchmarks
+    pass
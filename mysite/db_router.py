@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Router de réplicas de lectura. Las lecturas van a una de las réplicas de DATABASE_REPLICAS y las
+# escrituras siempre a default. Una petición lee de la principal si:
+# - escribe (POST, PUT, PATCH, DELETE), para que lo que lee antes de guardar sean las filas que va a cambiar;
+# - el mismo navegador ha escrito hace menos de DB_REPLICA_STICKY_SECONDS (cookie que pone
+#   PrimaryStickinessMiddleware), para que cada usuario vea sus propios cambios aunque las réplicas vayan
+#   algo por detrás;
+# - está dentro de una transacción en la principal.
+# Cada réplica se comprueba como mucho cada DB_REPLICA_CHECK_INTERVAL segundos. Si falla o va más de
+# DB_REPLICA_MAX_LAG segundos por detrás se deja de usar hasta la siguiente comprobación, y sin réplicas
+# sanas se lee de la principal.
+
+STICKY_COOKIE = 'db_primary'
+UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+# True mientras la petición en curso tenga que leer de la principal
+_pinned = ContextVar('db_pinned', default=False)
+
+# {alias: (cuándo se comprobó, si está sana)}, por proceso
+_health = {}
+_health_lock = threading.Lock()
+
+
+def pin_primary():
+    # Devuelve el token para unpin_primary
+    return _pinned.set(True)
+
+
+def unpin_primary(token):
+    _pinned.reset(token)
+
+
+def replica_lag(alias):
+    # Segundos que la réplica va por detrás de la principal; 0 si el motor no lo dice
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'mysql':
+            cursor.execute('SELECT 1')
+            return 0
+        cursor.execute('SHOW REPLICA STATUS')
+        row = cursor.fetchone()
+        if row is None:
+            return 0
+        columns = [column[0] for column in cursor.description]
+        lag = dict(zip(columns, row)).get('Seconds_Behind_Source')
+    # NULL: la replicación está parada
+    return float('inf') if lag is None else lag
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, True))
+    if checked_at is not None and now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+        return healthy
+    with _health_lock:
+        checked_at, healthy = _health.get(alias, (None, True))
+        if checked_at is not None and now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+            return healthy
+        try:
+            healthy = replica_lag(alias) <= settings.DB_REPLICA_MAX_LAG
+        except Exception:
+            healthy = False
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def healthy_replicas():
+    return [alias for alias in settings.DATABASE_REPLICAS if is_healthy(alias)]
+
+
+class ReplicaRouter:
+    # Router que reparte las lecturas entre las réplicas sanas
+    def db_for_read(self, model, **hints):
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = healthy_replicas()
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases de datos tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por la replicación
+        return db not in settings.DATABASE_REPLICAS
+
+
+class PrimaryStickinessMiddleware:
+    # Middleware que manda a la principal las escrituras y las lecturas poco después de la última escritura
+    # del navegador. Admite el modo asíncrono para que con ASGI las vistas no pasen a un hilo; la marca es una
+    # variable de contexto, así que sigue a la petición dentro de sync_to_async
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_pin(request):
+            return self.get_response(request)
+
+        token = pin_primary()
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin_primary(token)
+        return self.process_response(request, response)
+
+    async def __acall__(self, request):
+        if not self.should_pin(request):
+            return await self.get_response(request)
+
+        token = pin_primary()
+        try:
+            response = await self.get_response(request)
+        finally:
+            unpin_primary(token)
+        return self.process_response(request, response)
+
+    def should_pin(self, request):
+        write = request.method in UNSAFE_METHODS
+        return bool(settings.DATABASE_REPLICAS) and (write or bool(request.COOKIES.get(STICKY_COOKIE)))
+
+    def process_response(self, request, response):
+        if request.method in UNSAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, '1', max_age=settings.DB_REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -43,16 +43,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'taskmaster.instrumentation.InstrumentationMiddleware',
+    'mysite.db_router.PrimaryStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'taskmaster.history.HistoryMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# WhiteNoiseMiddleware is sync-only and would make Django run the whole chain in a thread.
+# Under mysite.asgi static files are served before Django instead (see mysite/static_files.py)
+if os.environ.get('DJANGO_ASGI') == '1':
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
@@ -76,23 +84,97 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Pooled drop-in replacements for the engines we use (see mysite/db_pool)
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'mysite.db_pool.mysql',
+    'django.db.backends.sqlite3': 'mysite.db_pool.sqlite3',
+}
+
+# The in-process pool is on by default when served through mysite.asgi
+DB_POOL = config('DB_POOL', default=os.environ.get('DJANGO_ASGI') == '1', cast=bool)
+DB_ENGINE = config('DB_ENGINE')
+
 DATABASES = {
     'default': {
-        'ENGINE': config('DB_ENGINE'),
+        'ENGINE': POOLED_ENGINES.get(DB_ENGINE, DB_ENGINE) if DB_POOL else DB_ENGINE,
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
+        # Persistent connections avoid a TCP + TLS handshake per request. With the pool,
+        # connections go back to the pool at the end of each request instead.
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'POOL': {
+            'SIZE': config('DB_POOL_SIZE', default=10, cast=int),
+            'MAX_LIFETIME': config('DB_POOL_MAX_LIFETIME', default=300, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=5, cast=float),
+        },
+        # TLS to the managed MySQL server; other backends (SQLite in development) reject these options
         'OPTIONS': {
             'ssl': {
                 'ca': os.path.join(BASE_DIR, 'ca.pem'),
             },
             'ssl_mode': 'REQUIRED',
-        }
+        } if DB_ENGINE.endswith('mysql') else {},
     }
 }
 
+# Read replicas: comma-separated hosts (database files with SQLite) that reuse the rest of the
+# default settings. Reads go to a healthy replica and writes to default (see mysite/db_router.py)
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DB_REPLICAS', default='', cast=Csv()), 1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        ('NAME' if DB_ENGINE.endswith('sqlite3') else 'HOST'): replica,
+        # Tests read the replicas through the default connection
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['mysite.db_router.ReplicaRouter']
+
+# Seconds a browser keeps reading from the primary after one of its writes
+DB_REPLICA_STICKY_SECONDS = config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int)
+
+# Replicas further behind than this many seconds (or failing the probe) are skipped
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=5, cast=float)
+
+# Seconds between health and lag probes of each replica
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=5, cast=float)
+
+
+# Serve the project list, project detail and task status views with their async versions.
+# On by default when served through mysite.asgi; under WSGI every async view would run in its own event loop
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=os.environ.get('DJANGO_ASGI') == '1', cast=bool)
+
+
+# Task events (Server-Sent Events, ASGI only). The in-memory broker only reaches clients
+# connected to the same process; point EVENTS_BROKER to a shared broker when running several workers
+EVENTS_BROKER = config('EVENTS_BROKER', default='taskmaster.events.InMemoryBroker')
+
+# Seconds between keep-alive comments on idle event streams
+EVENTS_HEARTBEAT = config('EVENTS_HEARTBEAT', default=15, cast=float)
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='taskmaster'),
+    }
+}
+
+# Seconds a user's accessible project ids stay cached
+MEMBERSHIP_CACHE_TIMEOUT = config('MEMBERSHIP_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a rendered project card or task article stays cached
+FRAGMENT_CACHE_TIMEOUT = config('FRAGMENT_CACHE_TIMEOUT', default=3600, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -135,3 +217,74 @@ LOGIN_REDIRECT_URL = '/projects/'
 LOGOUT_REDIRECT_URL = '/login/'
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Task list pagination
+
+TASKS_PAGE_SIZE = config('TASKS_PAGE_SIZE', default=50, cast=int)
+TASKS_MAX_PAGE_SIZE = config('TASKS_MAX_PAGE_SIZE', default=200, cast=int)
+
+# Rows fetched per round trip when streaming task exports
+
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Search: 'fulltext' (MySQL FULLTEXT indexes), 'index' (the SearchTerm table kept on save)
+# or 'auto' to pick fulltext on MySQL and index elsewhere
+
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='auto')
+SEARCH_PAGE_SIZE = config('SEARCH_PAGE_SIZE', default=20, cast=int)
+
+# Maximum results returned by the form autocomplete endpoint
+
+AUTOCOMPLETE_LIMIT = config('AUTOCOMPLETE_LIMIT', default=10, cast=int)
+
+# In-process background jobs (project deletion, board rebalancing): worker threads per process,
+# 0 runs them inline
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=1, cast=int)
+
+# Tasks shown per column of the kanban board
+
+BOARD_COLUMN_SIZE = config('BOARD_COLUMN_SIZE', default=200, cast=int)
+
+# Rows per DELETE statement when deleting a project in the background
+DELETION_BATCH_SIZE = config('DELETION_BATCH_SIZE', default=1000, cast=int)
+
+# Entries per page of the task and project change history
+
+HISTORY_PAGE_SIZE = config('HISTORY_PAGE_SIZE', default=50, cast=int)
+
+# Rows shown in each table of the reports dashboard
+
+REPORTS_ROWS = config('REPORTS_ROWS', default=50, cast=int)
+
+# Admin changelists: rows counted at most when filtering (larger tables use MySQL's estimate
+# when unfiltered) and matches kept per admin search
+
+ADMIN_COUNT_LIMIT = config('ADMIN_COUNT_LIMIT', default=10000, cast=int)
+ADMIN_SEARCH_LIMIT = config('ADMIN_SEARCH_LIMIT', default=1000, cast=int)
+
+# Rows validated and inserted per transaction when importing tasks
+
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', default=1000, cast=int)
+
+
+# Instrumentation (per-view query count, DB time, template time and saves)
+
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=False, cast=bool)
+INSTRUMENTATION_SAMPLE_RATE = config('INSTRUMENTATION_SAMPLE_RATE', default=0.1, cast=float)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'taskmaster.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
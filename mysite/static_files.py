@@ -0,0 +1,55 @@
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+# Con ASGI los ficheros estáticos se sirven aquí, antes de llegar a Django. WhiteNoiseMiddleware es solo
+# síncrono: dentro de MIDDLEWARE obligaría a Django a ejecutar en un hilo toda la cadena de middleware y
+# las vistas asíncronas dejarían de serlo. Se usa el mismo índice de ficheros y las mismas cabeceras que
+# WhiteNoise (caché, compresión, rangos) con la configuración WHITENOISE_* de siempre.
+
+# Bytes por mensaje del cuerpo
+CHUNK_SIZE = 64 * 1024
+
+
+class ASGIStaticFiles:
+    # Aplicación ASGI que sirve los estáticos y pasa el resto de peticiones a application
+    def __init__(self, application):
+        self.application = application
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            static_file = await self.find_file(scope['path'])
+            if static_file is not None:
+                return await self.serve(static_file, scope, send)
+        return await self.application(scope, receive, send)
+
+    async def find_file(self, path):
+        if self.whitenoise.autorefresh:
+            # En desarrollo se busca en disco en cada petición
+            return await sync_to_async(self.whitenoise.find_file, thread_sensitive=False)(path)
+        return self.whitenoise.files.get(path)
+
+    async def serve(self, static_file, scope, send):
+        # get_response espera las cabeceras de la petición como en el environ de WSGI
+        request_headers = {
+            'HTTP_' + name.decode('latin-1').upper().replace('-', '_'): value.decode('latin-1')
+            for name, value in scope['headers']
+        }
+        response = await sync_to_async(static_file.get_response, thread_sensitive=False)(scope['method'], request_headers)
+        await send({
+            'type': 'http.response.start',
+            'status': int(response.status),
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers],
+        })
+        if response.file is None:
+            return await send({'type': 'http.response.body', 'body': b''})
+        read = sync_to_async(response.file.read, thread_sensitive=False)
+        try:
+            while True:
+                chunk = await read(CHUNK_SIZE)
+                more_body = len(chunk) == CHUNK_SIZE
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+                if not more_body:
+                    break
+        finally:
+            response.file.close()
@@ -3,6 +3,9 @@ import django
 import random
 from faker import Faker
 
+# Datos de demostración; para generar muchos datos (pruebas de carga) usar:
+#   python manage.py seed_tasks --users 100 --projects 1000 --tasks-per-project 100 --workers 4
+
 # Configuración de Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 django.setup()
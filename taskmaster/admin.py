@@ -1,19 +1,113 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Project, Task
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils.functional import cached_property
+
+from . import search
+from .models import Project, ProjectDeletion, Task
 
 # Register your models here.
+class EstimatedCountPaginator(Paginator):
+    # Clase que evita el COUNT(*) de las tablas grandes: sin filtros usa el número de filas que estima
+    # MySQL, y con filtros cuenta como mucho ADMIN_COUNT_LIMIT filas
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not query.where:
+            estimate = estimated_rows(self.object_list.db, self.object_list.model._meta.db_table)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return self.object_list.order_by()[:limit].count()
+
+
+def estimated_rows(alias, table):
+    # Filas que estima MySQL a partir de las estadísticas de la tabla, None con el resto de bases de datos
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    # Opciones comunes a los listados grandes: sin el segundo COUNT del total y con el paginador estimado
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
-    list_display = ('title', 'description', 'deadline', 'owner')
-    list_editable = ('description', 'deadline')
-    list_filter = ('title', 'description', 'deadline', 'owner', 'collaborators')
-    search_fields = ()
-    readonly_fields = ('created_at',)
+class ProjectAdmin(ScalableAdmin):
+    list_display = ('title', 'deadline', 'owner', 'todo_count', 'in_progress_count', 'done_count')
+    list_editable = ('deadline',)
+    list_select_related = ('owner',)
+    # Los filtros por fecha no consultan los valores distintos de la columna
+    list_filter = ('deadline',)
+    search_fields = ('title', 'description')
+    autocomplete_fields = ('owner', 'collaborators')
+    readonly_fields = ('created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        # Los proyectos que se están borrando en segundo plano ya no se muestran (ver ProjectDeletionAdmin)
+        return super().get_queryset(request).filter(deleting=False)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usamos el índice de búsqueda (FULLTEXT o SearchTerm) en lugar de LIKE '%...%' sobre el texto
+        terms = search.tokenize(search_term)
+        if not terms:
+            return queryset, False
+        ids = search.search_projects(terms, None, settings.ADMIN_SEARCH_LIMIT, prefix=True)
+        return queryset.filter(id__in=ids), False
+
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
-    list_display = ('project', 'title', 'description', 'status', 'priority')
-    list_editable = ('title', 'description', 'status', 'priority')
-    list_filter = ('title', 'description', 'status', 'priority')
-    search_fields = ()
-    readonly_fields = ()
+class TaskAdmin(ScalableAdmin):
+    list_display = ('title', 'project', 'status', 'priority', 'assigned_to')
+    list_editable = ('status', 'priority')
+    # Task.__str__ y la columna del proyecto no lanzan una consulta por fila
+    list_select_related = ('project', 'assigned_to')
+    # Solo campos con pocos valores posibles, que no necesitan un SELECT DISTINCT
+    list_filter = ('status', 'priority')
+    search_fields = ('title', 'description')
+    autocomplete_fields = ('project', 'assigned_to')
+    readonly_fields = ('updated_at',)
+
+    def get_search_results(self, request, queryset, search_term):
+        terms = search.tokenize(search_term)
+        if not terms:
+            return queryset, False
+        ids = search.search_tasks(terms, None, 0, settings.ADMIN_SEARCH_LIMIT, prefix=True)
+        return queryset.filter(id__in=ids), False
+
+    def delete_queryset(self, request, queryset):
+        # El borrado en bloque no pasa por Task.delete, así que descontamos a mano las tareas de los contadores
+        with transaction.atomic():
+            deltas = defaultdict(dict)
+            for project_id, status, total in queryset.values_list('project_id', 'status').annotate(total=Count('id')).order_by():
+                deltas[project_id][status] = -total
+            super().delete_queryset(request, queryset)
+            Project.apply_task_counter_deltas(deltas)
+
+
+@admin.register(ProjectDeletion)
+class ProjectDeletionAdmin(admin.ModelAdmin):
+    # Progreso de los borrados en segundo plano; solo lectura
+    list_display = ('title', 'project_id', 'requested_by', 'tasks_deleted', 'total_tasks', 'progress', 'created_at', 'finished_at')
+    list_select_related = ('requested_by',)
+    list_filter = (('finished_at', admin.EmptyFieldListFilter),)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
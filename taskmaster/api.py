@@ -0,0 +1,113 @@
+import json
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.forms.models import model_to_dict
+from django.http import JsonResponse
+
+from .models import Project
+
+# API JSON de proyectos y tareas. Las filas se leen con values() (diccionarios, sin crear instancias de los
+# modelos) y solo con los campos pedidos en ?fields[<tipo>]=a,b (o ?fields=a,b para el recurso principal).
+# Los recursos relacionados van una sola vez: una página de tareas lleva el proyecto en "project" y los
+# usuarios en "users", y cada tarea solo sus ids.
+
+FIELDS = {
+    'projects': (
+        'id', 'title', 'description', 'created_at', 'updated_at', 'deadline', 'owner_id', 'collaborators',
+        'todo_count', 'in_progress_count', 'done_count',
+    ),
+    'tasks': ('id', 'project_id', 'title', 'description', 'status', 'priority', 'assigned_to_id', 'rank', 'updated_at'),
+    'users': ('id', 'username'),
+    'history': ('id', 'project_id', 'task_id', 'user_id', 'field', 'old_value', 'new_value', 'timestamp'),
+}
+
+# Campos con los ids de los usuarios que se incluyen en "users"
+USER_REFERENCES = ('owner_id', 'collaborators', 'assigned_to_id', 'user_id')
+
+
+class ApiError(Exception):
+    # Error de la petición que se devuelve como {"error": ...}
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def response(data, status=200):
+    # JSON sin espacios entre separadores
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def error_response(message, status=400, errors=None):
+    data = {'error': message}
+    if errors is not None:
+        data['errors'] = errors
+    return response(data, status=status)
+
+
+def sparse_fields(params, kind, primary=False):
+    # Campos pedidos de un tipo, en el orden de FIELDS; sin ?fields se devuelven todos
+    raw = params.get(f'fields[{kind}]')
+    if raw is None and primary:
+        raw = params.get('fields')
+    if raw is None:
+        return FIELDS[kind]
+    requested = {name for name in raw.split(',') if name}
+    unknown = requested - set(FIELDS[kind])
+    if unknown:
+        raise ApiError(f"Campos desconocidos en {kind}: {', '.join(sorted(unknown))}")
+    # El id siempre va: es lo que enlaza unos recursos con otros
+    return tuple(name for name in FIELDS[kind] if name == 'id' or name in requested)
+
+
+def project_rows(projects, fields):
+    # Los colaboradores no son una columna: se añaden con una sola consulta a la tabla intermedia
+    rows = list(projects.values(*[name for name in fields if name != 'collaborators']))
+    if 'collaborators' in fields:
+        collaborators = defaultdict(list)
+        through = Project.collaborators.through.objects.filter(project_id__in=[row['id'] for row in rows])
+        for project_id, user_id in through.order_by('user_id').values_list('project_id', 'user_id'):
+            collaborators[project_id].append(user_id)
+        for row in rows:
+            row['collaborators'] = collaborators[row['id']]
+    return rows
+
+
+def referenced_users(rows, fields):
+    # {id: usuario} de todos los usuarios que aparecen en las filas, cada uno una sola vez
+    ids = set()
+    for row in rows:
+        for name in USER_REFERENCES:
+            value = row.get(name)
+            if isinstance(value, list):
+                ids.update(value)
+            elif value:
+                ids.add(value)
+    if not ids:
+        return {}
+    return {user['id']: user for user in User.objects.filter(id__in=ids).order_by('id').values(*fields)}
+
+
+def read_body(request):
+    # Cuerpo de las escrituras: un objeto JSON
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError("El cuerpo no es JSON válido")
+    if not isinstance(data, dict):
+        raise ApiError("El cuerpo tiene que ser un objeto JSON")
+    return data
+
+
+def form_data(instance, form_class, data):
+    # Datos para un formulario de edición parcial: los campos que no llegan conservan su valor actual
+    current = model_to_dict(instance, fields=form_class._meta.fields)
+    for name, value in current.items():
+        if isinstance(value, list):
+            current[name] = [getattr(item, 'pk', item) for item in value]
+    current.update({name: value for name, value in data.items() if name in current})
+    return current
+
+
+def form_errors(form):
+    return {field: [error['message'] for error in errors] for field, errors in form.errors.get_json_data().items()}
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class TaskmasterConfig(AppConfig):
     name = 'taskmaster'
+
+    def ready(self):
+        # Conectamos las señales de la instrumentación, de la caché de permisos, de los fragmentos,
+        # de los eventos, del índice de búsqueda, del resumen de los informes y del historial
+        from . import events, fragments, history, instrumentation, membership, reports, search
+        instrumentation.connect_signals()
+        membership.connect_signals()
+        fragments.connect_signals()
+        events.connect_signals()
+        search.connect_signals()
+        reports.connect_signals()
+        history.connect_signals()
@@ -0,0 +1,41 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Trabajos en segundo plano dentro del propio proceso (borrado de proyectos, reordenación del tablero).
+# Un pool de hilos hace de cola local; lo que tenga que sobrevivir a una caída guarda su estado en la
+# base de datos y tiene un comando para retomarlo.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix='taskmaster')
+    return _executor
+
+
+def submit(function, *args):
+    # Con BACKGROUND_WORKERS a 0 se ejecuta en el propio hilo (pruebas, comandos)
+    if settings.BACKGROUND_WORKERS <= 0:
+        function(*args)
+    else:
+        get_executor().submit(_run_in_thread, function, *args)
+
+
+def _run_in_thread(function, *args):
+    try:
+        function(*args)
+    except Exception:
+        logger.exception("Error en el trabajo en segundo plano %s%r", function.__name__, args)
+    finally:
+        # Las conexiones son de cada hilo: las cerramos para no dejarlas abiertas
+        connections.close_all()
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models import F, Max, Min, Window
+from django.db.models.functions import RowNumber
+
+from . import background
+from .models import Task
+
+# Tablero kanban de un proyecto: una columna por estado, ordenada por Task.rank.
+# Entre dos tareas consecutivas queda un hueco (Task.RANK_GAP al crearlas o al reordenar), así que mover
+# una tarea solo cambia su fila: su nueva posición es el punto medio entre las dos tareas que la rodean.
+# Cuando un hueco se queda pequeño, la columna se reparte de nuevo en segundo plano.
+
+# Hueco por debajo del cual se reparte de nuevo la columna
+MIN_GAP = 16
+
+
+class MoveError(Exception):
+    pass
+
+
+def columns(project_id, limit):
+    # Las primeras tareas de cada columna con una sola consulta (ROW_NUMBER por estado)
+    position = Window(RowNumber(), partition_by=[F('status')], order_by=[F('rank').asc(), F('id').asc()])
+    tasks = (
+        Task.objects.filter(project_id=project_id)
+        .select_related('assigned_to')
+        .annotate(position=position)
+        .filter(position__lte=limit)
+        .order_by('status', 'rank', 'id')
+    )
+    grouped = {status: [] for status, _ in Task.STATUS_CHOICES}
+    for task in tasks:
+        grouped[task.status].append(task)
+    return grouped
+
+
+def move(task, status, previous_id=None, next_id=None):
+    # Pone la tarea en la columna status entre previous (encima) y next (debajo); sin ninguna de las dos, al final
+    with transaction.atomic():
+        low, high = neighbour_ranks(task, status, previous_id, next_id)
+        rank = rank_between(low, high)
+        if rank is None:
+            # No queda hueco entre las dos: repartimos la columna ahora y lo volvemos a intentar
+            rebalance(task.project_id, status)
+            low, high = neighbour_ranks(task, status, previous_id, next_id)
+            rank = rank_between(low, high)
+        if rank is None:
+            rank = Task.next_rank(task.project_id, status)
+        task.status = status
+        task.rank = rank
+        task.save(update_fields=['status', 'rank', 'updated_at'])
+        if low is not None and high is not None and min(rank - low, high - rank) < MIN_GAP:
+            transaction.on_commit(lambda: background.submit(rebalance, task.project_id, status))
+    return task
+
+
+def neighbour_ranks(task, status, previous_id, next_id):
+    ids = {neighbour_id for neighbour_id in (previous_id, next_id) if neighbour_id}
+    if task.pk in ids:
+        raise MoveError("Una tarea no puede quedar junto a sí misma")
+    ranks = dict(Task.objects.filter(id__in=ids, project_id=task.project_id, status=status).values_list('id', 'rank'))
+    if len(ranks) != len(ids):
+        raise MoveError("Las tareas vecinas no están en esa columna")
+    if not ids:
+        # Al final de la columna: justo después de la última
+        return Task.next_rank(task.project_id, status) - Task.RANK_GAP, None
+    low, high = ranks.get(previous_id), ranks.get(next_id)
+    # Con una sola vecina buscamos la del otro lado, para no saltarnos las tareas que haya entre medias
+    column = Task.objects.filter(project_id=task.project_id, status=status).exclude(pk=task.pk)
+    if high is None:
+        high = column.filter(rank__gt=low).aggregate(rank=Min('rank'))['rank']
+    elif low is None:
+        low = column.filter(rank__lt=high).aggregate(rank=Max('rank'))['rank']
+    return low, high
+
+
+def rank_between(low, high):
+    # Punto medio entre las dos posiciones, o None si no cabe ninguna entre ellas
+    if low is None and high is None:
+        return Task.RANK_GAP
+    if low is None:
+        return high - Task.RANK_GAP
+    if high is None:
+        return low + Task.RANK_GAP
+    if high - low < 2:
+        return None
+    return (low + high) // 2
+
+
+def rebalance(project_id, status, batch_size=1000):
+    # Reparte la columna con huecos de RANK_GAP manteniendo el orden. Bloquea las filas de la columna para
+    # que un movimiento a la vez no se pierda
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update()
+            .filter(project_id=project_id, status=status)
+            .order_by('rank', 'id')
+            .values_list('id', flat=True)
+        )
+        tasks = [Task(id=task_id, rank=(index + 1) * Task.RANK_GAP) for index, task_id in enumerate(ids)]
+        Task.objects.bulk_update(tasks, ['rank'], batch_size=batch_size)
+    return len(tasks)
@@ -0,0 +1,78 @@
+import hashlib
+
+from django.db.models import Max, OuterRef, Subquery
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Project, Task
+
+# Validadores HTTP (ETag y Last-Modified) de la lista de proyectos y del detalle de un proyecto.
+# Salen de una sola consulta de agregación sobre updated_at, antes de la vista, así que si el
+# cliente ya tiene la página se responde 304 sin cargar los datos ni renderizar la plantilla.
+# Los cambios de estado de las tareas también cambian el updated_at del proyecto (contadores).
+
+
+def project_list_validators(request, project_ids):
+    last_modified = Project.objects.filter(id__in=project_ids).aggregate(last=Max('updated_at'))['last']
+    return _validators(request, last_modified, *sorted(project_ids))
+
+
+async def aproject_list_validators(request, project_ids):
+    last_modified = (await Project.objects.filter(id__in=project_ids).aaggregate(last=Max('updated_at')))['last']
+    return _validators(request, last_modified, *sorted(project_ids))
+
+
+def project_detail_validators(request, project_id):
+    # Devuelve (None, None) si el proyecto no existe, para que la vista responda con su 404
+    return _detail_validators(request, _detail_queryset(project_id).first())
+
+
+async def aproject_detail_validators(request, project_id):
+    return _detail_validators(request, await _detail_queryset(project_id).afirst())
+
+
+def _detail_queryset(project_id):
+    # La última tarea modificada sale del índice (project, updated_at) sin recorrer todas las tareas
+    last_task = Task.objects.filter(project_id=OuterRef('pk')).order_by('-updated_at').values('updated_at')[:1]
+    return Project.objects.filter(pk=project_id).annotate(last_task=Subquery(last_task)).values_list('updated_at', 'last_task')
+
+
+def _detail_validators(request, row):
+    if row is None:
+        return None, None
+    return _validators(request, max(value for value in row if value is not None))
+
+
+def _validators(request, last_modified, *parts):
+    # La página cambia con el usuario, su token CSRF y la URL (filtros y cursor) además de con los datos.
+    # get_token deja en CSRF_COOKIE el secreto que se enviará en la cookie si el cliente aún no lo tiene
+    get_token(request)
+    key = ':'.join(str(part) for part in (
+        request.user.id,
+        request.META.get('CSRF_COOKIE', ''),
+        request.get_full_path(),
+        last_modified.isoformat() if last_modified else '',
+        *parts,
+    ))
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"', last_modified
+
+
+def not_modified(request, etag, last_modified):
+    # Respuesta 304 (o 412) si los validadores del cliente coinciden, None si hay que generar la página
+    if etag is None:
+        return None
+    return get_conditional_response(
+        request, etag=etag, last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified):
+    if etag is None or response.status_code != 200:
+        return response
+    response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    # Los navegadores y proxies tienen que volver a preguntar siempre, y la página es de cada usuario
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
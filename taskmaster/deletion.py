@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import background, fragments, membership
+from .models import Project, ProjectDeletion, SearchTerm, Task, WorkloadSummary
+
+# Borrado de proyectos grandes sin el colector de on_delete=CASCADE, que carga todas las tareas en memoria.
+# schedule() marca el proyecto con deleting (deja de estar en accessible_project_ids) y crea su ProjectDeletion;
+# después un hilo en segundo plano borra sus filas con DELETE ... LIMIT, cada lote en su propia transacción junto con
+# el progreso, y al final el propio proyecto. Si el proceso se cae, el comando process_deletions sigue con
+# los borrados pendientes.
+
+
+def schedule(project, user=None):
+    # Oculta el proyecto y encola su borrado; si ya se estaba borrando devuelve el borrado existente
+    with transaction.atomic():
+        if not Project.objects.filter(pk=project.pk, deleting=False).update(deleting=True, updated_at=timezone.now()):
+            return ProjectDeletion.objects.filter(project_id=project.pk).first()
+        # Los contadores de la base de datos, por si la instancia es antigua
+        counters = Project.objects.filter(pk=project.pk).values_list(*Project.COUNTER_FIELDS.values()).first()
+        deletion = ProjectDeletion.objects.create(
+            project_id=project.pk, title=project.title, requested_by=user, total_tasks=sum(counters),
+        )
+        # update() no lanza señales: el creador y los colaboradores dejan de tener acceso ya
+        membership.invalidate(project.owner_id, *project.collaborators.values_list('id', flat=True))
+        fragments.bump(project.pk)
+        WorkloadSummary.objects.filter(project_id=project.pk).delete()
+        transaction.on_commit(lambda: background.submit(run, deletion.pk))
+    return deletion
+
+
+def pending():
+    return ProjectDeletion.objects.filter(finished_at__isnull=True).order_by('pk')
+
+
+def run(deletion_id, batch_size=None):
+    # Sigue desde donde se quedara: las filas ya borradas no vuelven a contar
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    deletion = ProjectDeletion.objects.get(pk=deletion_id)
+    if deletion.finished_at:
+        return deletion
+
+    # Primero lo que apunta a las tareas, después las tareas y las filas de los colaboradores
+    for model in (SearchTerm, Task, Project.collaborators.through):
+        while True:
+            with transaction.atomic():
+                deleted = delete_batch(model, deletion.project_id, batch_size)
+                if deleted and model is Task:
+                    ProjectDeletion.objects.filter(pk=deletion.pk).update(
+                        tasks_deleted=F('tasks_deleted') + deleted, updated_at=timezone.now(),
+                    )
+            if deleted < batch_size:
+                break
+
+    with transaction.atomic():
+        # Ya sin filas relacionadas, el colector no tiene nada que cargar
+        Project.objects.filter(pk=deletion.project_id).delete()
+        ProjectDeletion.objects.filter(pk=deletion.pk).update(finished_at=timezone.now(), updated_at=timezone.now())
+    deletion.refresh_from_db()
+    return deletion
+
+
+def delete_batch(model, project_id, limit):
+    # Borra como mucho limit filas del proyecto con una sola sentencia y devuelve cuántas
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field('project').column)
+    pk = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'DELETE FROM {table} WHERE {column} = %s LIMIT %s', [project_id, limit])
+        else:
+            # El resto de bases de datos no admiten LIMIT en DELETE (MySQL no lo admite en la subconsulta)
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM {table} WHERE {column} = %s LIMIT %s)',
+                [project_id, limit],
+            )
+        return cursor.rowcount
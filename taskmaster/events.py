@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+from itertools import count
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.utils.module_loading import import_string
+
+from .membership import amember_project_ids
+from .models import Task
+
+# Eventos de las tareas de cada proyecto (creada, actualizada, borrada) para la vista de
+# Server-Sent Events. Se publican al confirmar la transacción en el broker de EVENTS_BROKER.
+# El broker en memoria solo reparte los eventos dentro del mismo proceso: con varios workers
+# hace falta un broker compartido con la misma interfaz (publish, subscribe y unsubscribe).
+
+
+class InMemoryBroker:
+    # Clase que reparte los eventos entre las suscripciones abiertas en este proceso
+    def __init__(self, max_queue=100):
+        self.lock = threading.Lock()
+        # {id del proyecto: {cola: bucle de eventos del suscriptor}}
+        self.subscribers = {}
+        self.ids = count(1)
+        self.max_queue = max_queue
+
+    def publish(self, project_id, event):
+        # Se puede llamar desde cualquier hilo; cada cola se llena desde el bucle de su suscriptor
+        event = {'id': next(self.ids), **event}
+        with self.lock:
+            targets = list(self.subscribers.get(project_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, event)
+            except RuntimeError:
+                # El bucle ya se ha cerrado, la suscripción se borrará sola
+                pass
+        return event
+
+    def subscribe(self, project_id):
+        queue = asyncio.Queue(self.max_queue)
+        with self.lock:
+            self.subscribers.setdefault(project_id, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, project_id, queue):
+        with self.lock:
+            queues = self.subscribers.get(project_id, {})
+            queues.pop(queue, None)
+            if not queues:
+                self.subscribers.pop(project_id, None)
+
+    @staticmethod
+    def _put(queue, event):
+        if queue.full():
+            # Si un cliente no lee, descartamos sus eventos más antiguos en lugar de acumular memoria
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+def publish(project_id, event_type, **data):
+    # Los eventos salen al confirmar la transacción, nunca con cambios que luego se deshacen
+    transaction.on_commit(lambda: get_broker().publish(project_id, {'type': event_type, 'project_id': project_id, **data}))
+
+
+def task_data(task):
+    return {
+        'id': task.id,
+        'title': task.title,
+        'status': task.status,
+        'priority': task.priority,
+        'assigned_to_id': task.assigned_to_id,
+    }
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream(project_id, user_id):
+    # Generador de la respuesta de Server-Sent Events. Cada EVENTS_HEARTBEAT segundos sin eventos
+    # manda un comentario para que los proxies no cierren la conexión y comprueba que el usuario
+    # sigue teniendo acceso al proyecto
+    broker = get_broker()
+    queue = broker.subscribe(project_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), settings.EVENTS_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if project_id not in await amember_project_ids(user_id):
+                    return
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(project_id, queue)
+
+
+def task_saved(sender, instance, created, **kwargs):
+    old_project_id = getattr(instance, '_loaded_counter_key', (None, None))[0]
+    if old_project_id is not None and old_project_id != instance.project_id:
+        # La tarea se ha movido: desaparece del proyecto anterior y aparece en el nuevo
+        publish(old_project_id, 'task.deleted', task={'id': instance.id})
+        created = True
+    publish(instance.project_id, 'task.created' if created else 'task.updated', task=task_data(instance))
+
+
+def task_deleted(sender, instance, **kwargs):
+    publish(instance.project_id, 'task.deleted', task={'id': instance.id})
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready
+    post_save.connect(task_saved, sender=Task, dispatch_uid='events_task_save')
+    post_delete.connect(task_deleted, sender=Task, dispatch_uid='events_task_delete')
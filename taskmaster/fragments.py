@@ -0,0 +1,169 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Prefetch
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .models import Project, Task
+
+# Caché de los trozos de HTML de cada proyecto (tarjeta) y tarea (artículo).
+# Las claves llevan la versión del proyecto, que cambia cada vez que se modifica el proyecto,
+# sus colaboradores o alguna de sus tareas, así que nunca hace falta borrar fragmentos.
+
+# Se guarda en el HTML cacheado en lugar del token CSRF, que es distinto en cada petición
+CSRF_PLACEHOLDER = '__taskmaster_csrf_token__'
+
+# Hay que subirlo al cambiar project_card.html o task_article.html, para no servir HTML antiguo
+TEMPLATES_VERSION = 2
+
+
+def version_key(project_id):
+    return f'taskmaster:project_version:{project_id}'
+
+
+def get_versions(project_ids):
+    # Versiones actuales de varios proyectos en una sola llamada a la caché
+    keys = {version_key(project_id): project_id for project_id in project_ids}
+    found = cache.get_many(list(keys))
+    missing = _new_versions(keys, found)
+    if missing:
+        # Si se ha perdido una versión creamos otra nueva, así nunca se reutiliza un fragmento antiguo
+        cache.set_many(missing, None)
+    return {keys[key]: version for key, version in {**found, **missing}.items()}
+
+
+async def aget_versions(project_ids):
+    # Versión asíncrona de get_versions
+    keys = {version_key(project_id): project_id for project_id in project_ids}
+    found = await cache.aget_many(list(keys))
+    missing = _new_versions(keys, found)
+    if missing:
+        await cache.aset_many(missing, None)
+    return {keys[key]: version for key, version in {**found, **missing}.items()}
+
+
+def _new_versions(keys, found):
+    return {key: uuid4().hex for key in keys if key not in found}
+
+
+def bump(*project_ids):
+    # Cambiamos la versión ya y otra vez al confirmar, por si se cachea algo antes del commit
+    keys = [version_key(project_id) for project_id in set(project_ids) if project_id is not None]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def project_cards(ids):
+    # Proyectos de las tarjetas que faltan. Como la caché de permisos, se leen de la principal aunque haya
+    # réplicas: bump() cambia la versión al confirmar en la principal, y con una réplica con retraso se
+    # guardaría el HTML antiguo con la versión nueva hasta el siguiente cambio
+    return (
+        Project.objects.using(DEFAULT_DB_ALIAS)
+        .filter(id__in=ids)
+        .select_related('owner')
+        .prefetch_related(Prefetch('collaborators', queryset=User.objects.using(DEFAULT_DB_ALIAS)))
+    )
+
+
+def task_articles(ids):
+    # Tareas de los artículos que faltan, con su proyecto, también de la principal
+    return (
+        Task.objects.using(DEFAULT_DB_ALIAS)
+        .filter(id__in=ids)
+        .select_related('assigned_to', 'project__owner')
+        .prefetch_related(Prefetch('project__collaborators', queryset=User.objects.using(DEFAULT_DB_ALIAS)))
+    )
+
+
+def fragment_key(kind, object_id, version, variant):
+    return f'taskmaster:fragment:{kind}:{TEMPLATES_VERSION}:{object_id}:{version}:{variant}'
+
+
+def render_fragments(request, kind, items, template_name, load, context_name):
+    # items es una lista de (id del objeto, id del proyecto, variante). Devuelve el HTML de cada uno,
+    # sacándolo de la caché si está; load(ids) solo se llama con los que faltan
+    versions = get_versions({project_id for _, project_id, _ in items})
+    keys = _fragment_keys(kind, items, versions)
+    found = cache.get_many(keys)
+
+    missing_ids = _missing_ids(items, keys, found)
+    if missing_ids:
+        rendered = _render_missing(items, keys, found, load(missing_ids), template_name, context_name)
+        cache.set_many(rendered, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+        found.update(rendered)
+    return _with_csrf_token(request, keys, found)
+
+
+async def arender_fragments(request, kind, items, template_name, aload, context_name):
+    # Versión asíncrona de render_fragments; aload(ids) es una corrutina
+    versions = await aget_versions({project_id for _, project_id, _ in items})
+    keys = _fragment_keys(kind, items, versions)
+    found = await cache.aget_many(keys)
+
+    missing_ids = _missing_ids(items, keys, found)
+    if missing_ids:
+        rendered = _render_missing(items, keys, found, await aload(missing_ids), template_name, context_name)
+        await cache.aset_many(rendered, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 3600))
+        found.update(rendered)
+    return _with_csrf_token(request, keys, found)
+
+
+def _fragment_keys(kind, items, versions):
+    return [fragment_key(kind, object_id, versions[project_id], variant) for object_id, project_id, variant in items]
+
+
+def _missing_ids(items, keys, found):
+    return [object_id for (object_id, _, _), key in zip(items, keys) if key not in found]
+
+
+def _render_missing(items, keys, found, objects, template_name, context_name):
+    objects = {obj.id: obj for obj in objects}
+    rendered = {}
+    for (object_id, _, variant), key in zip(items, keys):
+        if key not in found and object_id in objects:
+            rendered[key] = render_to_string(template_name, {
+                context_name: objects[object_id],
+                'variant': variant,
+                'csrf_token': CSRF_PLACEHOLDER,
+            })
+    return rendered
+
+
+def _with_csrf_token(request, keys, found):
+    csrf_token = get_token(request)
+    return [mark_safe(found[key].replace(CSRF_PLACEHOLDER, csrf_token)) for key in keys if key in found]
+
+
+def project_changed(sender, instance, **kwargs):
+    bump(instance.pk)
+
+
+def task_changed(sender, instance, **kwargs):
+    # Si la tarea cambia de proyecto, también cambia el anterior
+    old_project_id = getattr(instance, '_loaded_counter_key', (None, None))[0]
+    bump(instance.project_id, old_project_id)
+
+
+def collaborators_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump(instance.pk)
+    elif action == 'pre_clear':
+        bump(*instance.collaborated_projects.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        bump(*pk_set)
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready
+    post_save.connect(project_changed, sender=Project, dispatch_uid='fragments_project_save')
+    post_save.connect(task_changed, sender=Task, dispatch_uid='fragments_task_save')
+    post_delete.connect(task_changed, sender=Task, dispatch_uid='fragments_task_delete')
+    m2m_changed.connect(collaborators_changed, sender=Project.collaborators.through, dispatch_uid='fragments_collaborators')
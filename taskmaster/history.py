@@ -0,0 +1,186 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_save
+from django.utils import timezone
+
+from .models import Project, Task, TaskHistory
+
+# Historial de cambios: estado, prioridad y asignado de las tareas, y colaboradores de los proyectos.
+# Las entradas no se guardan una a una. Cada cambio pasa al búfer de la petición al confirmarse su transacción
+# (si se deshace, se pierde con ella), y HistoryMiddleware las escribe todas con un solo bulk_create al terminar
+# la petición. Fuera de una petición se puede usar buffered(); sin búfer cada cambio se escribe al confirmarse.
+
+# Campos de Task que se guardan, con el nombre que pueden tener en update_fields
+TRACKED_FIELDS = {
+    'status': {'status'},
+    'priority': {'priority'},
+    'assigned_to': {'assigned_to', 'assigned_to_id'},
+}
+
+_buffer = ContextVar('history_buffer', default=None)
+
+
+class HistoryBuffer:
+    # Entradas pendientes de una petición o de un bloque buffered()
+    def __init__(self, request=None):
+        self.request = request
+        self.entries = []
+
+    def user_id(self):
+        user = getattr(self.request, 'user', None)
+        return user.id if user is not None and user.is_authenticated else None
+
+    def flush(self):
+        entries, self.entries = self.entries, []
+        if entries:
+            TaskHistory.objects.bulk_create(entries)
+        return len(entries)
+
+
+@contextmanager
+def buffered(request=None):
+    # Junta los cambios hechos dentro del bloque y los escribe con un solo INSERT al salir
+    buffer = HistoryBuffer(request)
+    token = _buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _buffer.reset(token)
+        flush_on_commit(buffer)
+
+
+def flush_on_commit(buffer):
+    # Después de las entradas de la transacción en curso, si la hay
+    transaction.on_commit(buffer.flush)
+
+
+def entry(project_id, task_id, field, old_value, new_value, user_id=None):
+    return TaskHistory(
+        project_id=project_id, task_id=task_id, user_id=user_id, field=field,
+        old_value='' if old_value is None else str(old_value),
+        new_value='' if new_value is None else str(new_value),
+        timestamp=timezone.now(),
+    )
+
+
+def record(changes):
+    # changes: [(project_id, task_id, field, old_value, new_value)]
+    if not changes:
+        return
+    buffer = _buffer.get()
+    user_id = buffer.user_id() if buffer is not None else None
+    entries = [entry(*change, user_id=user_id) for change in changes]
+    if buffer is not None:
+        transaction.on_commit(lambda: buffer.entries.extend(entries))
+    else:
+        transaction.on_commit(lambda: TaskHistory.objects.bulk_create(entries))
+
+
+def task_changes(rows, changes):
+    # Cambios de una actualización en bloque. rows: [(task_id, project_id, {campo: valor anterior})]
+    return [
+        (project_id, task_id, field, old[field], changes[field])
+        for task_id, project_id, old in rows
+        for field in TRACKED_FIELDS
+        if field in changes and old[field] != changes[field]
+    ]
+
+
+def stored_values(instance):
+    # {campo: valor guardado} de la tarea, a partir de lo que se cargó
+    _, status = getattr(instance, '_loaded_counter_key', (None, None))
+    loaded = instance.__dict__
+    if status is None or '_loaded_priority' not in loaded or '_loaded_assigned_to_id' not in loaded:
+        row = Task.objects.filter(pk=instance.pk).values('status', 'priority', 'assigned_to_id').first() or {}
+        return {'status': row.get('status'), 'priority': row.get('priority'), 'assigned_to': row.get('assigned_to_id')}
+    return {'status': status, 'priority': instance._loaded_priority, 'assigned_to': instance._loaded_assigned_to_id}
+
+
+def current_values(instance):
+    return {'status': instance.status, 'priority': instance.priority, 'assigned_to': instance.assigned_to_id}
+
+
+def task_pre_save(sender, instance, update_fields=None, **kwargs):
+    instance.__dict__.pop('_history_old', None)
+    if instance._state.adding:
+        return
+    fields = [
+        field for field, names in TRACKED_FIELDS.items()
+        if update_fields is None or names & set(update_fields)
+    ]
+    if fields:
+        old = stored_values(instance)
+        instance._history_old = {field: old[field] for field in fields}
+
+
+def task_saved(sender, instance, **kwargs):
+    instance._loaded_priority = instance.priority
+    old = instance.__dict__.pop('_history_old', None)
+    if not old:
+        return
+    new = current_values(instance)
+    record([
+        (instance.project_id, instance.pk, field, value, new[field])
+        for field, value in old.items()
+        if value != new[field]
+    ])
+
+
+def collaborators_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # instance es el proyecto (project.collaborators) o el usuario (user.collaborated_projects)
+    if action == 'pre_clear':
+        if reverse:
+            instance._history_cleared = [(project_id, instance.pk) for project_id in instance.collaborated_projects.values_list('id', flat=True)]
+        else:
+            instance._history_cleared = [(instance.pk, user_id) for user_id in instance.collaborators.values_list('id', flat=True)]
+        return
+    if action == 'post_clear':
+        pairs, added = instance.__dict__.pop('_history_cleared', []), False
+    elif action in ('post_add', 'post_remove'):
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        added = action == 'post_add'
+    else:
+        return
+    record([
+        (project_id, None, 'collaborators', None if added else user_id, user_id if added else None)
+        for project_id, user_id in sorted(pairs)
+    ])
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready
+    pre_save.connect(task_pre_save, sender=Task, dispatch_uid='history_task_pre_save')
+    post_save.connect(task_saved, sender=Task, dispatch_uid='history_task_save')
+    m2m_changed.connect(collaborators_changed, sender=Project.collaborators.through, dispatch_uid='history_collaborators')
+
+
+class HistoryMiddleware:
+    # Middleware que junta el historial de cada petición y lo escribe con un solo INSERT al terminar.
+    # Con ASGI las vistas asíncronas siguen en el bucle de eventos; los cambios se hacen en el hilo de
+    # sync_to_async (con su conexión), así que el INSERT también se encola desde ese hilo
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with buffered(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        buffer = HistoryBuffer(request)
+        token = _buffer.set(buffer)
+        try:
+            return await self.get_response(request)
+        finally:
+            _buffer.reset(token)
+            await sync_to_async(flush_on_commit)(buffer)
@@ -0,0 +1,206 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+
+from . import events, fragments, reports, search
+from .membership import accessible_project_ids
+from .models import Project, Task
+
+# Importación de tareas en bloque desde CSV o NDJSON, con las mismas columnas que la exportación.
+# Las filas se leen según llegan y se validan por lotes: los permisos y los miembros de cada proyecto
+# se consultan una sola vez, y cada lote se inserta con un único bulk_create dentro de una transacción.
+
+FORMATS = ('csv', 'ndjson')
+EXTENSIONS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.json': 'ndjson'}
+TITLE_MAX_LENGTH = Task._meta.get_field('title').max_length
+
+
+def guess_format(filename):
+    # Formato a partir de la extensión del fichero, None si no la conocemos
+    for extension, file_format in EXTENSIONS.items():
+        if filename.lower().endswith(extension):
+            return file_format
+    return None
+
+
+def read_rows(stream, file_format):
+    # Devuelve (número de fila, diccionario o None si no se puede leer) según se va leyendo stream
+    if file_format not in FORMATS:
+        raise ValueError("El formato tiene que ser csv o ndjson")
+    if file_format == 'csv':
+        yield from enumerate(csv.DictReader(stream), start=1)
+        return
+    number = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+class TaskImporter:
+    # Clase que valida e inserta las tareas por lotes y guarda el informe de errores de cada fila
+    def __init__(self, user, batch_size=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.project_ids = accessible_project_ids(user)
+        # Creador y colaboradores de cada proyecto ya consultado
+        self.members = {}
+        # Ids de los usuarios asignados ya consultados ({nombre de usuario: id o None})
+        self.usernames = {}
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        self.seconds = 0
+
+    def run(self, rows):
+        start = time.perf_counter()
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+        self.seconds = time.perf_counter() - start
+        return self.report()
+
+    def import_batch(self, batch):
+        self.rows += len(batch)
+        parsed = []
+        for number, row in batch:
+            data, error = self.parse(row)
+            if error:
+                self.errors.append((number, error))
+            else:
+                parsed.append((number, data))
+
+        self.load_usernames({data['assigned_to'] for _, data in parsed if data['assigned_to']})
+        self.load_members({data['project_id'] for _, data in parsed})
+
+        tasks = []
+        for number, data in parsed:
+            if data['project_id'] not in self.members:
+                # La caché de permisos puede tener un proyecto que ya se ha borrado
+                self.errors.append((number, "El proyecto no existe o no tienes permiso"))
+                continue
+            assigned_to = data.pop('assigned_to')
+            if assigned_to:
+                data['assigned_to_id'] = self.usernames[assigned_to]
+                if data['assigned_to_id'] is None:
+                    self.errors.append((number, f"El usuario {assigned_to} no existe"))
+                    continue
+                if data['assigned_to_id'] not in self.members[data['project_id']]:
+                    self.errors.append((number, "No puedes asignarle la tarea a alguien que no sea el creador o colaborador"))
+                    continue
+            tasks.append(Task(**data))
+
+        if not tasks:
+            return
+        deltas = defaultdict(lambda: defaultdict(int))
+        report_deltas = defaultdict(int)
+        ranks = {}
+        for task in tasks:
+            # Al final de su columna del tablero, con una sola consulta por columna y lote
+            column = (task.project_id, task.status)
+            if column not in ranks:
+                ranks[column] = Task.next_rank(*column) - Task.RANK_GAP
+            ranks[column] += Task.RANK_GAP
+            task.rank = ranks[column]
+            deltas[task.project_id][task.status] += 1
+            report_deltas[(task.project_id, task.assigned_to_id, task.status)] += 1
+        with transaction.atomic():
+            # bulk_create no pasa por Task.save, así que indexamos y cuadramos a mano los contadores, el resumen
+            # de los informes y los fragmentos
+            Task.objects.bulk_create(tasks)
+            if not connection.features.can_return_rows_from_bulk_insert:
+                self.load_ids(tasks)
+            search.index_tasks([task for task in tasks if task.pk is not None])
+            Project.apply_task_counter_deltas(deltas)
+            reports.apply_deltas(report_deltas)
+            fragments.bump(*deltas)
+            for project_id, statuses in deltas.items():
+                # Un solo evento por proyecto y lote en lugar de uno por tarea
+                events.publish(project_id, 'tasks.imported', count=sum(statuses.values()))
+        self.created += len(tasks)
+
+    def load_ids(self, tasks):
+        # MySQL no devuelve los ids en bulk_create, y sin ellos los términos de búsqueda quedarían como del proyecto.
+        # Los leemos por la posición de cada tarea en su columna del tablero; el título, por si otra importación
+        # a la vez ha usado el mismo hueco
+        ranks = defaultdict(list)
+        for task in tasks:
+            ranks[(task.project_id, task.status)].append(task.rank)
+        query = Q()
+        for (project_id, status), column_ranks in ranks.items():
+            query |= Q(project_id=project_id, status=status, rank__in=column_ranks)
+        rows = Task.objects.filter(query).values_list('project_id', 'status', 'rank', 'title', 'id')
+        ids = {tuple(row[:4]): row[4] for row in rows}
+        for task in tasks:
+            task.pk = ids.get((task.project_id, task.status, task.rank, task.title))
+
+    def parse(self, row):
+        # Comprobaciones que no necesitan la base de datos; devuelve (datos, error)
+        if row is None:
+            return None, "La fila no es un objeto JSON válido"
+        # En NDJSON cada valor puede ser de cualquier tipo JSON; solo aceptamos texto (y el proyecto como número)
+        for field in ('title', 'description', 'status', 'priority', 'assigned_to'):
+            if row.get(field) is not None and not isinstance(row[field], str):
+                return None, f"El campo {field} tiene que ser texto"
+        project_id = row.get('project_id')
+        if isinstance(project_id, bool) or not isinstance(project_id, (int, str, type(None))):
+            return None, "El proyecto no existe o no tienes permiso"
+        project_id = str(project_id or '').strip()
+        if not project_id.isdigit() or int(project_id) not in self.project_ids:
+            return None, "El proyecto no existe o no tienes permiso"
+        title = (row.get('title') or '').strip()
+        if not title:
+            return None, "La tarea necesita un título"
+        if len(title) > TITLE_MAX_LENGTH:
+            return None, f"El título no puede tener más de {TITLE_MAX_LENGTH} caracteres"
+        status = row.get('status') or 'TODO'
+        if status not in dict(Task.STATUS_CHOICES):
+            return None, "El estado no es válido"
+        priority = row.get('priority') or 'M'
+        if priority not in dict(Task.PRIORITY_CHOICES):
+            return None, "La prioridad no es válida"
+        return {
+            'project_id': int(project_id),
+            'title': title,
+            'description': row.get('description') or None,
+            'status': status,
+            'priority': priority,
+            'assigned_to': (row.get('assigned_to') or '').strip(),
+        }, None
+
+    def load_usernames(self, usernames):
+        # Una consulta por lote para los usuarios que no hemos visto todavía
+        missing = usernames - self.usernames.keys()
+        if missing:
+            found = dict(User.objects.filter(username__in=missing).values_list('username', 'id'))
+            self.usernames.update({username: found.get(username) for username in missing})
+
+    def load_members(self, project_ids):
+        # Dos consultas por lote para los proyectos que no hemos visto todavía
+        missing = project_ids - self.members.keys()
+        if missing:
+            for project_id, owner_id in Project.objects.filter(id__in=missing).values_list('id', 'owner_id'):
+                self.members[project_id] = {owner_id}
+            collaborators = Project.collaborators.through.objects.filter(project_id__in=missing)
+            for project_id, user_id in collaborators.values_list('project_id', 'user_id'):
+                self.members[project_id].add(user_id)
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'errors': [{'row': number, 'error': error} for number, error in sorted(self.errors)],
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows / self.seconds) if self.seconds else 0,
+        }
@@ -0,0 +1,223 @@
+import json
+import time
+import random
+import logging
+import threading
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import post_save, post_delete
+
+logger = logging.getLogger('taskmaster.instrumentation')
+
+# Métricas de la petición que se está atendiendo (None si no se mide)
+current_request = ContextVar('taskmaster_request_metrics', default=None)
+
+# Límites (en ms) de los cubos de los histogramas
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+
+class Histogram:
+    # Histograma acumulado con cubos fijos
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): n for bound, n in zip(BUCKETS, self.buckets)},
+        }
+
+
+class MetricsRegistry:
+    # Guarda en memoria del proceso los histogramas y contadores de cada vista
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, group, name, value):
+        with self.lock:
+            self.histograms.setdefault(group, {}).setdefault(name, Histogram()).observe(value)
+
+    def increment(self, group, name, value=1):
+        with self.lock:
+            counters = self.counters.setdefault(group, {})
+            counters[name] = counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self.lock:
+            groups = set(self.histograms) | set(self.counters)
+            return {
+                group: {
+                    'histograms': {name: h.as_dict() for name, h in self.histograms.get(group, {}).items()},
+                    'counters': dict(self.counters.get(group, {})),
+                }
+                for group in sorted(groups)
+            }
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+metrics = MetricsRegistry()
+
+
+class RequestMetrics:
+    # Lo que se va midiendo durante una petición
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_start = None
+        self.saves = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # Envoltorio de las consultas (connection.execute_wrapper)
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += (time.perf_counter() - start) * 1000
+
+
+def is_enabled():
+    return getattr(settings, 'INSTRUMENTATION_ENABLED', False)
+
+
+def wrap_connections(stack, request_metrics):
+    # Mide las consultas de todas las conexiones del hilo actual hasta que se cierre stack
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(request_metrics))
+
+
+def view_name(request):
+    # Nombre de la clase de la vista que ha atendido la petición
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'view_class', None)
+    return view_class.__name__ if view_class else match.func.__name__
+
+
+class InstrumentationMiddleware:
+    # Middleware que mide consultas, tiempo de base de datos, de plantilla y guardados por vista.
+    # Solo actúa si INSTRUMENTATION_ENABLED está activo y en la fracción de peticiones de INSTRUMENTATION_SAMPLE_RATE.
+    # Con ASGI no obliga a pasar las vistas asíncronas a un hilo
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        request_metrics = RequestMetrics()
+        token = current_request.set(request_metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                wrap_connections(stack, request_metrics)
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.record(request, response, request_metrics, (time.perf_counter() - start) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        request_metrics = RequestMetrics()
+        token = current_request.set(request_metrics)
+        start = time.perf_counter()
+        stack = ExitStack()
+        try:
+            # Las consultas de las vistas asíncronas se hacen en el hilo de sync_to_async de la petición,
+            # con sus propias conexiones: las envolvemos desde ese hilo
+            await sync_to_async(wrap_connections)(stack, request_metrics)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            current_request.reset(token)
+        self.record(request, response, request_metrics, (time.perf_counter() - start) * 1000)
+        return response
+
+    def sampled(self):
+        return is_enabled() and random.random() < getattr(settings, 'INSTRUMENTATION_SAMPLE_RATE', 1.0)
+
+    def process_template_response(self, request, response):
+        # Se llama justo antes de renderizar la plantilla; el callback marca el final
+        request_metrics = current_request.get()
+        if request_metrics is not None:
+            request_metrics.template_start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: _template_rendered(request_metrics))
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        view = view_name(request)
+        metrics.observe(view, 'duration_ms', duration)
+        metrics.observe(view, 'db_time_ms', request_metrics.db_time)
+        metrics.observe(view, 'template_ms', request_metrics.template_time)
+        metrics.increment(view, 'requests')
+        metrics.increment(view, 'queries', request_metrics.queries)
+        for model, saves in request_metrics.saves.items():
+            metrics.increment(view, f'{model}_saves', saves)
+
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration, 3),
+            'queries': request_metrics.queries,
+            'db_time_ms': round(request_metrics.db_time, 3),
+            'template_ms': round(request_metrics.template_time, 3),
+            'saves': request_metrics.saves,
+        }))
+
+
+def _template_rendered(request_metrics):
+    if request_metrics.template_start is not None:
+        request_metrics.template_time += (time.perf_counter() - request_metrics.template_start) * 1000
+        request_metrics.template_start = None
+
+
+def count_save(sender, **kwargs):
+    # Contamos los guardados y borrados de modelos durante la petición medida
+    request_metrics = current_request.get()
+    if request_metrics is not None:
+        name = sender.__name__.lower()
+        request_metrics.saves[name] = request_metrics.saves.get(name, 0) + 1
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready
+    from .models import Project, Task
+    for model in (Project, Task):
+        post_save.connect(count_save, sender=model, dispatch_uid=f'instrumentation_save_{model.__name__}')
+        post_delete.connect(count_save, sender=model, dispatch_uid=f'instrumentation_delete_{model.__name__}')
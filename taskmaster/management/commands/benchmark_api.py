@@ -0,0 +1,125 @@
+import gzip
+import html
+import json
+import re
+import time
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from taskmaster.models import Project, Task
+from .benchmark_views import percentile
+
+
+class Command(BaseCommand):
+    # Comando que compara la API JSON con la lista de tareas en HTML recorriendo todas las páginas de un
+    # proyecto grande. Trabaja sobre una base de datos de pruebas nueva, nunca sobre los datos reales
+    help = "Mide tareas por segundo, latencia por página y bytes enviados de la API frente a task_list"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help="Tareas del proyecto")
+        parser.add_argument('--users', type=int, default=10, help="Colaboradores entre los que se reparten las tareas")
+        parser.add_argument('--rounds', type=int, default=3, help="Recorridos completos por vista; el primero con la caché vacía")
+        parser.add_argument('--output', default='bench_api.json', help="Fichero JSON con los resultados")
+        parser.add_argument('--keepdb', action='store_true', help="No borrar la base de datos de pruebas al terminar")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['output']}")
+
+    def run(self, options):
+        cache.clear()
+        owner = User.objects.create_user(username='bench_api')
+        users = [User.objects.create_user(username=f'bench_api_{i}') for i in range(options['users'])]
+        project = Project.objects.create(title="API", description="Descripción del proyecto " * 20, deadline=date.today(), owner=owner)
+        project.collaborators.add(*users)
+        statuses = [value for value, _ in Task.STATUS_CHOICES]
+        Task.objects.bulk_create([
+            Task(
+                project=project, title=f"Tarea {i}", description="Descripción de la tarea",
+                status=statuses[i % len(statuses)], assigned_to=users[i % len(users)] if users else None,
+                rank=(i + 1) * Task.RANK_GAP,
+            )
+            for i in range(options['tasks'])
+        ], batch_size=1000)
+        for status in Project.COUNTER_FIELDS:
+            Project.update_task_counters(project.id, status, Task.objects.filter(project=project, status=status).count())
+
+        client = Client()
+        client.force_login(owner)
+        page_size = settings.TASKS_MAX_PAGE_SIZE
+        # Cada vista devuelve la query string de la página siguiente, o None en la última
+        views = {
+            'task_list': (reverse('task_list', args=[project.id]), self.html_next_query),
+            'api_tasks': (reverse('api_project_tasks', args=[project.id]), self.api_next_query),
+        }
+        results = {'vendor': connection.vendor, 'tasks': options['tasks'], 'page_size': page_size}
+        for name, (url, next_page) in views.items():
+            results[name] = self.walk(client, url, next_page, page_size, options)
+            self.stdout.write(
+                f"{name}: {results[name]['tasks_per_second']} tareas/s, p50 {results[name]['p50_ms']} ms por página, "
+                f"p95 {results[name]['p95_ms']} ms, {results[name]['kb_per_walk']} KB por recorrido "
+                f"({results[name]['kb_per_walk_gzip']} KB con gzip)"
+            )
+        return results
+
+    def walk(self, client, url, next_page, page_size, options):
+        # Recorre todas las páginas siguiendo el cursor de cada respuesta
+        timings = []
+        walks = []
+        for round_number in range(options['rounds']):
+            if round_number == 0:
+                cache.clear()
+            sizes = {'identity': 0, 'gzip': 0}
+            start = time.perf_counter()
+            for encoding in ('identity', 'gzip'):
+                query = f'page_size={page_size}'
+                while query:
+                    page_start = time.perf_counter()
+                    response = client.get(f"{url}?{query}", HTTP_ACCEPT_ENCODING=encoding)
+                    timings.append((time.perf_counter() - page_start) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{url} ha respondido {response.status_code}")
+                    sizes[encoding] += len(response.content)
+                    query = next_page(response)
+            walks.append((time.perf_counter() - start, sizes))
+
+        timings.sort()
+        # Cada vuelta recorre el proyecto dos veces, sin y con gzip
+        seconds = sum(elapsed for elapsed, _ in walks)
+        return {
+            'pages': len(timings) // (2 * options['rounds']),
+            'tasks_per_second': round(2 * options['rounds'] * options['tasks'] / seconds, 1),
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'kb_per_walk': round(walks[-1][1]['identity'] / 1024, 1),
+            'kb_per_walk_gzip': round(walks[-1][1]['gzip'] / 1024, 1),
+        }
+
+    def html_next_query(self, response):
+        # El enlace "Siguientes" de task_list.html
+        match = re.search(r'href="\?([^"]*)">Siguientes<', self.body(response).decode())
+        return html.unescape(match.group(1)) if match else None
+
+    def api_next_query(self, response):
+        next_url = json.loads(self.body(response))['next']
+        return next_url.split('?', 1)[1] if next_url else None
+
+    def body(self, response):
+        if response.get('Content-Encoding') == 'gzip':
+            return gzip.decompress(response.content)
+        return response.content
@@ -0,0 +1,104 @@
+import json
+import random
+import time
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from taskmaster import board
+from taskmaster.models import Project, Task
+from .benchmark_views import percentile
+
+
+class Command(BaseCommand):
+    # Comando que mide cuánto cuesta mover una tarea en columnas grandes del tablero.
+    # Trabaja sobre una base de datos de pruebas nueva, nunca sobre los datos reales
+    help = "Mide p50/p95/p99 y consultas de los movimientos del tablero con columnas de muchas tareas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help="Tareas de la columna")
+        parser.add_argument('--moves', type=int, default=200, help="Movimientos a medir")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_board.json', help="Fichero JSON con los resultados")
+        parser.add_argument('--keepdb', action='store_true', help="No borrar la base de datos de pruebas al terminar")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            # Sin hilos en segundo plano: el reparto de las columnas también cuenta en la medida
+            with override_settings(ALLOWED_HOSTS=['testserver'], BACKGROUND_WORKERS=0):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['output']}")
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        user = User.objects.create_user(username='bench_board')
+        project = Project.objects.create(title="Tablero", description="-", deadline=date.today(), owner=user)
+        Task.objects.bulk_create([
+            Task(project=project, title=f"Tarea {i}", status='TODO', rank=(i + 1) * Task.RANK_GAP)
+            for i in range(options['tasks'])
+        ], batch_size=1000)
+        ids = list(Task.objects.filter(project=project).order_by('rank', 'id').values_list('id', flat=True))
+
+        client = Client()
+        client.force_login(user)
+        timings = []
+        queries = 0
+        rows_written = 0
+        for _ in range(options['moves']):
+            # Una tarea cualquiera a un hueco cualquiera de la misma columna
+            task_id = ids.pop(rng.randrange(len(ids)))
+            index = rng.randrange(len(ids) + 1)
+            previous = ids[index - 1] if index > 0 else None
+            following = ids[index] if index < len(ids) else None
+            ids.insert(index, task_id)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.post(
+                    reverse('task_move', args=[task_id]),
+                    json.dumps({'status': 'TODO', 'previous': previous, 'next': following}),
+                    content_type='application/json',
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                self.stderr.write(f"El movimiento de {task_id} ha respondido {response.status_code}")
+            queries = max(queries, len(captured))
+            rows_written = max(rows_written, sum(
+                query['sql'].startswith('UPDATE') and 'taskmaster_task' in query['sql'].split('SET')[0] for query in captured
+            ))
+
+        # El orden guardado tiene que coincidir con el de los movimientos
+        stored = list(Task.objects.filter(project=project).order_by('rank', 'id').values_list('id', flat=True))
+        start = time.perf_counter()
+        board.rebalance(project.id, 'TODO')
+        rebalance_ms = (time.perf_counter() - start) * 1000
+
+        timings.sort()
+        results = {
+            'vendor': connection.vendor,
+            'tasks': options['tasks'],
+            'moves': options['moves'],
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': queries,
+            'task_updates_per_move': rows_written,
+            'order_ok': stored == ids,
+            'rebalance_ms': round(rebalance_ms, 3),
+        }
+        self.stdout.write(
+            f"{options['tasks']} tareas: p50 {results['p50_ms']} ms, p95 {results['p95_ms']} ms, p99 {results['p99_ms']} ms, "
+            f"{queries} consultas, orden {'correcto' if results['order_ok'] else 'INCORRECTO'}, "
+            f"reparto completo {results['rebalance_ms']} ms"
+        )
+        return results
@@ -0,0 +1,72 @@
+import copy
+import json
+import time
+import statistics
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from mysite.db_pool import pool_stats
+
+
+class Command(BaseCommand):
+    # Comando que compara la latencia por petición abriendo una conexión nueva cada vez (handshake),
+    # con conexiones persistentes y con el pool de conexiones. Con SQLite sirve como sustituto local de MySQL
+    help = "Compara conexión por petición, conexiones persistentes y pool de conexiones"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help="Alias de la base de datos a usar")
+        parser.add_argument('--requests', type=int, default=200, help="Peticiones simuladas por modo")
+        parser.add_argument('--query', default='SELECT 1', help="Consulta que lanza cada petición")
+        parser.add_argument('--output', help="Fichero JSON donde guardar los resultados")
+
+    def handle(self, *args, **options):
+        base = connections[options['database']].settings_dict
+        pooled_engines = settings.POOLED_ENGINES
+        plain_engines = {pooled: plain for plain, pooled in pooled_engines.items()}
+        plain_engine = plain_engines.get(base['ENGINE'], base['ENGINE'])
+
+        modes = {
+            'per_request': {'ENGINE': plain_engine, 'CONN_MAX_AGE': 0},
+            'persistent': {'ENGINE': plain_engine, 'CONN_MAX_AGE': 60},
+        }
+        if plain_engine in pooled_engines:
+            modes['pooled'] = {'ENGINE': pooled_engines[plain_engine], 'CONN_MAX_AGE': 0}
+
+        results = {}
+        for mode, overrides in modes.items():
+            settings_dict = copy.deepcopy(base)
+            settings_dict.update(overrides)
+            alias = f'benchmark_{mode}'
+            results[mode] = self.measure(load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, alias), options)
+            self.stdout.write(
+                f"{mode}: media {results[mode]['mean_ms']} ms, p50 {results[mode]['p50_ms']} ms, p95 {results[mode]['p95_ms']} ms"
+            )
+            if mode == 'pooled':
+                results[mode]['pool'] = pool_stats().get(alias)
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+
+    def measure(self, wrapper, options):
+        # Simulamos el ciclo de una petición: request_started, una consulta y request_finished
+        timings = []
+        for _ in range(options['requests']):
+            start = time.perf_counter()
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute(options['query'])
+                cursor.fetchall()
+            wrapper.close_if_unusable_or_obsolete()
+            timings.append((time.perf_counter() - start) * 1000)
+        wrapper.close()
+
+        timings.sort()
+        return {
+            'mean_ms': round(statistics.mean(timings), 4),
+            'p50_ms': round(timings[len(timings) // 2], 4),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        }
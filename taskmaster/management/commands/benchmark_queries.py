@@ -0,0 +1,89 @@
+import json
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from taskmaster.models import Project, Task
+
+
+def hot_queries(user, project_id):
+    # Consultas más frecuentes de las vistas y formularios
+    return {
+        'project_tasks_done': Task.objects.filter(project_id=project_id, status='DONE'),
+        'user_projects': Project.objects.filter(Q(owner=user) | Q(id__in=user.collaborated_projects.values('id'))).order_by('deadline'),
+        'owner_projects_by_deadline': Project.objects.filter(owner=user).order_by('deadline'),
+        'assigned_tasks_todo': Task.objects.filter(assigned_to=user, status='TODO'),
+        'project_task_page': Task.objects.filter(project_id=project_id, id__gt=0).order_by('id')[:50],
+    }
+
+
+def measure(queryset, repeat):
+    # Ejecutamos la consulta varias veces y guardamos las latencias en milisegundos
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        list(queryset.all())
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'min_ms': round(timings[0], 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'explain': queryset.explain(),
+    }
+
+
+class Command(BaseCommand):
+    # Comando que mide el plan y la latencia de las consultas más usadas sobre las tareas.
+    # Trabaja sobre una base de datos de pruebas nueva, nunca sobre los datos reales
+    help = "Mide el plan y la latencia de las consultas más usadas sobre las tareas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--projects', type=int, default=500)
+        parser.add_argument('--tasks-per-project', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_output.json', help="Fichero JSON con los resultados")
+        parser.add_argument('--keepdb', action='store_true', help="No borrar la base de datos de pruebas al terminar")
+
+    def handle(self, *args, **options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['output']}")
+
+    def run(self, options):
+        # seed_tasks ya deja al día los contadores, las posiciones, el índice de búsqueda y el resumen de los informes
+        self.stdout.write(
+            f"Creando {options['users']} usuarios, {options['projects']} proyectos y "
+            f"{options['projects'] * options['tasks_per_project']} tareas..."
+        )
+        call_command(
+            'seed_tasks', users=options['users'], projects=options['projects'], tasks_per_project=options['tasks_per_project'],
+            batch_size=options['batch_size'], seed=options['seed'], prefix='bench_', stdout=StringIO(),
+        )
+        project = Project.objects.select_related('owner').order_by('id').first()
+
+        queries = {}
+        for name, queryset in hot_queries(project.owner, project.id).items():
+            queries[name] = measure(queryset, options['repeat'])
+            self.stdout.write(f"{name}: mediana {queries[name]['median_ms']} ms, p95 {queries[name]['p95_ms']} ms")
+        return {
+            'vendor': connection.vendor,
+            'users': options['users'],
+            'projects': options['projects'],
+            'tasks_per_project': options['tasks_per_project'],
+            'queries': queries,
+        }
@@ -0,0 +1,135 @@
+import json
+import time
+import tracemalloc
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from taskmaster.models import Project, Task
+
+
+def percentile(values, fraction):
+    # Percentil por el método del rango más cercano sobre una lista ordenada
+    index = max(0, min(len(values) - 1, round(fraction * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def compare(results, baseline, tolerance):
+    # Devuelve la lista de regresiones: p95 por encima de la tolerancia o más consultas que antes
+    regressions = []
+    for size, views in results['sizes'].items():
+        for view, current in views.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(view)
+            if previous is None:
+                continue
+            if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{view} ({size}): p95 {current['p95_ms']} ms > {previous['p95_ms']} ms")
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{view} ({size}): {current['queries']} consultas > {previous['queries']}")
+    return regressions
+
+
+class Command(BaseCommand):
+    # Comando que mide latencia, consultas y memoria de las vistas principales con datos de distinto tamaño.
+    # Trabaja sobre una base de datos de pruebas nueva, nunca sobre los datos reales
+    help = "Mide p50/p95/p99, consultas por petición y memoria de las vistas de taskmaster"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,500', help="Número de proyectos de cada conjunto de datos, separados por comas")
+        parser.add_argument('--tasks-per-project', type=int, default=100)
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=50, help="Peticiones por vista y tamaño")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='bench_views.json', help="Fichero JSON con los resultados")
+        parser.add_argument('--baseline', help="Resultados anteriores con los que comparar")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Empeoramiento del p95 permitido (0.2 = 20%%)")
+        parser.add_argument('--keepdb', action='store_true', help="No borrar la base de datos de pruebas al terminar")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb'])
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                results = {'vendor': connection.vendor, 'sizes': {}}
+                for size in sizes:
+                    results['sizes'][str(size)] = self.run_size(size, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(f"Resultados guardados en {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare(results, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError("Regresiones de rendimiento:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la referencia"))
+
+    def run_size(self, size, options):
+        # Generamos los datos desde cero y medimos cada vista
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        call_command(
+            'seed_tasks', users=options['users'], projects=size, tasks_per_project=options['tasks_per_project'],
+            seed=options['seed'], prefix='bench_', stdout=StringIO(),
+        )
+        # Medimos como el creador del primer proyecto
+        project = Project.objects.select_related('owner').order_by('id').first()
+        user = project.owner
+        task = project.tasks.order_by('id').first()
+        client = Client()
+        client.force_login(user)
+
+        statuses = [value for value, _ in Task.STATUS_CHOICES]
+        task_form = {'project': project.id, 'title': 'Benchmark', 'description': '', 'status': 'TODO', 'priority': 'M', 'assigned_to': user.id}
+        views = {
+            'project_list': lambda i: client.get(reverse('project_list')),
+            'task_list': lambda i: client.get(reverse('task_list', args=[project.id])),
+            'task_status': lambda i: client.post(reverse('task_status', args=[task.id, statuses[i % len(statuses)]])),
+            'task_create': lambda i: client.post(reverse('task_create'), task_form),
+            'task_update': lambda i: client.post(reverse('task_update', args=[task.id]), task_form),
+        }
+
+        results = {}
+        for name, request in views.items():
+            results[name] = self.measure(name, request, options['requests'])
+            self.stdout.write(
+                f"[{size}] {name}: p50 {results[name]['p50_ms']} ms, p95 {results[name]['p95_ms']} ms, "
+                f"p99 {results[name]['p99_ms']} ms, {results[name]['queries']} consultas, {results[name]['peak_kb']} KB"
+            )
+        return results
+
+    def measure(self, name, request, repeat):
+        timings = []
+        queries = 0
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = request(i)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                raise CommandError(f"{name} ha respondido {response.status_code}")
+            queries = max(queries, len(captured))
+
+        # La memoria se mide aparte porque tracemalloc ralentiza las peticiones
+        tracemalloc.start()
+        request(repeat)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
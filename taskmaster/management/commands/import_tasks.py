@@ -0,0 +1,47 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from taskmaster.importer import FORMATS, TaskImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    # Comando que importa tareas desde un fichero CSV o NDJSON con los mismos permisos que TaskForm:
+    # solo en proyectos del usuario y asignadas al creador o a un colaborador
+    help = "Importa tareas en bloque desde un fichero CSV o NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichero con las tareas (mismas columnas que la exportación)")
+        parser.add_argument('--user', required=True, help="Usuario que importa las tareas")
+        parser.add_argument('--format', choices=FORMATS, help="Formato del fichero; por defecto sale de la extensión")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Filas validadas e insertadas de cada vez")
+        parser.add_argument('--report', help="Fichero CSV donde guardar los errores de cada fila")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"El usuario {options['user']} no existe")
+        file_format = options['format'] or guess_format(options['path'])
+        if file_format is None:
+            raise CommandError("No se reconoce el formato del fichero, indícalo con --format")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            report = TaskImporter(user, options['batch_size']).run(read_rows(stream, file_format))
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'error'])
+                writer.writerows((error['row'], error['error']) for error in report['errors'])
+        else:
+            for error in report['errors'][:20]:
+                self.stderr.write(f"Fila {error['row']}: {error['error']}")
+            if len(report['errors']) > 20:
+                self.stderr.write(f"... y {len(report['errors']) - 20} errores más (usa --report para verlos todos)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Importadas {report['created']} de {report['rows']} filas en {report['seconds']} s "
+            f"({report['rows_per_second']} filas/s), {len(report['errors'])} errores"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from taskmaster import deletion
+
+
+class Command(BaseCommand):
+    # Comando que termina los borrados de proyectos pendientes, por ejemplo si el proceso que los
+    # estaba haciendo se ha caído. Cada borrado sigue desde el último lote confirmado
+    help = "Termina en primer plano los borrados de proyectos pendientes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help="Filas borradas por sentencia (por defecto DELETION_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        finished = 0
+        for pending in deletion.pending():
+            self.stdout.write(f"Borrando «{pending.title}» ({pending.tasks_deleted}/{pending.total_tasks} tareas)")
+            deletion.run(pending.pk, options['batch_size'])
+            finished += 1
+        self.stdout.write(self.style.SUCCESS(f"Borrados terminados: {finished}"))
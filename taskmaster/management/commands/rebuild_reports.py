@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from taskmaster import reports
+
+
+class Command(BaseCommand):
+    # Comando que vuelve a calcular el resumen de los informes, por ejemplo después de cargar datos con
+    # bulk_create (seed_tasks lo llama al terminar) o si se ha descuadrado por escrituras hechas fuera de la aplicación
+    help = "Reconstruye la tabla WorkloadSummary de los informes de carga de trabajo y avance"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Filas del resumen insertadas por lote")
+
+    def handle(self, *args, **options):
+        created = reports.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Resumen de los informes reconstruido ({created} filas)"))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from taskmaster import search
+from taskmaster.models import Project, SearchTerm, Task
+
+
+class Command(BaseCommand):
+    # Comando que vuelve a crear el índice invertido de la búsqueda, por ejemplo después de cargar datos
+    # con bulk_create (seed_tasks lo llama al terminar). Con MySQL no hace falta: los índices FULLTEXT se mantienen solos
+    help = "Reconstruye la tabla SearchTerm de la búsqueda de proyectos y tareas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Proyectos o tareas indexados por lote")
+
+    def handle(self, *args, **options):
+        if search.backend() != 'index':
+            raise CommandError("La búsqueda usa los índices FULLTEXT de la base de datos, no hay nada que reconstruir")
+        batch_size = options['batch_size']
+        SearchTerm.objects.all().delete()
+
+        for projects in self.batches(Project.objects.only('id', 'title', 'description'), batch_size):
+            SearchTerm.objects.bulk_create([
+                row for project in projects for row in search.index_rows(project.id, None, project.title, project.description)
+            ])
+        tasks_indexed = 0
+        for tasks in self.batches(Task.objects.only('id', 'project_id', 'title', 'description'), batch_size):
+            with transaction.atomic():
+                search.index_tasks(tasks)
+            tasks_indexed += len(tasks)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexados {Project.objects.count()} proyectos y {tasks_indexed} tareas ({SearchTerm.objects.count()} términos)"
+        ))
+
+    def batches(self, queryset, batch_size):
+        # Lotes ordenados por pk, sin OFFSET
+        last_pk = 0
+        while batch := list(queryset.filter(pk__gt=last_pk).order_by('pk')[:batch_size]):
+            yield batch
+            last_pk = batch[-1].pk
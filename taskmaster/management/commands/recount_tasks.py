@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from taskmaster import fragments
+from taskmaster.models import Project, Task
+
+
+class Command(BaseCommand):
+    # Comando que recalcula los contadores de tareas de los proyectos por si se han descuadrado
+    help = "Recalcula los contadores de tareas por estado de los proyectos"
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_ids', nargs='*', type=int, help="Proyectos a recalcular (por defecto todos)")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Proyectos que se actualizan por lote")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        projects = Project.objects.order_by('pk').only('pk', *Project.COUNTER_FIELDS.values())
+        if options['project_ids']:
+            projects = projects.filter(pk__in=options['project_ids'])
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            # Recorremos los proyectos por lotes ordenados por pk, sin OFFSET
+            batch = list(projects.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            fixed += self.recount(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Contadores corregidos en {fixed} proyectos"))
+
+    def recount(self, batch):
+        # Una sola consulta agrupada por proyecto y estado para todo el lote
+        counts = {}
+        rows = (
+            Task.objects.filter(project_id__in=[project.pk for project in batch])
+            .values_list('project_id', 'status')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for project_id, status, total in rows:
+            counts[(project_id, status)] = total
+
+        changed = []
+        for project in batch:
+            dirty = False
+            for status, field in Project.COUNTER_FIELDS.items():
+                value = counts.get((project.pk, status), 0)
+                if getattr(project, field) != value:
+                    setattr(project, field, value)
+                    dirty = True
+            if dirty:
+                # bulk_update no actualiza los auto_now, así que cambiamos updated_at a mano (ETag)
+                project.updated_at = timezone.now()
+                changed.append(project)
+
+        if changed:
+            with transaction.atomic():
+                Project.objects.bulk_update(changed, [*Project.COUNTER_FIELDS.values(), 'updated_at'])
+                fragments.bump(*[project.pk for project in changed])
+        return len(changed)
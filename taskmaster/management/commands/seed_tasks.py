@@ -0,0 +1,162 @@
+import time
+import random
+import multiprocessing
+from datetime import date, timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from taskmaster import membership, reports, search
+from taskmaster.models import Project, Task
+
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+WORDS = ["Revisar", "Diseñar", "Probar", "Documentar", "Desplegar", "Migrar", "Optimizar", "Corregir"]
+
+
+def project_rng(seed, index):
+    # Cada proyecto tiene su propio generador, así los datos son los mismos con uno o varios procesos
+    return random.Random(seed * 1_000_003 + index)
+
+
+def seed_project_tasks(chunk, user_ids, tasks_per_project, batch_size, seed):
+    # Crea las tareas de un grupo de proyectos [(índice, id)] y deja sus contadores cuadrados
+    batch = []
+    counters = []
+    created = 0
+    for index, project_id in chunk:
+        rng = project_rng(seed, index)
+        counts = dict.fromkeys(STATUSES, 0)
+        for i in range(tasks_per_project):
+            status = rng.choice(STATUSES)
+            counts[status] += 1
+            batch.append(Task(
+                project_id=project_id,
+                title=f"{rng.choice(WORDS)} {i}",
+                description=None,
+                status=status,
+                priority=rng.choice(PRIORITIES),
+                assigned_to_id=rng.choice(user_ids),
+                # Posiciones del tablero con huecos, sin consultar la última de cada columna
+                rank=(i + 1) * Task.RANK_GAP,
+            ))
+            if len(batch) >= batch_size:
+                Task.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        counters.append(Project(pk=project_id, **{Project.COUNTER_FIELDS[status]: n for status, n in counts.items()}))
+
+    with transaction.atomic():
+        Task.objects.bulk_create(batch)
+        Project.objects.bulk_update(counters, list(Project.COUNTER_FIELDS.values()), batch_size=batch_size)
+    return created + len(batch)
+
+
+def _init_worker():
+    # Cada proceso abre su propia conexión a la base de datos
+    django.setup()
+    connections.close_all()
+
+
+def _seed_chunk(args):
+    return seed_project_tasks(*args)
+
+
+class Command(BaseCommand):
+    # Comando que genera muchos datos de prueba de golpe para las pruebas de carga
+    help = "Genera usuarios, proyectos y tareas en bloque (bulk_create) para pruebas de carga"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100, help="Usuarios a crear")
+        parser.add_argument('--projects', type=int, default=1000, help="Proyectos a crear")
+        parser.add_argument('--tasks-per-project', type=int, default=100, help="Tareas de cada proyecto")
+        parser.add_argument('--collaborators', type=int, default=3, help="Colaboradores de cada proyecto")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Filas por INSERT")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla para generar siempre los mismos datos")
+        parser.add_argument('--workers', type=int, default=1, help="Procesos que crean las tareas en paralelo")
+        parser.add_argument('--prefix', default='seed_', help="Prefijo de los nombres de usuario")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['projects'] < 0 or options['tasks_per_project'] < 0:
+            raise CommandError("Hace falta al menos un usuario y cantidades no negativas")
+        start = time.perf_counter()
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        user_ids = self.create_users(options['prefix'], options['users'], batch_size)
+        projects, owners = self.create_projects(rng, user_ids, options['projects'], batch_size)
+        self.create_collaborators(rng, user_ids, projects, owners, options['collaborators'], batch_size)
+        tasks = self.create_tasks(projects, user_ids, options, batch_size)
+
+        # bulk_create no lanza señales, así que limpiamos a mano la caché de permisos
+        membership.invalidate(*user_ids)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados {len(user_ids)} usuarios, {len(projects)} proyectos y {tasks} tareas "
+            f"en {elapsed:.1f} s ({tasks / elapsed if elapsed else 0:.0f} tareas/s)"
+        ))
+        self.rebuild_derived()
+
+    def rebuild_derived(self):
+        # Tampoco pasan por las señales el índice de la búsqueda ni el resumen de los informes: los
+        # reconstruimos enteros, así las búsquedas y los informes sobre estos datos no miden tablas vacías
+        start = time.perf_counter()
+        if search.backend() == 'index':
+            call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('rebuild_reports', stdout=self.stdout)
+        self.stdout.write(f"Datos derivados reconstruidos en {time.perf_counter() - start:.1f} s")
+
+    def create_users(self, prefix, amount, batch_size):
+        # Todos comparten una contraseña no utilizable, así no se calcula un hash por usuario
+        password = make_password(None)
+        usernames = [f"{prefix}{i}" for i in range(amount)]
+        User.objects.bulk_create([User(username=username, password=password) for username in usernames], batch_size=batch_size, ignore_conflicts=True)
+        return list(User.objects.filter(username__in=usernames).order_by('id').values_list('id', flat=True))
+
+    def create_projects(self, rng, user_ids, amount, batch_size):
+        # Devuelve [(índice, id)] de los proyectos creados y su creador; MySQL no devuelve los ids en bulk_create
+        last_id = Project.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        today = date.today()
+        Project.objects.bulk_create([
+            Project(
+                title=f"Proyecto {i}",
+                description="Datos de prueba",
+                deadline=today + timedelta(days=rng.randint(1, 365)),
+                owner_id=rng.choice(user_ids),
+            )
+            for i in range(amount)
+        ], batch_size=batch_size)
+        created = list(Project.objects.filter(id__gt=last_id, owner_id__in=user_ids).order_by('id').values_list('id', 'owner_id'))
+        return list(enumerate(project_id for project_id, _ in created)), dict(created)
+
+    def create_collaborators(self, rng, user_ids, projects, owners, amount, batch_size):
+        # Las filas de la tabla intermedia se insertan directamente, sin pasar por project.collaborators.add
+        Through = Project.collaborators.through
+        rows = []
+        for _, project_id in projects:
+            others = [user_id for user_id in rng.sample(user_ids, k=min(amount + 1, len(user_ids))) if user_id != owners[project_id]]
+            rows.extend(Through(project_id=project_id, user_id=user_id) for user_id in others[:amount])
+            if len(rows) >= batch_size:
+                Through.objects.bulk_create(rows, ignore_conflicts=True)
+                rows = []
+        Through.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def create_tasks(self, projects, user_ids, options, batch_size):
+        workers = options['workers']
+        # Cada grupo de proyectos tiene más o menos batch_size tareas
+        per_chunk = max(1, batch_size // max(1, options['tasks_per_project']))
+        chunks = [projects[i:i + per_chunk] for i in range(0, len(projects), per_chunk)]
+        jobs = [(chunk, user_ids, options['tasks_per_project'], batch_size, options['seed']) for chunk in chunks]
+
+        if workers <= 1:
+            return sum(seed_project_tasks(*job) for job in jobs)
+
+        # Cerramos las conexiones antes de crear los procesos para que no las compartan
+        connections.close_all()
+        with multiprocessing.Pool(workers, initializer=_init_worker) as pool:
+            return sum(pool.imap_unordered(_seed_chunk, jobs))
@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_save, pre_save, pre_delete
+from django.contrib.auth.models import User
+
+from .models import Project
+
+# Conjunto de proyectos a los que puede acceder cada usuario (creador o colaborador), cacheado
+
+def cache_key(user_id):
+    return f'taskmaster:membership:{user_id}'
+
+
+def accessible_project_ids(user):
+    # Devolvemos los ids de los proyectos del usuario; se guarda también en el propio objeto
+    # para no volver a ir a la caché dentro de la misma petición
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    ids = getattr(user, '_accessible_project_ids', None)
+    if ids is None:
+        ids = member_project_ids(user.id)
+        user._accessible_project_ids = ids
+    return ids
+
+
+def member_project_ids(user_id):
+    # Igual que accessible_project_ids pero a partir del id, para comprobar a otros usuarios (asignados)
+    key = cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(member_ids_query(user_id))
+        cache.set(key, ids, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300))
+    return ids
+
+
+def member_ids_query(user_id):
+    # Se lee siempre de la base de datos principal: una réplica con retraso dejaría en la caché
+    # permisos antiguos durante MEMBERSHIP_CACHE_TIMEOUT. Los proyectos que se están borrando ya no cuentan
+    owned = Project.objects.using(DEFAULT_DB_ALIAS).filter(owner_id=user_id, deleting=False).values_list('id', flat=True)
+    collaborated = (
+        Project.collaborators.through.objects.using(DEFAULT_DB_ALIAS)
+        .filter(user_id=user_id, project__deleting=False).values_list('project_id', flat=True)
+    )
+    return owned.union(collaborated)
+
+
+async def aaccessible_project_ids(user):
+    # Versión asíncrona de accessible_project_ids
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    ids = getattr(user, '_accessible_project_ids', None)
+    if ids is None:
+        ids = await amember_project_ids(user.id)
+        user._accessible_project_ids = ids
+    return ids
+
+
+async def amember_project_ids(user_id):
+    # Versión asíncrona de member_project_ids
+    key = cache_key(user_id)
+    ids = await cache.aget(key)
+    if ids is None:
+        ids = frozenset([project_id async for project_id in member_ids_query(user_id)])
+        await cache.aset(key, ids, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 300))
+    return ids
+
+
+def can_access(user, project_id):
+    return project_id in accessible_project_ids(user)
+
+
+def is_member(user_id, project_id):
+    return project_id in member_project_ids(user_id)
+
+
+def invalidate(*user_ids):
+    # Borramos ya y otra vez al confirmar la transacción, por si otra petición vuelve a cachear
+    # los datos antiguos mientras tanto
+    keys = [cache_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def project_pre_save(sender, instance, **kwargs):
+    # Si cambia el creador, el anterior también pierde el acceso
+    if instance.pk is not None:
+        old_owner_id = Project.objects.filter(pk=instance.pk).values_list('owner_id', flat=True).first()
+        if old_owner_id != instance.owner_id:
+            invalidate(old_owner_id)
+
+
+def project_post_save(sender, instance, **kwargs):
+    invalidate(instance.owner_id)
+
+
+def project_pre_delete(sender, instance, **kwargs):
+    invalidate(instance.owner_id, *instance.collaborators.values_list('id', flat=True))
+
+
+def collaborators_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # user.collaborated_projects.add(...): solo cambia ese usuario
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate(instance.pk)
+    elif action == 'pre_clear':
+        # Antes de vaciar guardamos quién era colaborador
+        invalidate(*instance.collaborators.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        invalidate(*pk_set)
+
+
+def user_post_save(sender, instance, created, **kwargs):
+    # Un usuario nuevo nunca hereda lo que hubiera en caché con su id
+    if created:
+        invalidate(instance.pk)
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready
+    pre_save.connect(project_pre_save, sender=Project, dispatch_uid='membership_project_pre_save')
+    post_save.connect(project_post_save, sender=Project, dispatch_uid='membership_project_post_save')
+    pre_delete.connect(project_pre_delete, sender=Project, dispatch_uid='membership_project_pre_delete')
+    m2m_changed.connect(collaborators_changed, sender=Project.collaborators.through, dispatch_uid='membership_collaborators')
+    post_save.connect(user_post_save, sender=User, dispatch_uid='membership_user_post_save')
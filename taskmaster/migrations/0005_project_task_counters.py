@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:40
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_task_counters(apps, schema_editor):
+    # Rellenamos los contadores con las tareas que ya existen
+    Project = apps.get_model('taskmaster', 'Project')
+    Task = apps.get_model('taskmaster', 'Task')
+    fields = {'TODO': 'todo_count', 'IN_PROGRESS': 'in_progress_count', 'DONE': 'done_count'}
+    rows = Task.objects.values_list('project_id', 'status').annotate(total=Count('id')).order_by()
+    for project_id, status, total in rows:
+        if status in fields:
+            Project.objects.filter(pk=project_id).update(**{fields[status]: total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0004_alter_task_description_alter_task_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='done_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='todo_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fix_invalid_choices(apps, schema_editor):
+    # Antes TaskUpdateStatus aceptaba cualquier estado; los valores que no caben en las columnas nuevas
+    # se devuelven a su valor por defecto para que el ALTER no falle
+    Project = apps.get_model('taskmaster', 'Project')
+    Task = apps.get_model('taskmaster', 'Task')
+    invalid = Task.objects.exclude(status__in=['TODO', 'IN_PROGRESS', 'DONE'])
+    project_ids = set(invalid.values_list('project_id', flat=True))
+    invalid.update(status='TODO')
+    for project_id in project_ids:
+        # Esas tareas pasan a contar como pendientes
+        todo = Task.objects.filter(project_id=project_id, status='TODO').count()
+        Project.objects.filter(pk=project_id).update(todo_count=todo)
+    Task.objects.exclude(priority__in=['L', 'M', 'H']).update(priority='M')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0005_project_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_invalid_choices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='priority',
+            field=models.CharField(choices=[('L', 'Baja'), ('M', 'Media'), ('H', 'Alta')], default='M', max_length=1),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='status',
+            field=models.CharField(choices=[('TODO', 'Pendiente'), ('IN_PROGRESS', 'En Progreso'), ('DONE', 'Completada')], default='TODO', max_length=11),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['owner', 'deadline'], name='project_owner_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status'], name='task_assigned_status_idx'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:14
+
+import re
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FULLTEXT_INDEXES = {
+    'taskmaster_project': 'project_fulltext_idx',
+    'taskmaster_task': 'task_fulltext_idx',
+}
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    # Con MySQL la búsqueda usa índices FULLTEXT; el resto de bases de datos usan SearchTerm
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name in FULLTEXT_INDEXES.items():
+        schema_editor.execute(f'CREATE FULLTEXT INDEX {name} ON {table} (title, description)')
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, name in FULLTEXT_INDEXES.items():
+        schema_editor.execute(f'DROP INDEX {name} ON {table}')
+
+
+# Copia del tokenizador de taskmaster/search.py tal y como estaba al crear la migración, para que los
+# cambios posteriores en search.py o en SearchTerm no afecten a las bases de datos nuevas
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'o', 'para', 'por',
+    'que', 'se', 'su', 'un', 'una', 'y',
+}
+TERM_MAX_LENGTH = 40
+TITLE_WEIGHT = 3
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [
+        word[:TERM_MAX_LENGTH] for word in re.findall(r'\w+', text)
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def term_weights(title, description):
+    weights = Counter()
+    for word in tokenize(title):
+        weights[word] += TITLE_WEIGHT
+    weights.update(tokenize(description))
+    return weights
+
+
+def fill_search_terms(apps, schema_editor):
+    # Indexamos los proyectos y tareas que ya existen, por lotes
+    if schema_editor.connection.vendor == 'mysql':
+        return
+    Project = apps.get_model('taskmaster', 'Project')
+    Task = apps.get_model('taskmaster', 'Task')
+    SearchTerm = apps.get_model('taskmaster', 'SearchTerm')
+
+    def rows(project_id, task_id, title, description):
+        return [
+            SearchTerm(term=term, project_id=project_id, task_id=task_id, weight=min(weight, 32767))
+            for term, weight in term_weights(title, description).items()
+        ]
+
+    for project_id, title, description in Project.objects.values_list('id', 'title', 'description').iterator():
+        SearchTerm.objects.bulk_create(rows(project_id, None, title, description))
+    batch = []
+    for task_id, project_id, title, description in Task.objects.values_list('id', 'project_id', 'title', 'description').iterator():
+        batch.extend(rows(project_id, task_id, title, description))
+        if len(batch) >= 5000:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0007_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=40)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taskmaster.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taskmaster.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'project'], name='search_term_project_idx')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+        migrations.RunPython(fill_search_terms, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_summary(apps, schema_editor):
+    # Calculamos el resumen de las tareas que ya existen
+    Task = apps.get_model('taskmaster', 'Task')
+    WorkloadSummary = apps.get_model('taskmaster', 'WorkloadSummary')
+    rows = (
+        Task.objects.values_list('project_id', 'assigned_to_id', 'status', 'project__deadline')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    WorkloadSummary.objects.bulk_create([
+        WorkloadSummary(project_id=project_id, assignee=assigned_to_id or 0, status=status, deadline=deadline, count=total)
+        for project_id, assigned_to_id, status, deadline, total in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0008_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkloadSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignee', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('TODO', 'Pendiente'), ('IN_PROGRESS', 'En Progreso'), ('DONE', 'Completada')], max_length=11)),
+                ('deadline', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='taskmaster.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['assignee', 'status'], name='workload_assignee_idx'), models.Index(fields=['deadline', 'status'], name='workload_deadline_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'assignee', 'status'), name='workload_unique_key')],
+            },
+        ),
+        migrations.RunPython(fill_summary, migrations.RunPython.noop),
+    ]
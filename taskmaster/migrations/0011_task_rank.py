@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+RANK_GAP = 1 << 16
+
+
+def rank_existing_tasks(apps, schema_editor):
+    # Con un solo UPDATE: cada columna queda en el orden de los ids y con huecos entre tareas
+    Task = apps.get_model('taskmaster', 'Task')
+    Task.objects.update(rank=F('id') * RANK_GAP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0010_project_deletion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='rank',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(rank_existing_tasks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'rank'], name='task_board_idx'),
+        ),
+    ]
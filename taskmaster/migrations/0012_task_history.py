@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-18 03:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taskmaster', '0011_task_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.PositiveBigIntegerField()),
+                ('task_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('user_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('field', models.CharField(max_length=20)),
+                ('old_value', models.CharField(blank=True, default='', max_length=255)),
+                ('new_value', models.CharField(blank=True, default='', max_length=255)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['task_id', 'timestamp'], name='history_task_idx'), models.Index(fields=['project_id', 'timestamp'], name='history_project_idx')],
+            },
+        ),
+    ]
@@ -1,23 +1,68 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 class Project(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Cambia con el proyecto y con los contadores de sus tareas (ver taskmaster/conditional.py)
+    updated_at = models.DateTimeField(auto_now=True)
     deadline = models.DateField()
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_projects")
     collaborators = models.ManyToManyField(User, related_name="collaborated_projects", blank=True)
+    # Marcado al pedir el borrado: el proyecto desaparece al momento y sus tareas se borran por lotes en segundo plano
+    deleting = models.BooleanField(default=False, editable=False)
+
+    # Contadores de tareas por estado, se mantienen al escribir las tareas
+    todo_count = models.PositiveIntegerField(default=0, editable=False)
+    in_progress_count = models.PositiveIntegerField(default=0, editable=False)
+    done_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Campo contador correspondiente a cada estado de las tareas
+    COUNTER_FIELDS = {
+        "TODO": "todo_count",
+        "IN_PROGRESS": "in_progress_count",
+        "DONE": "done_count",
+    }
+
+    class Meta:
+        indexes = [
+            # Proyectos del usuario ordenados por fecha límite
+            models.Index(fields=['owner', 'deadline'], name='project_owner_deadline_idx'),
+        ]
 
     def __str__(self):
         return self.title
     
     def total_tasks(self):
-        return self.tasks.count()
+        return self.todo_count + self.in_progress_count + self.done_count
     
     def total_tasks_done(self):
-        return self.tasks.filter(status='DONE').count()
+        return self.done_count
+
+    @classmethod
+    def update_task_counters(cls, project_id, status, delta):
+        # Sumamos (o restamos) delta al contador del estado en la base de datos, sin leer la fila
+        field = cls.COUNTER_FIELDS.get(status)
+        if project_id is None or field is None or delta == 0:
+            return
+        cls.objects.filter(pk=project_id).update(**{field: F(field) + delta}, updated_at=timezone.now())
+
+    @classmethod
+    def apply_task_counter_deltas(cls, deltas):
+        # Igual que update_task_counters pero para varios proyectos y estados: {project_id: {status: delta}}
+        # Se lanza un único UPDATE por proyecto con todos sus contadores
+        for project_id, changes in deltas.items():
+            updates = {
+                cls.COUNTER_FIELDS[status]: F(cls.COUNTER_FIELDS[status]) + delta
+                for status, delta in changes.items()
+                if status in cls.COUNTER_FIELDS and delta
+            }
+            if updates:
+                cls.objects.filter(pk=project_id).update(**updates, updated_at=timezone.now())
 
 
 class Task(models.Model):
@@ -36,14 +81,173 @@ class Task(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks', null=False, blank=False)
     title = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
-    status = models.CharField(max_length=255, choices=STATUS_CHOICES, default="TODO")
-    priority = models.CharField(max_length=255, choices=PRIORITY_CHOICES, default="M")
+    status = models.CharField(max_length=11, choices=STATUS_CHOICES, default="TODO")
+    priority = models.CharField(max_length=1, choices=PRIORITY_CHOICES, default="M")
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Posición en su columna del tablero, con huecos entre tareas para poder mover una sin tocar las demás
+    # (ver taskmaster/board.py)
+    rank = models.BigIntegerField(default=0, editable=False)
+
+    # Hueco entre dos tareas consecutivas al añadirlas al final o al reordenar una columna
+    RANK_GAP = 1 << 16
+
+    # Campos cuyo cambio se lee con la fila bloqueada al guardar (contadores, informes e historial)
+    LOCKED_FIELDS = {'status', 'project', 'project_id', 'assigned_to', 'assigned_to_id', 'priority'}
+
+    class Meta:
+        indexes = [
+            # Tareas de un proyecto por estado (contadores, filtros del listado)
+            models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+            # Tareas asignadas a un usuario por estado
+            models.Index(fields=['assigned_to', 'status'], name='task_assigned_status_idx'),
+            # Última modificación de las tareas de un proyecto (ETag y Last-Modified)
+            models.Index(fields=['project', 'updated_at'], name='task_project_updated_idx'),
+            # Columnas del tablero en orden
+            models.Index(fields=['project', 'status', 'rank'], name='task_board_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.project.title})"
-    
+
+    @classmethod
+    def next_rank(cls, project_id, status):
+        # Posición al final de la columna; con el índice task_board_idx es una sola lectura del índice
+        last = cls.objects.filter(project_id=project_id, status=status).aggregate(last=models.Max('rank'))['last']
+        return (last or 0) + cls.RANK_GAP
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guardamos el proyecto y el estado con los que se cargó la tarea para saber qué contadores cambian
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_counter_key = (instance.__dict__.get('project_id'), instance.__dict__.get('status'))
+        # También el asignado, para el resumen de los informes (ver taskmaster/reports.py)
+        if 'assigned_to_id' in instance.__dict__:
+            instance._loaded_assigned_to_id = instance.assigned_to_id
+        # Y la prioridad, para el historial de cambios (ver taskmaster/history.py)
+        if 'priority' in instance.__dict__:
+            instance._loaded_priority = instance.priority
+        return instance
+
+    def _lock_stored_values(self):
+        # Bloquea la fila y devuelve el proyecto y el estado guardados. Lo cargado en memoria puede estar
+        # desfasado (dos peticiones con la misma tarea), así que no nos fiamos de ello para los contadores.
+        # También se actualiza lo cargado para el resumen de los informes y el historial, que se calculan
+        # en las señales de save y delete, ya con la fila bloqueada
+        if self._state.adding:
+            return (None, None)
+        row = Task.objects.select_for_update().filter(pk=self.pk).values_list('project_id', 'status', 'assigned_to_id', 'priority').first()
+        if row is None:
+            # Ya no existe: las señales tampoco tienen nada que restar
+            self._loaded_counter_key = (None, None)
+            return (None, None)
+        project_id, status, self._loaded_assigned_to_id, self._loaded_priority = row
+        self._loaded_counter_key = (project_id, status)
+        return (project_id, status)
+
     def save(self, *args, **kwargs):
-        print("TASK SAVE", self.pk)
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.LOCKED_FIELDS & set(update_fields):
+            # No cambia nada de lo que cuentan los contadores, los informes o el historial
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            old_project_id, old_status = self._lock_stored_values()
+            if self._state.adding and not self.rank:
+                # Las tareas nuevas van al final de su columna
+                self.rank = Task.next_rank(self.project_id, self.status)
+            super().save(*args, **kwargs)
+            if (old_project_id, old_status) != (self.project_id, self.status):
+                Project.update_task_counters(old_project_id, old_status, -1)
+                Project.update_task_counters(self.project_id, self.status, 1)
+        self._loaded_counter_key = (self.project_id, self.status)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            old_project_id, old_status = self._lock_stored_values()
+            result = super().delete(*args, **kwargs)
+            # Si otra petición ya la había borrado no hay nada que restar
+            Project.update_task_counters(old_project_id, old_status, -1)
+        self._loaded_counter_key = (None, None)
+        return result
+
+
+class SearchTerm(models.Model):
+    # Índice invertido de la búsqueda para las bases de datos sin índice de texto completo (ver taskmaster/search.py).
+    # Una fila por palabra de cada proyecto (task vacío) o de cada tarea, con su peso
+    term = models.CharField(max_length=40)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Búsqueda de un término en los proyectos del usuario
+            models.Index(fields=['term', 'project'], name='search_term_project_idx'),
+        ]
+
+
+class WorkloadSummary(models.Model):
+    # Resumen de los informes (ver taskmaster/reports.py): número de tareas por proyecto, asignado y estado.
+    # El asignado es un entero (0 sin asignar) para que la restricción única también cubra las tareas sin
+    # asignar, y la fecha límite se copia del proyecto para calcular los retrasos sin leer los proyectos
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    assignee = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=11, choices=Task.STATUS_CHOICES)
+    deadline = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'assignee', 'status'], name='workload_unique_key'),
+        ]
+        indexes = [
+            # Filas de un usuario (al borrarlo pasan a sin asignar)
+            models.Index(fields=['assignee', 'status'], name='workload_assignee_idx'),
+            # Filas de los proyectos con la fecha límite pasada
+            models.Index(fields=['deadline', 'status'], name='workload_deadline_idx'),
+        ]
+
+
+class ProjectDeletion(models.Model):
+    # Borrado en segundo plano de un proyecto marcado con deleting (ver taskmaster/deletion.py).
+    # Guarda el progreso de cada lote, así que si el proceso se cae se puede seguir donde se quedó
+    project_id = models.PositiveBigIntegerField(unique=True)
+    title = models.CharField(max_length=255)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    total_tasks = models.PositiveIntegerField(default=0)
+    tasks_deleted = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.title
+
+    def progress(self):
+        if self.finished_at:
+            return 100
+        return min(99, self.tasks_deleted * 100 // self.total_tasks) if self.total_tasks else 0
+
+
+class TaskHistory(models.Model):
+    # Historial de cambios de las tareas y de los colaboradores de los proyectos (ver taskmaster/history.py).
+    # Solo se añaden filas. Los ids no son claves ajenas: el historial se conserva al borrar tareas, proyectos
+    # o usuarios, y el borrado en lotes de los proyectos no tiene que pasar por él
+    project_id = models.PositiveBigIntegerField()
+    # Vacío en los cambios del proyecto
+    task_id = models.PositiveBigIntegerField(null=True, blank=True)
+    # Quién hizo el cambio; vacío fuera de una petición (comandos, trabajos en segundo plano)
+    user_id = models.PositiveBigIntegerField(null=True, blank=True)
+    field = models.CharField(max_length=20)
+    old_value = models.CharField(max_length=255, blank=True, default='')
+    new_value = models.CharField(max_length=255, blank=True, default='')
+    timestamp = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Historial de una tarea por fecha
+            models.Index(fields=['task_id', 'timestamp'], name='history_task_idx'),
+            # Historial de un proyecto y sus tareas por fecha
+            models.Index(fields=['project_id', 'timestamp'], name='history_project_idx'),
+        ]
@@ -0,0 +1,209 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from .models import Project, Task, WorkloadSummary
+
+# Informes de carga de trabajo por usuario y de avance por proyecto de toda la organización.
+# Se leen solo de WorkloadSummary, que tiene una fila por (proyecto, asignado, estado) con el número de tareas.
+# Las señales de Task la mantienen al guardar y borrar; las escrituras en bloque (update, bulk_create)
+# llaman a apply_deltas, y el comando rebuild_reports la vuelve a calcular desde cero.
+
+STATUSES = [status for status, _ in Task.STATUS_CHOICES]
+# Campos de Task que cambian la fila del resumen
+TRACKED_FIELDS = {'project', 'project_id', 'assigned_to', 'assigned_to_id', 'status'}
+
+
+def apply_deltas(deltas):
+    # deltas: {(project_id, assigned_to_id, status): delta}. Sumamos en las filas que ya existen y creamos las que faltan
+    missing = {}
+    for (project_id, assigned_to_id, status), delta in deltas.items():
+        if not delta or project_id is None:
+            continue
+        key = (project_id, assigned_to_id or 0, status)
+        if not _add(key, delta) and delta > 0:
+            missing[key] = delta
+    if not missing:
+        return
+    deadlines = dict(Project.objects.filter(id__in={key[0] for key in missing}).values_list('id', 'deadline'))
+    for (project_id, assignee, status), delta in missing.items():
+        if project_id not in deadlines:
+            # El proyecto se ha borrado mientras tanto
+            continue
+        try:
+            with transaction.atomic():
+                WorkloadSummary.objects.create(
+                    project_id=project_id, assignee=assignee, status=status, deadline=deadlines[project_id], count=delta,
+                )
+        except IntegrityError:
+            # Otra petición ha creado la fila a la vez
+            _add((project_id, assignee, status), delta)
+
+
+def _add(key, delta):
+    project_id, assignee, status = key
+    rows = WorkloadSummary.objects.filter(project_id=project_id, assignee=assignee, status=status)
+    if delta < 0:
+        # Si el resumen se ha descuadrado no bajamos de cero; rebuild_reports lo corrige
+        rows = rows.filter(count__gte=-delta)
+    return rows.update(count=F('count') + delta)
+
+
+def rebuild(batch_size=1000):
+    # Recalcula todo el resumen con una consulta agrupada sobre las tareas
+    rows = (
+        Task.objects.values_list('project_id', 'assigned_to_id', 'status', 'project__deadline')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        WorkloadSummary.objects.all().delete()
+        batch = []
+        for project_id, assigned_to_id, status, deadline, total in rows.iterator():
+            batch.append(WorkloadSummary(
+                project_id=project_id, assignee=assigned_to_id or 0, status=status, deadline=deadline, count=total,
+            ))
+            if len(batch) >= batch_size:
+                created += len(WorkloadSummary.objects.bulk_create(batch))
+                batch = []
+        created += len(WorkloadSummary.objects.bulk_create(batch))
+    return created
+
+
+def _with_statuses(rows):
+    # Una columna por estado (todo, in_progress, done) y las pendientes
+    rows = rows.annotate(**{
+        status.lower(): Coalesce(Sum('count', filter=Q(status=status)), 0) for status in STATUSES
+    })
+    return rows.annotate(pending=F('todo') + F('in_progress'))
+
+
+def _with_usernames(rows):
+    # Nombres de los asignados en una sola consulta (0 es sin asignar)
+    ids = [row['assignee'] for row in rows if row['assignee']]
+    usernames = dict(User.objects.filter(id__in=ids).values_list('id', 'username')) if ids else {}
+    for row in rows:
+        row['username'] = usernames.get(row['assignee'])
+    return rows
+
+
+def totals(rows=None):
+    rows = WorkloadSummary.objects.all() if rows is None else rows
+    return rows.aggregate(**{status.lower(): Coalesce(Sum('count', filter=Q(status=status)), 0) for status in STATUSES})
+
+
+def workload_by_user(limit, rows=None):
+    # Tareas de cada asignado por estado, primero los que tienen más pendientes
+    rows = WorkloadSummary.objects.all() if rows is None else rows
+    rows = _with_statuses(rows.values('assignee')).order_by('-pending', 'assignee')
+    return _with_usernames(list(rows[:limit]))
+
+
+def progress_by_project(limit, rows=None):
+    # Tareas de cada proyecto por estado y porcentaje completado, por fecha límite
+    rows = WorkloadSummary.objects.all() if rows is None else rows
+    rows = _with_statuses(rows.values('project_id', 'project__title', 'deadline')).order_by('deadline', 'project_id')
+    rows = list(rows[:limit])
+    for row in rows:
+        total = row['pending'] + row['done']
+        row['progress'] = round(row['done'] / total * 100) if total else 0
+    return rows
+
+
+def overdue(today, limit):
+    # Tareas sin completar de los proyectos con la fecha límite pasada, por asignado y por proyecto
+    rows = WorkloadSummary.objects.filter(deadline__lt=today).exclude(status='DONE')
+    return {
+        'totals': totals(rows),
+        'users': workload_by_user(limit, rows),
+        'projects': progress_by_project(limit, rows),
+    }
+
+
+def task_pre_save(sender, instance, update_fields=None, **kwargs):
+    instance.__dict__.pop('_report_old_key', None)
+    if update_fields is None or TRACKED_FIELDS & set(update_fields):
+        instance._report_old_key = stored_key(instance)
+
+
+def stored_key(instance):
+    # (proyecto, asignado, estado) con los que está guardada la tarea, a partir de lo que se cargó
+    if instance._state.adding:
+        return None
+    project_id, status = getattr(instance, '_loaded_counter_key', (None, None))
+    if None in (project_id, status) or not hasattr(instance, '_loaded_assigned_to_id'):
+        return Task.objects.filter(pk=instance.pk).values_list('project_id', 'assigned_to_id', 'status').first()
+    return (project_id, instance._loaded_assigned_to_id, status)
+
+
+def task_saved(sender, instance, **kwargs):
+    if '_report_old_key' not in instance.__dict__:
+        return
+    old_key = instance.__dict__.pop('_report_old_key')
+    new_key = (instance.project_id, instance.assigned_to_id, instance.status)
+    if old_key != new_key:
+        deltas = defaultdict(int)
+        if old_key:
+            deltas[old_key] -= 1
+        deltas[new_key] += 1
+        apply_deltas(deltas)
+    instance._loaded_assigned_to_id = instance.assigned_to_id
+
+
+def task_pre_delete(sender, instance, origin=None, **kwargs):
+    # Al borrar un proyecto sus filas del resumen se borran en cascada, no hace falta restar tarea a tarea
+    if isinstance(origin, Project) or getattr(origin, 'model', None) is Project:
+        return
+    key = stored_key(instance)
+    if origin is None:
+        if key:
+            apply_deltas({key: -1})
+        return
+    # Un borrado (de una tarea o de un queryset) lanza pre_delete para todas las tareas y después post_delete
+    # para todas: juntamos las restas en el origen y se aplican una sola vez tras borrar la última
+    pending = origin.__dict__.get('_report_deletes')
+    if pending is None or instance.pk in pending['ids']:
+        # Un borrado nuevo, o el reintento de uno que falló a medias
+        pending = origin._report_deletes = {'ids': set(), 'deltas': defaultdict(int)}
+    pending['ids'].add(instance.pk)
+    if key:
+        pending['deltas'][key] -= 1
+
+
+def task_deleted(sender, instance, origin=None, **kwargs):
+    pending = origin.__dict__.get('_report_deletes') if origin is not None else None
+    if pending is None:
+        return
+    pending['ids'].discard(instance.pk)
+    if not pending['ids']:
+        del origin._report_deletes
+        apply_deltas(pending['deltas'])
+
+
+def project_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'deadline' in update_fields):
+        WorkloadSummary.objects.filter(project_id=instance.pk).exclude(deadline=instance.deadline).update(deadline=instance.deadline)
+
+
+def user_deleted(sender, instance, **kwargs):
+    # Sus tareas pasan a estar sin asignar (SET_NULL), sin lanzar las señales de Task
+    rows = WorkloadSummary.objects.filter(assignee=instance.pk)
+    deltas = {(project_id, 0, status): count for project_id, status, count in rows.values_list('project_id', 'status', 'count')}
+    rows.delete()
+    apply_deltas(deltas)
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready. El borrado se calcula en pre_delete, cuando la tarea aún existe, y se
+    # aplica en post_delete
+    pre_save.connect(task_pre_save, sender=Task, dispatch_uid='reports_task_pre_save')
+    post_save.connect(task_saved, sender=Task, dispatch_uid='reports_task_save')
+    pre_delete.connect(task_pre_delete, sender=Task, dispatch_uid='reports_task_pre_delete')
+    post_delete.connect(task_deleted, sender=Task, dispatch_uid='reports_task_delete')
+    post_save.connect(project_saved, sender=Project, dispatch_uid='reports_project_save')
+    post_delete.connect(user_deleted, sender=User, dispatch_uid='reports_user_delete')
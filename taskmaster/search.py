@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, FloatField, Func, Q, Sum, Value
+from django.db.models.signals import post_save
+
+from .models import Project, SearchTerm, Task
+
+# Búsqueda de texto en los títulos y descripciones de proyectos y tareas.
+# Con MySQL se usan los índices FULLTEXT (ver la migración 0008); con el resto de bases de datos
+# se mantiene al guardar un índice invertido en la tabla SearchTerm (término, proyecto, tarea, peso).
+
+# Palabras demasiado comunes para ayudar a encontrar nada
+STOPWORDS = {
+    'a', 'al', 'con', 'de', 'del', 'el', 'en', 'es', 'la', 'las', 'lo', 'los', 'o', 'para', 'por',
+    'que', 'se', 'su', 'un', 'una', 'y',
+}
+TERM_MAX_LENGTH = SearchTerm._meta.get_field('term').max_length
+# Una palabra del título pesa más que una de la descripción
+TITLE_WEIGHT = 3
+
+
+def tokenize(text):
+    # Palabras en minúsculas y sin tildes, así "Diseño" encuentra "diseno" y al revés
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [
+        word[:TERM_MAX_LENGTH] for word in re.findall(r'\w+', text)
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def term_weights(title, description):
+    weights = Counter()
+    for word in tokenize(title):
+        weights[word] += TITLE_WEIGHT
+    weights.update(tokenize(description))
+    return weights
+
+
+def backend():
+    # 'fulltext' con MySQL y 'index' con el resto, salvo que SEARCH_BACKEND diga otra cosa
+    if settings.SEARCH_BACKEND != 'auto':
+        return settings.SEARCH_BACKEND
+    return 'fulltext' if connection.vendor == 'mysql' else 'index'
+
+
+class MatchAgainst(Func):
+    # MATCH (columnas) AGAINST (búsqueda IN BOOLEAN MODE) de MySQL; la búsqueda va como parámetro
+    output_field = FloatField()
+
+    def __init__(self, *columns, query):
+        super().__init__(*columns, Value(query))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        *columns, query = [compiler.compile(expression) for expression in self.get_source_expressions()]
+        sql = f"MATCH ({', '.join(column for column, _ in columns)}) AGAINST ({query[0]} IN BOOLEAN MODE)"
+        return sql, (*[param for _, params in columns for param in params], *query[1])
+
+
+def boolean_query(terms, prefix=False):
+    # Todas las palabras obligatorias, igual que con el índice invertido
+    words = [f'+{term}' for term in terms]
+    if prefix:
+        words[-1] += '*'
+    return ' '.join(words)
+
+
+def search_tasks(terms, project_ids, offset, limit, prefix=False):
+    # Ids de las tareas que contienen todas las palabras, de más a menos relevante. Con project_ids
+    # a None se busca en todos los proyectos (administración) y con prefix la última palabra
+    # puede estar a medio escribir
+    if backend() == 'fulltext':
+        tasks = _scope(Task.objects.all(), 'project_id', project_ids)
+        score = MatchAgainst('title', 'description', query=boolean_query(terms, prefix))
+        tasks = tasks.annotate(score=score).filter(score__gt=0)
+        return list(tasks.order_by('-score', '-id').values_list('id', flat=True)[offset:offset + limit])
+    rows = _ranked_terms(terms, project_ids, 'task_id', prefix, task__isnull=False)
+    return [row['task_id'] for row in rows.order_by('-score', '-task_id')[offset:offset + limit]]
+
+
+def search_projects(terms, project_ids, limit, prefix=False):
+    if backend() == 'fulltext':
+        projects = _scope(Project.objects.all(), 'id', project_ids)
+        score = MatchAgainst('title', 'description', query=boolean_query(terms, prefix))
+        projects = projects.annotate(score=score).filter(score__gt=0)
+        return list(projects.order_by('-score', '-id').values_list('id', flat=True)[:limit])
+    rows = _ranked_terms(terms, project_ids, 'project_id', prefix, task__isnull=True)
+    return [row['project_id'] for row in rows.order_by('-score', '-project_id')[:limit]]
+
+
+def _scope(queryset, field, project_ids):
+    return queryset if project_ids is None else queryset.filter(**{f'{field}__in': project_ids})
+
+
+def _ranked_terms(terms, project_ids, group_by, prefix, **filters):
+    # Cada objeto tiene una fila por término, así que basta con contar las filas para exigir todas las palabras.
+    # Con prefix la última palabra puede coincidir con varios términos, así que se cuenta aparte
+    words = set(terms[:-1] if prefix else terms)
+    matching = Q(term__startswith=terms[-1]) if prefix else Q()
+    if words:
+        matching |= Q(term__in=words)
+    rows = (
+        _scope(SearchTerm.objects.filter(matching, **filters), 'project_id', project_ids)
+        .values(group_by)
+        .annotate(score=Sum('weight'))
+    )
+    if words:
+        rows = rows.annotate(matches=Count('id', filter=Q(term__in=words))).filter(matches=len(words))
+    if prefix:
+        rows = rows.annotate(prefixed=Count('id', filter=Q(term__startswith=terms[-1]))).filter(prefixed__gt=0)
+    return rows
+
+
+def index_rows(project_id, task_id, title, description):
+    return [
+        SearchTerm(term=term, project_id=project_id, task_id=task_id, weight=min(weight, 32767))
+        for term, weight in term_weights(title, description).items()
+    ]
+
+
+def index_tasks(tasks):
+    # Vuelve a indexar las tareas (por ejemplo después de un bulk_create, que no lanza señales)
+    if backend() != 'index' or not tasks:
+        return
+    SearchTerm.objects.filter(task_id__in=[task.id for task in tasks]).delete()
+    rows = [row for task in tasks for row in index_rows(task.project_id, task.id, task.title, task.description)]
+    SearchTerm.objects.bulk_create(rows, batch_size=1000)
+
+
+def index_project(project):
+    if backend() != 'index':
+        return
+    SearchTerm.objects.filter(project_id=project.id, task__isnull=True).delete()
+    SearchTerm.objects.bulk_create(index_rows(project.id, None, project.title, project.description))
+
+
+def project_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'description'} & set(update_fields):
+        index_project(instance)
+
+
+def task_saved(sender, instance, update_fields=None, **kwargs):
+    # Los cambios de estado no tocan el texto, así que no hace falta volver a indexar
+    if update_fields is None or {'title', 'description', 'project', 'project_id'} & set(update_fields):
+        index_tasks([instance])
+
+
+def connect_signals():
+    # Lo llama TaskmasterConfig.ready. Los borrados se hacen solos por las claves ajenas de SearchTerm
+    post_save.connect(project_saved, sender=Project, dispatch_uid='search_project_save')
+    post_save.connect(task_saved, sender=Task, dispatch_uid='search_task_save')
@@ -0,0 +1,56 @@
+// Busca las opciones de los desplegables según se escribe, en lugar de traerlas todas con la página
+document.querySelectorAll("select[data-autocomplete-url]").forEach((select) => {
+    const input = document.createElement("input");
+    const list = document.createElement("ul");
+    let timer = null;
+    input.type = "search";
+    input.placeholder = "Buscar...";
+    input.autocomplete = "off";
+    list.className = "autocomplete__results";
+    select.before(input);
+    input.after(list);
+
+    async function load() {
+        const params = new URLSearchParams({ q: input.value });
+        const forward = select.dataset.autocompleteForward;
+        if (forward) {
+            const field = select.form.elements[forward];
+            if (field && field.value) {
+                params.set(forward, field.value);
+            }
+        }
+        const response = await fetch(`${select.dataset.autocompleteUrl}?${params}`, {
+            headers: { Accept: "application/json" },
+        });
+        if (!response.ok) {
+            return;
+        }
+        const data = await response.json();
+        list.replaceChildren(...data.results.map((result) => {
+            const item = document.createElement("li");
+            item.textContent = result.text;
+            item.addEventListener("click", () => choose(result));
+            return item;
+        }));
+    }
+
+    function choose(result) {
+        let option = select.querySelector(`option[value="${result.id}"]`);
+        if (!option) {
+            option = new Option(result.text, result.id);
+            if (!select.multiple) {
+                select.querySelectorAll("option:not([value=''])").forEach((old) => old.remove());
+            }
+            select.add(option);
+        }
+        option.selected = true;
+        input.value = "";
+        list.replaceChildren();
+    }
+
+    input.addEventListener("input", () => {
+        clearTimeout(timer);
+        timer = setTimeout(load, 250);
+    });
+    input.addEventListener("focus", load);
+});
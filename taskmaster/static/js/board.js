@@ -0,0 +1,58 @@
+// Arrastrar y soltar del tablero: al soltar una tarea se manda su columna y las tareas que la rodean,
+// y el servidor solo cambia la posición de esa tarea
+const board = document.querySelector(".board");
+const notice = document.getElementById("board-notice");
+const csrfToken = board.querySelector("input[name=csrfmiddlewaretoken]").value;
+let dragged = null;
+
+function moveUrl(id) {
+    return board.dataset.moveUrl.replace("/0/", `/${id}/`);
+}
+
+function dropTarget(list, y) {
+    // Primera tarea cuya mitad queda por debajo del cursor
+    return [...list.querySelectorAll(".board__task:not(.board__task--dragging)")].find((item) => {
+        const box = item.getBoundingClientRect();
+        return y < box.top + box.height / 2;
+    });
+}
+
+board.addEventListener("dragstart", (event) => {
+    dragged = event.target.closest(".board__task");
+    dragged.classList.add("board__task--dragging");
+});
+
+board.addEventListener("dragend", () => {
+    dragged.classList.remove("board__task--dragging");
+});
+
+board.addEventListener("dragover", (event) => {
+    const list = event.target.closest(".board__column")?.querySelector(".board__tasks");
+    if (!list || !dragged) {
+        return;
+    }
+    event.preventDefault();
+    const next = dropTarget(list, event.clientY);
+    list.insertBefore(dragged, next || null);
+});
+
+board.addEventListener("drop", async (event) => {
+    event.preventDefault();
+    const column = dragged.closest(".board__column");
+    const previous = dragged.previousElementSibling;
+    const next = dragged.nextElementSibling;
+    const response = await fetch(moveUrl(dragged.dataset.taskId), {
+        method: "POST",
+        headers: { "Content-Type": "application/json", "X-CSRFToken": csrfToken },
+        body: JSON.stringify({
+            status: column.dataset.status,
+            previous: previous ? previous.dataset.taskId : null,
+            next: next ? next.dataset.taskId : null,
+        }),
+    });
+    if (!response.ok) {
+        const data = await response.json();
+        notice.textContent = `${data.error}. Recarga la página para ver el orden actual.`;
+        notice.hidden = false;
+    }
+});
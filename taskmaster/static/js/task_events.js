@@ -0,0 +1,65 @@
+// Cambia el estado de las tareas sin recargar la página y aplica los cambios de los
+// colaboradores que llegan por Server-Sent Events
+const tasksSection = document.querySelector(".tasks__task");
+const statusLabels = JSON.parse(document.getElementById("status-labels").textContent);
+
+function findTask(id) {
+    return tasksSection.querySelector(`article[data-task-id="${id}"]`);
+}
+
+function applyTask(task) {
+    const article = findTask(task.id);
+    if (!article) {
+        return;
+    }
+    if (task.title) {
+        article.querySelector("h2").textContent = task.title;
+    }
+    if (task.status) {
+        article.dataset.status = task.status;
+        article.querySelector(".task__status-label").textContent = statusLabels[task.status];
+        article.querySelectorAll(".task__status form").forEach((form) => {
+            form.hidden = form.dataset.status === task.status;
+        });
+    }
+}
+
+function updateChart(doneTasks) {
+    done_porcentajeChart.data.datasets[0].data = [doneTasks, 100 - doneTasks];
+    done_porcentajeChart.update();
+}
+
+document.addEventListener("submit", async (event) => {
+    const form = event.target;
+    if (!form.matches(".task__status form")) {
+        return;
+    }
+    event.preventDefault();
+    const response = await fetch(form.action, {
+        method: "POST",
+        body: new FormData(form),
+        headers: {"Accept": "application/json"},
+    });
+    if (!response.ok) {
+        // Si algo falla volvemos al envío normal del formulario
+        form.submit();
+        return;
+    }
+    const data = await response.json();
+    applyTask(data.task);
+    updateChart(data.done_tasks);
+});
+
+if (window.EventSource && tasksSection.dataset.eventsUrl) {
+    const source = new EventSource(tasksSection.dataset.eventsUrl);
+    const notice = document.querySelector(".tasks__notice");
+    source.addEventListener("task.updated", (event) => applyTask(JSON.parse(event.data).task));
+    source.addEventListener("task.deleted", (event) => {
+        const article = findTask(JSON.parse(event.data).task.id);
+        if (article) {
+            article.remove();
+        }
+    });
+    source.addEventListener("task.created", () => { notice.hidden = false; });
+    source.addEventListener("tasks.imported", () => { notice.hidden = false; });
+}
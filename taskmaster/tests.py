@@ -1,3 +1,1409 @@
-from django.test import TestCase
+import os
+import gzip
+import json
+import asyncio
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models.signals import pre_delete
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404, HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Project, ProjectDeletion, SearchTerm, Task, TaskHistory, WorkloadSummary
+from .instrumentation import InstrumentationMiddleware, metrics
+from .membership import member_project_ids
+from .views import AsyncProjectDetailView, AsyncProjectListView, AsyncTaskUpdateStatus, TaskEventsView, TaskExportView
+from . import board, deletion, events, fragments, history, reports, search
+from mysite.db_pool import ConnectionPool, PooledDatabaseWrapperMixin, PoolTimeout, find_pool
+from mysite import db_router
+from mysite.static_files import ASGIStaticFiles
+from .management.commands.benchmark_views import compare
 
 # Create your tests here.
+class ProjectListViewTests(TestCase):
+    # Pruebas del listado de proyectos del usuario
+    # Sesión, usuario, ids de proyectos accesibles, validadores HTTP y orden de los proyectos; si las
+    # tarjetas no están en caché, además los proyectos y sus colaboradores
+    MAX_QUERIES = 7
+    CACHED_QUERIES = 4
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.client.force_login(self.user)
+
+    def create_projects(self, amount):
+        # Creamos proyectos propios y colaboraciones con algunas tareas cada uno
+        deadline = date.today() + timedelta(days=30)
+        for i in range(amount):
+            owned = Project.objects.create(title=f"Propio {i}", description="-", deadline=deadline, owner=self.user)
+            owned.collaborators.add(self.other)
+            shared = Project.objects.create(title=f"Compartido {i}", description="-", deadline=deadline, owner=self.other)
+            shared.collaborators.add(self.user)
+            for project in (owned, shared):
+                Task.objects.create(project=project, title="Hecha", status='DONE')
+                Task.objects.create(project=project, title="Pendiente", status='TODO')
+
+    def count_queries(self):
+        # Cargamos la página y devolvemos cuántas consultas ha lanzado
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('project_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_counters_and_split(self):
+        self.create_projects(1)
+        _, response = self.count_queries()
+        owned = response.context['owned_cards']
+        collaborated = response.context['collaborated_cards']
+        self.assertEqual(len(owned), 1)
+        self.assertEqual(len(collaborated), 1)
+        self.assertIn("Propio 0", owned[0])
+        self.assertIn("Compartido 0", collaborated[0])
+        self.assertIn("Hay 2 tareas asignadas", owned[0])
+        self.assertIn("Hay 1 tareas completadas", owned[0])
+
+    def test_constant_number_of_queries(self):
+        self.create_projects(1)
+        few, _ = self.count_queries()
+        self.create_projects(20)
+        many, _ = self.count_queries()
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, self.MAX_QUERIES)
+        cached, _ = self.count_queries()
+        self.assertEqual(cached, self.CACHED_QUERIES)
+
+
+class ProjectTaskCountersTests(TestCase):
+    # Pruebas de los contadores de tareas guardados en el proyecto
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        deadline = date.today() + timedelta(days=30)
+        self.project = Project.objects.create(title="Uno", description="-", deadline=deadline, owner=self.user)
+        self.other_project = Project.objects.create(title="Dos", description="-", deadline=deadline, owner=self.user)
+
+    def counters(self, project):
+        project.refresh_from_db()
+        return (project.todo_count, project.in_progress_count, project.done_count)
+
+    def test_create_change_and_delete(self):
+        task = Task.objects.create(project=self.project, title="Tarea")
+        self.assertEqual(self.counters(self.project), (1, 0, 0))
+
+        task = Task.objects.get(pk=task.pk)
+        task.status = 'DONE'
+        task.save()
+        self.assertEqual(self.counters(self.project), (0, 0, 1))
+
+        task.project = self.other_project
+        task.save()
+        self.assertEqual(self.counters(self.project), (0, 0, 0))
+        self.assertEqual(self.counters(self.other_project), (0, 0, 1))
+
+        task.delete()
+        self.assertEqual(self.counters(self.other_project), (0, 0, 0))
+
+    def test_stale_copies_do_not_skew_counters(self):
+        # Dos peticiones con la misma tarea cargada antes de cualquiera de los cambios (doble clic)
+        task = Task.objects.create(project=self.project, title="Tarea")
+        first, second = Task.objects.get(pk=task.pk), Task.objects.get(pk=task.pk)
+        first.status = second.status = 'DONE'
+        first.save(update_fields=['status', 'updated_at'])
+        second.save(update_fields=['status', 'updated_at'])
+        self.assertEqual(self.counters(self.project), (0, 0, 1))
+        first.delete()
+        second.delete()
+        self.assertEqual(self.counters(self.project), (0, 0, 0))
+
+    def test_status_view_and_delete_view(self):
+        task = Task.objects.create(project=self.project, title="Tarea")
+        self.client.force_login(self.user)
+        self.client.post(reverse('task_status', args=[task.pk, 'IN_PROGRESS']))
+        self.assertEqual(self.counters(self.project), (0, 1, 0))
+
+        self.client.post(reverse('task_status', args=[task.pk, 'NOPE']))
+        self.assertEqual(self.counters(self.project), (0, 1, 0))
+
+        self.client.post(reverse('tasks_delete', args=[task.pk]))
+        self.assertEqual(self.counters(self.project), (0, 0, 0))
+
+    def test_seed_tasks_is_deterministic_and_counted(self):
+        def seeded_statuses(prefix):
+            call_command('seed_tasks', users=3, projects=4, tasks_per_project=5, batch_size=7, seed=1, prefix=prefix, stdout=StringIO())
+            projects = Project.objects.filter(owner__username__startswith=prefix).order_by('id')
+            return [list(project.tasks.order_by('id').values_list('status', flat=True)) for project in projects]
+
+        first = seeded_statuses('a_')
+        self.assertEqual(first, seeded_statuses('b_'))
+        self.assertEqual(sum(len(statuses) for statuses in first), 20)
+        for project in Project.objects.filter(owner__username__startswith='a_'):
+            self.assertEqual(project.total_tasks(), 5)
+            self.assertEqual(project.done_count, project.tasks.filter(status='DONE').count())
+        # También quedan al día el resumen de los informes y el índice de búsqueda
+        self.assertEqual(sum(WorkloadSummary.objects.values_list('count', flat=True)), Task.objects.count())
+        if search.backend() == 'index':
+            self.assertEqual(SearchTerm.objects.filter(task__isnull=False).values('task').distinct().count(), Task.objects.count())
+
+    def test_recount_tasks_repairs_drift(self):
+        Task.objects.create(project=self.project, title="Hecha", status='DONE')
+        Task.objects.create(project=self.project, title="Pendiente")
+        Project.objects.update(todo_count=7, done_count=0)
+        call_command('recount_tasks', stdout=StringIO())
+        self.assertEqual(self.counters(self.project), (1, 0, 1))
+        self.assertEqual(self.counters(self.other_project), (0, 0, 0))
+
+
+class ProjectDetailViewTests(TestCase):
+    # Pruebas de la paginación por cursor de las tareas de un proyecto
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.tasks = [
+            Task.objects.create(project=self.project, title=f"Tarea {i}", status='DONE' if i % 2 else 'TODO')
+            for i in range(5)
+        ]
+        self.client.force_login(self.user)
+        self.url = reverse('task_list', args=[self.project.pk])
+
+    def test_walk_pages_with_cursor(self):
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual(response.context['tasks'], self.tasks[:2])
+        self.assertIsNone(response.context['previous_query'])
+
+        response = self.client.get(f"{self.url}?{response.context['next_query']}")
+        self.assertEqual(response.context['tasks'], self.tasks[2:4])
+
+        response = self.client.get(f"{self.url}?{response.context['next_query']}")
+        self.assertEqual(response.context['tasks'], self.tasks[4:])
+        self.assertIsNone(response.context['next_query'])
+
+        response = self.client.get(f"{self.url}?{response.context['previous_query']}")
+        self.assertEqual(response.context['tasks'], self.tasks[2:4])
+
+    def test_queries_do_not_grow_with_page_size(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url, {'page_size': 1})
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url, {'page_size': 5})
+        self.assertEqual(len(small), len(large))
+
+    def test_filter_by_status(self):
+        response = self.client.get(self.url, {'status': 'DONE'})
+        self.assertEqual(response.context['tasks'], [self.tasks[1], self.tasks[3]])
+        self.assertEqual(response.context['done_tasks'], 40)
+
+
+class AsyncViewsTests(TestCase):
+    # Pruebas de las versiones asíncronas de las vistas
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.tasks = [
+            Task.objects.create(project=self.project, title=f"Tarea {i}", status='DONE' if i % 2 else 'TODO')
+            for i in range(5)
+        ]
+
+    def request(self, method, path, user, **params):
+        request = getattr(self.factory, method)(path, params)
+
+        async def auser():
+            return user
+        request.auser = auser
+        return request
+
+    async def render(self, view, request, **kwargs):
+        response = await view.as_view()(request, **kwargs)
+        if hasattr(response, 'render'):
+            await sync_to_async(response.render)()
+        return response
+
+    async def test_project_list(self):
+        response = await self.render(AsyncProjectListView, self.request('get', '/projects/', self.user))
+        self.assertEqual(len(response.context_data['owned_cards']), 1)
+        self.assertContains(response, "Uno")
+
+        response = await self.render(AsyncProjectListView, self.request('get', '/projects/', AnonymousUser()))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith('/login/'))
+
+    async def test_project_detail_matches_sync_view(self):
+        request = self.request('get', '/projects/tasks/', self.user, page_size=2, status='TODO')
+        response = await self.render(AsyncProjectDetailView, request, pk=self.project.pk)
+        self.assertEqual(response.context_data['tasks'], [self.tasks[0], self.tasks[2]])
+        self.assertEqual(response.context_data['done_tasks'], 40)
+        self.assertEqual(len(response.context_data['task_cards']), 2)
+        self.assertIsNotNone(response.context_data['next_query'])
+
+        with self.assertRaises(Http404):
+            await self.render(AsyncProjectDetailView, self.request('get', '/projects/tasks/', self.other), pk=self.project.pk)
+
+    async def test_update_status(self):
+        task = self.tasks[0]
+        response = await self.render(AsyncTaskUpdateStatus, self.request('post', '/', self.other), pk=task.pk, str_status='DONE')
+        self.assertEqual(response.url, '/projects/')
+        await self.render(AsyncTaskUpdateStatus, self.request('post', '/', self.user), pk=task.pk, str_status='DONE')
+        await task.arefresh_from_db()
+        project = await Project.objects.aget(pk=self.project.pk)
+        self.assertEqual(task.status, 'DONE')
+        self.assertEqual((project.todo_count, project.done_count), (2, 3))
+
+
+class ConditionalGetTests(TestCase):
+    # Pruebas de las respuestas 304 con ETag y Last-Modified
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.task = Task.objects.create(project=self.project, title="Tarea")
+        self.client.force_login(self.user)
+
+    def assertNotModified(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('private', first['Cache-Control'])
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        # No se ha renderizado ninguna plantilla
+        self.assertEqual(second.templates, [])
+        return first
+
+    def test_project_list_changes_with_task_status(self):
+        url = reverse('project_list')
+        first = self.assertNotModified(url)
+        self.client.post(reverse('task_status', args=[self.task.pk, 'DONE']))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_project_detail_changes_with_task_edit(self):
+        url = reverse('task_list', args=[self.project.pk])
+        first = self.assertNotModified(url)
+        self.assertTrue(first.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(f"{url}?status=DONE", HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.task.title = "Otra"
+        self.task.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+
+class TaskEventsTests(TestCase):
+    # Pruebas de los eventos en tiempo real y de las respuestas JSON del cambio de estado
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.task = Task.objects.create(project=self.project, title="Tarea")
+        self.broker = events.InMemoryBroker()
+        patcher = mock.patch.object(events, '_broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client.force_login(self.user)
+
+    def test_status_change_returns_json_and_publishes_on_commit(self):
+        with mock.patch.object(self.broker, 'publish', wraps=self.broker.publish) as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(
+                    reverse('task_status', args=[self.task.pk, 'DONE']), HTTP_ACCEPT='application/json',
+                )
+        self.assertEqual(response.json()['task']['status'], 'DONE')
+        self.assertEqual(response.json()['done_tasks'], 100)
+        project_id, event = publish.call_args.args
+        self.assertEqual((project_id, event['type'], event['task']['id']), (self.project.pk, 'task.updated', self.task.pk))
+
+        response = self.client.post(reverse('task_status', args=[self.task.pk, 'DOING']), HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_broker_delivers_events_from_other_threads(self):
+        queue = self.broker.subscribe(self.project.pk)
+        await sync_to_async(self.broker.publish, thread_sensitive=False)(self.project.pk, {'type': 'task.deleted'})
+        event = await asyncio.wait_for(queue.get(), 1)
+        self.assertEqual(event['type'], 'task.deleted')
+        self.broker.unsubscribe(self.project.pk, queue)
+        self.assertEqual(self.broker.subscribers, {})
+
+    async def test_event_stream(self):
+        request = AsyncRequestFactory().get('/')
+
+        async def auser():
+            return self.user
+        request.auser = auser
+        response = await TaskEventsView.as_view()(request, pk=self.project.pk)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b"retry: 3000\n\n")
+
+        reading = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        self.broker.publish(self.project.pk, {'type': 'task.created', 'task': {'id': 1}})
+        chunk = (await asyncio.wait_for(reading, 1)).decode()
+        self.assertTrue(chunk.startswith("id: 1\nevent: task.created\n"))
+
+    def test_events_need_asgi(self):
+        self.assertEqual(self.client.get(reverse('task_events', args=[self.project.pk])).status_code, 501)
+
+
+class SearchTests(TestCase):
+    # Pruebas de la búsqueda con el índice invertido (SQLite)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.outsider = User.objects.create_user(username='outsider', password='test')
+        self.project = Project.objects.create(title="Rediseño web", description="Nueva página de inicio", deadline=date.today(), owner=self.user)
+        self.hidden = Project.objects.create(title="Diseño ajeno", description="-", deadline=date.today(), owner=self.outsider)
+        self.in_title = Task.objects.create(project=self.project, title="Diseño del logo", description="Colores")
+        self.in_description = Task.objects.create(project=self.project, title="Reunión", description="Hablar del diseño y del logo")
+        self.other = Task.objects.create(project=self.project, title="Diseño de la base de datos")
+        Task.objects.create(project=self.hidden, title="Diseño del logo ajeno")
+        self.client.force_login(self.user)
+
+    def search(self, query, **params):
+        return self.client.get(reverse('search'), {'q': query, **params}, HTTP_ACCEPT='application/json').json()
+
+    def test_ranked_and_scoped_to_accessible_projects(self):
+        results = self.search("diseno LOGO")
+        self.assertEqual([task['id'] for task in results['tasks']], [self.in_title.id, self.in_description.id])
+        self.assertEqual(self.search("diseño")['projects'], [])
+        self.assertEqual([project['id'] for project in self.search("rediseño")['projects']], [self.project.id])
+
+    @override_settings(SEARCH_PAGE_SIZE=2)
+    def test_pagination(self):
+        first = self.search("diseño")
+        self.assertEqual(len(first['tasks']), 2)
+        self.assertEqual(first['next_page'], 2)
+        second = self.search("diseño", page=2)
+        self.assertEqual([task['id'] for task in second['tasks']], [self.in_description.id])
+        self.assertIsNone(second['next_page'])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.in_title.title = "Paleta de colores"
+        self.in_title.save()
+        self.assertEqual([task['id'] for task in self.search("logo")['tasks']], [self.in_description.id])
+
+        terms = SearchTerm.objects.count()
+        self.client.post(reverse('task_status', args=[self.other.pk, 'DONE']))
+        self.assertEqual(SearchTerm.objects.count(), terms)
+
+        self.in_description.delete()
+        self.assertEqual(self.search("logo")['tasks'], [])
+
+    def test_rebuild_command(self):
+        SearchTerm.objects.all().delete()
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search("diseño")['tasks']), 3)
+        self.assertContains(self.client.get(reverse('search'), {'q': "diseño"}), "Rediseño web")
+
+
+class AutocompleteTests(TestCase):
+    # Pruebas del autocompletado de los formularios de proyectos y tareas
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.colleague = User.objects.create_user(username='colega', password='test')
+        self.outsider = User.objects.create_user(username='comercial', password='test')
+        self.project = Project.objects.create(title="Rediseño web", description="-", deadline=date.today(), owner=self.user)
+        self.project.collaborators.add(self.colleague)
+        self.hidden = Project.objects.create(title="Web ajena", description="-", deadline=date.today(), owner=self.outsider)
+        self.client.force_login(self.user)
+
+    def results(self, kind, **params):
+        response = self.client.get(reverse('autocomplete', args=[kind]), params)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_users_by_prefix_and_limit(self):
+        self.assertEqual(self.results('users', q='CO'), ['colega', 'comercial'])
+        self.assertEqual(self.results('users', q='co', limit=1), ['colega'])
+        self.assertEqual(self.results('users', q='own'), [])
+        self.assertEqual(self.results('users', q=''), [])
+        self.assertEqual(self.results('users', q='co', project=self.project.pk), ['colega'])
+        self.assertEqual(self.results('users', project=self.hidden.pk), [])
+
+    def test_projects_scoped_to_accessible(self):
+        self.assertEqual(self.results('projects', q='we'), ["Rediseño web"])
+        self.assertEqual(self.results('projects'), ["Rediseño web"])
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['tasks'])).status_code, 404)
+
+    def test_forms_render_only_selected_choices(self):
+        task = Task.objects.create(project=self.project, title="Logo", assigned_to=self.colleague)
+        response = self.client.get(reverse('task_update', args=[task.pk]))
+        self.assertContains(response, 'js/autocomplete.js')
+        self.assertContains(response, '<option value="%d" selected>colega</option>' % self.colleague.pk, html=True)
+        self.assertNotContains(response, 'comercial')
+        self.assertNotContains(response, 'owner</option>')
+
+    def test_validation_checks_submitted_ids(self):
+        data = {'project': self.project.pk, 'title': "Logo", 'status': 'TODO', 'priority': 'M'}
+        response = self.client.post(reverse('task_create'), {**data, 'assigned_to': self.outsider.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Task.objects.exists())
+        response = self.client.post(reverse('task_create'), {**data, 'project': self.hidden.pk})
+        self.assertEqual(response.status_code, 200)
+        self.client.post(reverse('task_create'), {**data, 'assigned_to': self.colleague.pk})
+        self.assertEqual(Task.objects.get().assigned_to, self.colleague)
+
+
+class AdminTests(TestCase):
+    # Pruebas de los listados de la administración
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='test')
+        self.project = Project.objects.create(title="Rediseño web", description="-", deadline=date.today(), owner=self.admin)
+        self.client.force_login(self.admin)
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:taskmaster_task_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_constant_queries_and_capped_count(self):
+        Task.objects.create(project=self.project, title="Una", assigned_to=self.admin)
+        few, _ = self.changelist_queries()
+        other = Project.objects.create(title="Otro", description="-", deadline=date.today(), owner=self.admin)
+        for i in range(10):
+            Task.objects.create(project=other, title=f"Tarea {i}", assigned_to=self.admin)
+        many, _ = self.changelist_queries()
+        self.assertEqual(few, many)
+
+        with override_settings(ADMIN_COUNT_LIMIT=5):
+            _, response = self.changelist_queries(status__exact='TODO')
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+    def test_search_uses_index_with_prefix(self):
+        Task.objects.create(project=self.project, title="Diseño del logo")
+        Task.objects.create(project=self.project, title="Reunión")
+        _, response = self.changelist_queries(q="dise")
+        self.assertEqual([task.title for task in response.context['cl'].result_list], ["Diseño del logo"])
+
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'term': 'redis', 'app_label': 'taskmaster', 'model_name': 'task', 'field_name': 'project',
+        })
+        self.assertEqual([result['id'] for result in response.json()['results']], [str(self.project.id)])
+
+    def test_bulk_delete_keeps_counters(self):
+        tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}", status='DONE') for i in range(3)]
+        self.client.post(reverse('admin:taskmaster_task_changelist'), {
+            'action': 'delete_selected', '_selected_action': [task.pk for task in tasks[:2]], 'post': 'yes',
+        })
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.done_count, 1)
+
+
+class TaskExportViewTests(TestCase):
+    # Pruebas de la exportación de tareas en CSV y NDJSON
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.hidden = Project.objects.create(title="Dos", description="-", deadline=date.today(), owner=self.other)
+        self.tasks = [
+            Task.objects.create(project=self.project, title=f"Tarea, {i}", status='DONE' if i % 2 else 'TODO', assigned_to=self.user)
+            for i in range(3)
+        ]
+        Task.objects.create(project=self.hidden, title="Oculta")
+        self.client.force_login(self.user)
+
+    def test_csv_is_streamed(self):
+        response = self.client.get(reverse('task_export', args=[self.project.pk]))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,project_id,project,title,description,status,priority,assigned_to')
+        self.assertEqual(lines[1], f'{self.tasks[0].id},{self.project.id},Uno,"Tarea, 0",,TODO,M,owner')
+        self.assertEqual(len(lines), 4)
+
+    def test_ndjson_of_all_projects_with_filters(self):
+        response = self.client.get(reverse('task_export_all'), {'format': 'ndjson', 'status': 'DONE'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.tasks[1].id])
+        self.assertEqual(rows[0]['assigned_to'], 'owner')
+
+    def test_asgi_export_streams_asynchronously(self):
+        request = AsyncRequestFactory().get(reverse('task_export', args=[self.project.pk]))
+        request.user = self.user
+        response = TaskExportView.as_view()(request, pk=self.project.pk)
+        # Si el iterador fuera síncrono el servidor ASGI lo leería entero antes de enviar la primera línea
+        self.assertTrue(response.is_async)
+
+        async def content():
+            return b''.join([chunk async for chunk in response.streaming_content])
+        lines = async_to_sync(content)().decode().splitlines()
+        self.assertEqual(lines[0], 'id,project_id,project,title,description,status,priority,assigned_to')
+        self.assertEqual(lines[1], f'{self.tasks[0].id},{self.project.id},Uno,"Tarea, 0",,TODO,M,owner')
+        self.assertEqual(len(lines), 4)
+
+    def test_other_projects_are_not_exported(self):
+        self.assertEqual(self.client.get(reverse('task_export', args=[self.hidden.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('task_export_all'), {'format': 'xml'}).status_code, 400)
+
+
+class TaskImportTests(TestCase):
+    # Pruebas de la importación de tareas en bloque
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.outsider = User.objects.create_user(username='outsider', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.project.collaborators.add(self.other)
+        self.hidden = Project.objects.create(title="Dos", description="-", deadline=date.today(), owner=self.outsider)
+        self.client.force_login(self.user)
+
+    def test_upload_csv_reports_errors_per_row(self):
+        content = (
+            "project_id,title,status,priority,assigned_to\n"
+            f"{self.project.id},Buena,DONE,H,other\n"
+            f"{self.project.id},Sin permiso,TODO,M,outsider\n"
+            f"{self.hidden.id},Proyecto ajeno,TODO,M,\n"
+            f"{self.project.id},,TODO,M,\n"
+            f"{self.project.id},Estado raro,DOING,M,\n"
+            f"{self.project.id},Sin asignar,,,\n"
+        )
+        upload = SimpleUploadedFile('tareas.csv', content.encode())
+        report = self.client.post(reverse('task_import'), {'file': upload}).json()
+        self.assertEqual((report['rows'], report['created']), (6, 2))
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4, 5])
+
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_count, self.project.done_count), (1, 1))
+        self.assertEqual(Task.objects.get(title="Buena").assigned_to, self.other)
+
+    def test_ndjson_values_of_the_wrong_type_are_row_errors(self):
+        rows = [
+            {'project_id': self.project.id, 'title': "Buena"},
+            {'project_id': self.project.id, 'title': "Lista", 'status': ['DONE']},
+            {'project_id': self.project.id, 'title': "Objeto", 'priority': {'H': 1}},
+            {'project_id': self.project.id, 'title': {'texto': "no"}},
+            {'project_id': self.project.id, 'title': "Descripción", 'description': [1, 2]},
+            {'project_id': [self.project.id], 'title': "Proyecto"},
+        ]
+        upload = SimpleUploadedFile('tareas.ndjson', "".join(json.dumps(row) + "\n" for row in rows).encode())
+        response = self.client.post(reverse('task_import'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 4, 5, 6])
+
+    @override_settings(SEARCH_BACKEND='index')
+    def test_search_terms_point_to_the_new_tasks_without_returned_ids(self):
+        # Como con MySQL: bulk_create no rellena los ids de las tareas
+        upload = SimpleUploadedFile('tareas.csv', f"project_id,title\n{self.project.id},Informe mensual\n".encode())
+        features = type(connection.features)
+        with mock.patch.object(features, 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False):
+            report = self.client.post(reverse('task_import'), {'file': upload}).json()
+        self.assertEqual(report['created'], 1)
+        task = Task.objects.get(title="Informe mensual")
+        self.assertTrue(SearchTerm.objects.filter(task=task, term='informe').exists())
+        self.assertFalse(SearchTerm.objects.filter(project=self.project, task__isnull=True, term='informe').exists())
+
+    def test_users_and_members_are_loaded_once(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.ndjson') as output:
+            for i in range(40):
+                output.write(json.dumps({'project_id': self.project.id, 'title': f"Tarea {i}", 'assigned_to': 'other'}) + "\n")
+            output.flush()
+            member_project_ids(self.user.id)
+            with CaptureQueriesContext(connection) as queries:
+                call_command('import_tasks', output.name, user='owner', batch_size=20, stdout=StringIO())
+        self.assertEqual(self.project.tasks.count(), 40)
+        # Los asignados y los colaboradores se consultan en el primer lote y no en el segundo
+        self.assertEqual(sum('taskmaster_project_collaborators' in query['sql'] for query in queries), 1)
+        self.assertEqual(sum('"auth_user"."username" IN' in query['sql'] for query in queries), 1)
+
+
+class TaskBulkUpdateViewTests(TestCase):
+    # Pruebas del cambio de varias tareas en una sola petición
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.stranger = User.objects.create_user(username='stranger', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.foreign = Project.objects.create(title="Ajeno", description="-", deadline=date.today(), owner=self.stranger)
+        self.tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}") for i in range(3)]
+        self.foreign_task = Task.objects.create(project=self.foreign, title="Ajena")
+        self.client.force_login(self.user)
+
+    def post(self, data):
+        return self.client.post(reverse('task_bulk'), json.dumps(data), content_type='application/json')
+
+    def test_malformed_bodies_are_rejected(self):
+        task_id = self.tasks[0].id
+        for data in (
+            {'task_ids': 5, 'status': 'DONE'},
+            {'task_ids': [task_id, [1]], 'status': 'DONE'},
+            {'task_ids': [task_id], 'status': ['DONE']},
+            {'task_ids': [task_id], 'priority': {'H': 1}},
+            {'task_ids': [task_id], 'assigned_to': [self.user.id]},
+            {'task_ids': [task_id], 'assigned_to': True},
+        ):
+            self.assertEqual(self.post(data).status_code, 400, data)
+        self.assertEqual(Task.objects.get(pk=task_id).status, 'TODO')
+
+    def test_bulk_status_change(self):
+        ids = [task.id for task in self.tasks] + [self.foreign_task.id]
+        response = self.post({'task_ids': ids, 'status': 'DONE'})
+        results = response.json()['results']
+        self.assertEqual(results[str(self.tasks[0].id)], "ok")
+        self.assertNotEqual(results[str(self.foreign_task.id)], "ok")
+        self.assertEqual(Task.objects.filter(status='DONE').count(), 3)
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_count, self.project.done_count), (0, 3))
+        self.foreign.refresh_from_db()
+        self.assertEqual(self.foreign.todo_count, 1)
+
+    def test_bulk_assign_checks_membership(self):
+        response = self.post({'task_ids': [self.tasks[0].id], 'assigned_to': self.stranger.id})
+        self.assertNotEqual(response.json()['results'][str(self.tasks[0].id)], "ok")
+        self.project.collaborators.add(self.stranger)
+        response = self.post({'task_ids': [self.tasks[0].id], 'assigned_to': self.stranger.id})
+        self.assertEqual(response.json()['results'][str(self.tasks[0].id)], "ok")
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].id).assigned_to, self.stranger)
+
+    def test_invalid_change(self):
+        response = self.post({'task_ids': [self.tasks[0].id], 'status': 'NOPE'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(BACKGROUND_WORKERS=0)
+class TaskBoardTests(TestCase):
+    # Pruebas del tablero kanban y de las posiciones con huecos
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}") for i in range(4)]
+        self.done = Task.objects.create(project=self.project, title="Hecha", status='DONE')
+        self.client.force_login(self.user)
+
+    def column(self, status):
+        return list(Task.objects.filter(project=self.project, status=status).order_by('rank', 'id').values_list('id', flat=True))
+
+    def move(self, task, **data):
+        return self.client.post(reverse('task_move', args=[task.pk]), json.dumps(data), content_type='application/json')
+
+    def test_board_columns_in_one_query(self):
+        self.assertEqual(self.column('TODO'), [task.pk for task in self.tasks])
+        with self.assertNumQueries(1):
+            columns = board.columns(self.project.pk, 3)
+        self.assertEqual([task.pk for task in columns['TODO']], [task.pk for task in self.tasks[:3]])
+        self.assertEqual([task.pk for task in columns['DONE']], [self.done.pk])
+        response = self.client.get(reverse('task_board', args=[self.project.pk]))
+        self.assertContains(response, 'data-task-id="%d"' % self.tasks[0].pk)
+        self.assertContains(response, "Pendiente (4)")
+
+    def test_move_with_a_single_neighbour(self):
+        first, second, third, fourth = self.tasks
+        # Solo la de encima: queda justo debajo de ella, no al final de la columna
+        self.move(fourth, status='TODO', previous=first.pk)
+        self.assertEqual(self.column('TODO'), [first.pk, fourth.pk, second.pk, third.pk])
+        # Solo la de debajo
+        self.move(first, status='TODO', next=third.pk)
+        self.assertEqual(self.column('TODO'), [fourth.pk, second.pk, first.pk, third.pk])
+
+    def test_invalid_status_is_rejected(self):
+        response = self.move(self.tasks[0], status=['DONE'])
+        self.assertEqual(response.status_code, 400)
+
+    def test_move_only_updates_the_moved_task(self):
+        first, second, third, fourth = self.tasks
+        ranks = dict(Task.objects.values_list('id', 'rank'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.move(fourth, status='TODO', previous=first.pk, next=second.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column('TODO'), [first.pk, fourth.pk, second.pk, third.pk])
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "taskmaster_task"')]
+        self.assertEqual(len(updates), 1)
+        changed = {pk for pk, rank in Task.objects.values_list('id', 'rank') if ranks[pk] != rank}
+        self.assertEqual(changed, {fourth.pk})
+
+        response = self.move(first, status='DONE', next=self.done.pk)
+        self.assertEqual(self.column('DONE'), [first.pk, self.done.pk])
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.todo_count, self.project.done_count), (3, 2))
+        self.assertEqual(self.move(second, status='TODO', previous=self.done.pk).status_code, 400)
+
+    def test_rebalance_when_gap_runs_out(self):
+        first, second, third, fourth = self.tasks
+        Task.objects.filter(pk=second.pk).update(rank=first.rank + 1)
+        response = self.move(fourth, status='TODO', previous=first.pk, next=second.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.column('TODO'), [first.pk, fourth.pk, second.pk, third.pk])
+        ranks = list(Task.objects.filter(status='TODO').order_by('rank').values_list('rank', flat=True))
+        self.assertTrue(all(high - low >= board.MIN_GAP for low, high in zip(ranks, ranks[1:])))
+
+
+@override_settings(BACKGROUND_WORKERS=0, DELETION_BATCH_SIZE=2)
+class ProjectDeletionTests(TestCase):
+    # Pruebas del borrado de proyectos por lotes en segundo plano
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.colleague = User.objects.create_user(username='colega', password='test')
+        self.project = Project.objects.create(title="Grande", description="-", deadline=date.today(), owner=self.user)
+        self.project.collaborators.add(self.colleague)
+        for i in range(5):
+            Task.objects.create(project=self.project, title=f"Tarea {i}", assigned_to=self.colleague)
+        self.client.force_login(self.user)
+
+    def test_delete_hides_project_and_deletes_in_batches(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('project_delete', args=[self.project.pk]))
+        self.assertRedirects(response, '/projects/', fetch_redirect_response=False)
+        # Antes de que el trabajo empiece el proyecto ya no aparece, pero sus filas siguen ahí
+        self.assertNotIn(self.project.pk, member_project_ids(self.colleague.id))
+        self.assertEqual(self.client.get(reverse('task_list', args=[self.project.pk])).status_code, 404)
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 5)
+        self.assertEqual(self.client.get(reverse('project_deletion', args=[self.project.pk])).json()['progress'], 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(SearchTerm.objects.exists())
+        self.assertFalse(Project.collaborators.through.objects.exists())
+        # Tres lotes de tareas (2 + 2 + 1) con DELETE directos
+        self.assertEqual(sum(query['sql'].startswith('DELETE FROM "taskmaster_task"') for query in queries), 3)
+        data = self.client.get(reverse('project_deletion', args=[self.project.pk])).json()
+        self.assertEqual((data['tasks_deleted'], data['progress'], data['finished']), (5, 100, True))
+
+    def test_only_the_owner_can_delete(self):
+        self.client.force_login(self.colleague)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('project_delete', args=[self.project.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Project.objects.get(pk=self.project.pk).deleting)
+        self.assertEqual(Task.objects.filter(project=self.project).count(), 5)
+
+    def test_resumes_after_crash(self):
+        job = deletion.schedule(self.project, self.user)
+        real_delete_batch = deletion.delete_batch
+        calls = []
+
+        def crash_on_second_task_batch(model, project_id, limit):
+            if model is Task:
+                calls.append(limit)
+                if len(calls) == 2:
+                    raise RuntimeError("caída")
+            return real_delete_batch(model, project_id, limit)
+
+        with mock.patch('taskmaster.deletion.delete_batch', crash_on_second_task_batch):
+            with self.assertRaises(RuntimeError):
+                deletion.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.tasks_deleted, job.progress()), (2, 40))
+        self.assertEqual(deletion.schedule(self.project, self.user), job)
+
+        call_command('process_deletions', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.tasks_deleted, 5)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+
+
+class ApiTests(TestCase):
+    # Pruebas de la API JSON de proyectos y tareas
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='test')
+        self.member = User.objects.create_user(username='member', password='test')
+        self.outsider = User.objects.create_user(username='outsider', password='test')
+        self.project = Project.objects.create(title="Uno", description="Largo", deadline=date.today(), owner=self.owner)
+        self.project.collaborators.add(self.member)
+        self.tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}", assigned_to=self.member) for i in range(3)]
+        self.client.force_login(self.owner)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def test_task_page_embeds_project_and_users_once(self):
+        response = self.client.get(reverse('api_project_tasks', args=[self.project.pk]), {'page_size': 2})
+        data = response.json()
+        self.assertEqual(data['project']['title'], "Uno")
+        self.assertEqual(data['project']['collaborators'], [self.member.pk])
+        self.assertEqual(set(data['users']), {str(self.owner.pk), str(self.member.pk)})
+        self.assertEqual([task['id'] for task in data['tasks']], [task.pk for task in self.tasks[:2]])
+        self.assertNotIn('project', data['tasks'][0])
+        next_page = self.client.get(data['next']).json()
+        self.assertEqual([task['id'] for task in next_page['tasks']], [self.tasks[2].pk])
+        self.assertIsNone(next_page['next'])
+
+    def test_sparse_fields(self):
+        url = reverse('api_project_tasks', args=[self.project.pk])
+        data = self.client.get(url, {'fields': 'title,status', 'fields[projects]': 'title'}).json()
+        self.assertEqual(set(data['tasks'][0]), {'id', 'title', 'status'})
+        self.assertEqual(set(data['project']), {'id', 'title'})
+        # Sin ids de usuario en las filas no se consulta ningún usuario
+        self.assertEqual(data['users'], {})
+        response = self.client.get(url, {'fields': 'title,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_responses_are_compressed(self):
+        response = self.client.get(reverse('api_projects'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['projects'][0]['id'], self.project.pk)
+
+    def test_create_and_patch_task(self):
+        response = self.send('post', reverse('api_project_tasks', args=[self.project.pk]), {'title': "Nueva", 'status': 'TODO', 'priority': 'H'})
+        self.assertEqual(response.status_code, 201)
+        task_id = response.json()['task']['id']
+        response = self.send('patch', reverse('api_task', args=[task_id]), {'status': 'DONE'})
+        self.assertEqual(response.json()['task']['title'], "Nueva")
+        self.assertEqual(response.json()['task']['status'], 'DONE')
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.done_count, 1)
+
+        response = self.send('patch', reverse('api_task', args=[task_id]), {'assigned_to': self.outsider.pk})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.json())
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.send('patch', reverse('api_task', args=[task_id]), {'status': 'TODO'}).status_code, 404)
+
+    def test_only_the_owner_changes_the_project(self):
+        url = reverse('api_project', args=[self.project.pk])
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(url).json()['project']['owner_id'], self.owner.pk)
+        self.assertEqual(self.send('patch', url, {'title': "Otro"}).status_code, 403)
+        self.client.force_login(self.owner)
+        self.assertEqual(self.send('patch', url, {'title': "Otro"}).json()['project']['title'], "Otro")
+        # Otro borrado antes, para que el id del borrado no coincida con el del proyecto
+        ProjectDeletion.objects.create(project_id=self.project.pk + 100, title="Otro", requested_by=self.owner)
+        response = self.client.delete(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['deletion']['project_id'], self.project.pk)
+        self.assertTrue(Project.objects.get(pk=self.project.pk).deleting)
+        self.assertEqual(self.client.get(response.json()['deletion']['url']).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_projects')).status_code, 401)
+
+
+class HistoryTests(TestCase):
+    # Pruebas del historial de cambios y de su escritura en bloque
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='test')
+        self.member = User.objects.create_user(username='member', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.owner)
+        self.project.collaborators.add(self.member)
+        self.tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}") for i in range(3)]
+        self.client.force_login(self.owner)
+
+    def changes(self, **filters):
+        return list(TaskHistory.objects.filter(**filters).order_by('id').values_list('task_id', 'field', 'old_value', 'new_value', 'user_id'))
+
+    def history_inserts(self, queries):
+        return [query for query in queries if query['sql'].startswith('INSERT INTO "taskmaster_taskhistory"')]
+
+    def test_request_changes_are_written_with_one_insert(self):
+        task = self.tasks[0]
+        data = {'status': 'DONE', 'priority': 'H', 'assigned_to': self.member.pk}
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('api_task', args=[task.pk]), json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.history_inserts(queries)), 1)
+        self.assertEqual(self.changes(task_id=task.pk), [
+            (task.pk, 'status', 'TODO', 'DONE', self.owner.pk),
+            (task.pk, 'priority', 'M', 'H', self.owner.pk),
+            (task.pk, 'assigned_to', '', str(self.member.pk), self.owner.pk),
+        ])
+
+    def test_bulk_update_is_recorded_per_task(self):
+        data = {'task_ids': [task.pk for task in self.tasks], 'status': 'IN_PROGRESS'}
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('task_bulk'), json.dumps(data), content_type='application/json')
+        self.assertEqual(len(self.history_inserts(queries)), 1)
+        self.assertEqual(self.changes(), [(task.pk, 'status', 'TODO', 'IN_PROGRESS', self.owner.pk) for task in self.tasks])
+
+    def test_rolled_back_changes_are_not_recorded(self):
+        task = self.tasks[0]
+        with self.captureOnCommitCallbacks(execute=True), history.buffered():
+            try:
+                with transaction.atomic():
+                    task.status = 'DONE'
+                    task.save()
+                    raise ValueError
+            except ValueError:
+                pass
+            self.project.collaborators.remove(self.member)
+        self.assertEqual(self.changes(), [(None, 'collaborators', str(self.member.pk), '', None)])
+
+    def test_middleware_keeps_async_views_async(self):
+        task = self.tasks[0]
+
+        def change_status():
+            task.status = 'DONE'
+            task.save(update_fields=['status', 'updated_at'])
+
+        async def view(request):
+            await sync_to_async(change_status)()
+            return HttpResponse()
+
+        middleware = history.HistoryMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = AsyncRequestFactory().get('/')
+        request.user = self.owner
+        with self.captureOnCommitCallbacks(execute=True):
+            async_to_sync(middleware)(request)
+        self.assertEqual(self.changes(), [(task.pk, 'status', 'TODO', 'DONE', self.owner.pk)])
+
+    @override_settings(HISTORY_PAGE_SIZE=2)
+    def test_history_is_paginated_newest_first(self):
+        task = self.tasks[0]
+        now = timezone.now()
+        TaskHistory.objects.bulk_create([
+            TaskHistory(project_id=self.project.pk, task_id=task.pk, field='status', new_value=str(i), timestamp=now + timedelta(minutes=i))
+            for i in range(3)
+        ])
+        data = self.client.get(reverse('api_task_history', args=[task.pk])).json()
+        self.assertEqual([row['new_value'] for row in data['history']], ['2', '1'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual([row['new_value'] for row in data['history']], ['0'])
+        self.assertIsNone(data['next'])
+
+        outsider = User.objects.create_user(username='outsider', password='test')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(reverse('api_task_history', args=[task.pk])).json()['history'], [])
+
+
+class ReportsTests(TestCase):
+    # Pruebas del resumen de los informes y del panel
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='test', is_staff=True)
+        self.colleague = User.objects.create_user(username='colega', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.late = Project.objects.create(title="Tarde", description="-", deadline=date.today() - timedelta(days=3), owner=self.user)
+        self.project.collaborators.add(self.colleague)
+        self.late.collaborators.add(self.colleague)
+        self.tasks = [Task.objects.create(project=self.project, title=f"Tarea {i}", assigned_to=self.colleague) for i in range(3)]
+        Task.objects.create(project=self.late, title="Retrasada", status='IN_PROGRESS')
+        self.client.force_login(self.user)
+
+    def summary(self):
+        rows = WorkloadSummary.objects.filter(count__gt=0).values_list('project_id', 'assignee', 'status', 'deadline', 'count')
+        return sorted(rows)
+
+    def assertSummaryMatchesRebuild(self):
+        incremental = self.summary()
+        reports.rebuild()
+        self.assertEqual(incremental, self.summary())
+
+    def test_signals_keep_summary_in_sync(self):
+        task = Task.objects.only('id', 'title').get(pk=self.tasks[0].pk)
+        task.status = 'DONE'
+        task.save()
+        self.tasks[1].assigned_to = None
+        self.tasks[1].save()
+        self.tasks[2].project = self.late
+        self.tasks[2].save()
+        self.tasks[2].delete()
+        self.late.deadline = date.today() - timedelta(days=5)
+        self.late.save()
+        self.assertSummaryMatchesRebuild()
+        self.colleague.delete()
+        self.assertSummaryMatchesRebuild()
+        self.late.delete()
+        self.assertSummaryMatchesRebuild()
+
+    def test_bulk_writes_keep_summary_in_sync(self):
+        ids = [task.id for task in self.tasks]
+        self.client.post(reverse('task_bulk'), json.dumps({'task_ids': ids, 'status': 'DONE', 'assigned_to': self.user.id}), content_type='application/json')
+        upload = SimpleUploadedFile("tareas.csv", f"project_id,title,status,assigned_to\n{self.project.id},Nueva,TODO,colega\n".encode())
+        self.client.post(reverse('task_import'), {'file': upload})
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertSummaryMatchesRebuild()
+        call_command('rebuild_reports', stdout=StringIO())
+
+    def test_queryset_delete_updates_summary_once(self):
+        Task.objects.create(project=self.project, title="Hecha", assigned_to=self.colleague, status='DONE')
+        with CaptureQueriesContext(connection) as queries:
+            Task.objects.filter(project=self.project).delete()
+        # Una sola resta por fila del resumen (pendientes y hechas de colega), no una por tarea
+        self.assertEqual(sum(query['sql'].startswith('UPDATE "taskmaster_workloadsummary"') for query in queries), 2)
+        self.assertSummaryMatchesRebuild()
+
+        # Y un borrado que falla a medias no deja restas pendientes para el siguiente
+        task = Task.objects.create(project=self.late, title="Otra", assigned_to=self.colleague)
+        def crash(**kwargs):
+            raise RuntimeError("caída")
+        pre_delete.connect(crash, sender=Task, dispatch_uid='test_crash')
+        try:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                task.delete()
+        finally:
+            pre_delete.disconnect(dispatch_uid='test_crash', sender=Task)
+        task.delete()
+        self.assertSummaryMatchesRebuild()
+
+    def test_dashboard_reads_summary(self):
+        # Sesión, usuario, seis consultas al resumen y los nombres de los asignados
+        with self.assertNumQueries(9):
+            data = self.client.get(reverse('reports'), HTTP_ACCEPT='application/json').json()
+        self.assertEqual(data['totals'], {'todo': 3, 'in_progress': 1, 'done': 0})
+        self.assertEqual([(row['username'], row['todo']) for row in data['users']], [('colega', 3), (None, 0)])
+        self.assertEqual([row['progress'] for row in data['projects']], [0, 0])
+        self.assertEqual(data['overdue']['totals'], {'todo': 0, 'in_progress': 1, 'done': 0})
+        self.assertEqual([row['project__title'] for row in data['overdue']['projects']], ["Tarde"])
+        self.assertContains(self.client.get(reverse('reports')), "Carga de trabajo por usuario")
+
+        self.client.force_login(self.colleague)
+        self.assertEqual(self.client.get(reverse('reports')).status_code, 403)
+
+
+@override_settings(INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SAMPLE_RATE=1.0)
+class InstrumentationTests(TestCase):
+    # Pruebas de las métricas por vista
+
+    def setUp(self):
+        metrics.reset()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.task = Task.objects.create(project=self.project, title="Tarea")
+        self.client.force_login(self.user)
+
+    def test_records_queries_templates_and_saves(self):
+        with self.assertLogs('taskmaster.instrumentation') as logs:
+            self.client.get(reverse('project_list'))
+            self.client.post(reverse('task_status', args=[self.task.pk, 'DONE']))
+        self.assertEqual(json.loads(logs.records[0].getMessage())['view'], 'ProjectListView')
+        snapshot = metrics.snapshot()
+        listing = snapshot['ProjectListView']
+        self.assertEqual(listing['counters']['requests'], 1)
+        self.assertGreater(listing['counters']['queries'], 0)
+        self.assertEqual(listing['histograms']['template_ms']['count'], 1)
+        self.assertEqual(snapshot['TaskUpdateStatus']['counters']['task_saves'], 1)
+
+    @override_settings(INSTRUMENTATION_ENABLED=True, INSTRUMENTATION_SAMPLE_RATE=1.0)
+    def test_async_views_are_measured_without_a_thread(self):
+        async def view(request):
+            await Task.objects.filter(pk=self.task.pk).afirst()
+            return HttpResponse()
+
+        middleware = InstrumentationMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('taskmaster.instrumentation'):
+            async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+        self.assertEqual(metrics.snapshot()['unresolved']['counters']['queries'], 1)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0.0)
+    def test_sampling_rate(self):
+        self.client.get(reverse('project_list'))
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_metrics_endpoint_is_staff_only(self):
+        with self.assertLogs('taskmaster.instrumentation'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+            self.user.is_staff = True
+            self.user.save()
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['MetricsView']['counters']['requests'], 1)
+
+
+class MembershipTests(TestCase):
+    # Pruebas de la caché de proyectos accesibles por usuario
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.task = Task.objects.create(project=self.project, title="Tarea")
+
+    def test_collaborators_invalidate_cache(self):
+        self.assertEqual(member_project_ids(self.other.id), frozenset())
+        self.project.collaborators.add(self.other)
+        self.assertEqual(member_project_ids(self.other.id), {self.project.id})
+        self.other.collaborated_projects.remove(self.project)
+        self.assertEqual(member_project_ids(self.other.id), frozenset())
+
+    def test_owner_change_invalidates_cache(self):
+        self.assertEqual(member_project_ids(self.user.id), {self.project.id})
+        self.project.owner = self.other
+        self.project.save()
+        self.assertEqual(member_project_ids(self.user.id), frozenset())
+        self.assertEqual(member_project_ids(self.other.id), {self.project.id})
+
+    def test_status_check_uses_cache(self):
+        self.client.force_login(self.other)
+        self.client.post(reverse('task_status', args=[self.task.pk, 'DONE']))
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, 'TODO')
+        self.assertEqual(self.client.get(reverse('task_list', args=[self.project.pk])).status_code, 404)
+
+        self.client.force_login(self.user)
+        member_project_ids(self.user.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('task_status', args=[self.task.pk, 'DONE']))
+        self.assertEqual(Task.objects.get(pk=self.task.pk).status, 'DONE')
+        self.assertFalse(any('collaborators' in query['sql'] for query in queries))
+
+
+    def test_only_the_owner_can_edit_the_project(self):
+        self.project.collaborators.add(self.other)
+        url = reverse('project_update', args=[self.project.pk])
+        data = {'title': "Cambiado", 'description': "-", 'deadline': date.today().isoformat()}
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(url, data).status_code, 404)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).title, "Uno")
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertRedirects(self.client.post(url, data), '/projects/', fetch_redirect_response=False)
+        self.assertEqual(Project.objects.get(pk=self.project.pk).title, "Cambiado")
+
+
+class FragmentCacheTests(TestCase):
+    # Pruebas de la caché de tarjetas de proyecto y artículos de tarea
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.other = User.objects.create_user(username='other', password='test')
+        self.project = Project.objects.create(title="Uno", description="-", deadline=date.today(), owner=self.user)
+        self.project.collaborators.add(self.other)
+        self.task = Task.objects.create(project=self.project, title="Tarea")
+        self.url = reverse('task_list', args=[self.project.pk])
+
+    def test_hit_reuses_html_with_fresh_csrf_token(self):
+        self.client.force_login(self.user)
+        first = self.client.get(self.url).context['task_cards'][0]
+        self.client.logout()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url).context['task_cards'][0]
+        # En un acierto no se vuelve a cargar la tarea entera
+        self.assertFalse(any('"taskmaster_task"."title"' in query['sql'] for query in queries))
+        self.assertNotIn(fragments.CSRF_PLACEHOLDER, second)
+        self.assertIn('name="csrfmiddlewaretoken"', second)
+        self.assertNotEqual(first, second)
+
+    def test_task_change_bumps_version(self):
+        self.client.force_login(self.user)
+        self.assertIn('<span class="task__status-label">Pendiente</span>', self.client.get(self.url).context['task_cards'][0])
+        self.client.post(reverse('task_status', args=[self.task.pk, 'DONE']))
+        self.assertIn('<span class="task__status-label">Completada</span>', self.client.get(self.url).context['task_cards'][0])
+
+        self.client.post(reverse('task_bulk'), {'task_ids': [self.task.pk], 'status': 'IN_PROGRESS'})
+        self.assertIn('<span class="task__status-label">En Progreso</span>', self.client.get(self.url).context['task_cards'][0])
+
+    def test_owner_and_member_variants(self):
+        self.client.force_login(self.other)
+        self.assertNotIn("Editar Tarea", self.client.get(self.url).context['task_cards'][0])
+        self.client.force_login(self.user)
+        self.assertIn("Editar Tarea", self.client.get(self.url).context['task_cards'][0])
+
+    def test_collaborators_change_bumps_project_card(self):
+        self.client.force_login(self.user)
+        self.assertIn("other", self.client.get(reverse('project_list')).context['owned_cards'][0])
+        self.project.collaborators.clear()
+        self.assertIn("No hay colaboradores", self.client.get(reverse('project_list')).context['owned_cards'][0])
+
+
+class BenchmarkViewsTests(TestCase):
+    # Pruebas de la comparación con la referencia del benchmark de vistas
+
+    def test_compare_flags_regressions(self):
+        baseline = {'sizes': {'10': {'project_list': {'p95_ms': 10.0, 'queries': 4}}}}
+        ok = {'sizes': {'10': {'project_list': {'p95_ms': 11.0, 'queries': 4}}}}
+        slow = {'sizes': {'10': {'project_list': {'p95_ms': 13.0, 'queries': 5}}}}
+        self.assertEqual(compare(ok, baseline, 0.2), [])
+        self.assertEqual(len(compare(slow, baseline, 0.2)), 2)
+
+
+class ConnectionPoolTests(TestCase):
+    # Pruebas del pool de conexiones en proceso (mysite.db_pool)
+
+    class FakeConnection:
+        def __init__(self):
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    def test_reuse_limit_and_lifetime(self):
+        pool = ConnectionPool(self.FakeConnection, size=1, max_lifetime=60, timeout=0.01)
+        first = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        pool.discard(first)
+        self.assertTrue(first.closed)
+
+        second = pool.acquire()
+        pool.max_lifetime = 0
+        pool.release(second)
+        self.assertTrue(second.closed)
+        stats = pool.snapshot()
+        self.assertEqual((stats['created'], stats['reused'], stats['timeouts'], stats['expired']), (2, 1, 1, 1))
+
+    def test_health_check_drops_broken_connections(self):
+        pool = ConnectionPool(self.FakeConnection, size=2)
+        broken = pool.acquire()
+        pool.release(broken)
+        fresh = pool.acquire(is_usable=lambda conn: conn is not broken)
+        self.assertIsNot(fresh, broken)
+        self.assertTrue(broken.closed)
+
+    def test_close_without_pool_closes_the_connection(self):
+        # Por ejemplo tras un fork: el proceso no tiene pool para el alias y no se crea uno al cerrar
+        wrapper = mock.Mock(alias='sin_pool', connection=self.FakeConnection())
+        PooledDatabaseWrapperMixin._close(wrapper)
+        self.assertTrue(wrapper.connection.closed)
+        self.assertIsNone(find_pool('sin_pool'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'], DB_REPLICA_MAX_LAG=5, DB_REPLICA_CHECK_INTERVAL=60)
+class ReplicaRouterTests(SimpleTestCase):
+    # Pruebas del router de réplicas (mysite.db_router), sin consultas reales a las réplicas
+
+    def setUp(self):
+        db_router._health.clear()
+        self.addCleanup(db_router._health.clear)
+        self.router = db_router.ReplicaRouter()
+
+    def test_reads_go_to_healthy_replicas(self):
+        lags = {'replica1': 0, 'replica2': 30}
+        with mock.patch('mysite.db_router.replica_lag', side_effect=lags.get) as lag:
+            self.assertEqual({self.router.db_for_read(Task) for _ in range(10)}, {'replica1'})
+            self.assertEqual(lag.call_count, 2)
+        self.assertEqual(self.router.db_for_write(Task), 'default')
+        self.assertFalse(self.router.allow_migrate('replica1', 'taskmaster'))
+
+        db_router._health.clear()
+        with mock.patch('mysite.db_router.replica_lag', side_effect=Exception("caída")):
+            self.assertEqual(self.router.db_for_read(Task), 'default')
+
+    def test_writes_pin_the_browser_to_the_primary(self):
+        def view(request):
+            response = HttpResponse()
+            response.db = self.router.db_for_read(Task)
+            return response
+
+        middleware = db_router.PrimaryStickinessMiddleware(view)
+        factory = RequestFactory()
+        with mock.patch('mysite.db_router.replica_lag', return_value=0):
+            response = middleware(factory.post('/tasks/bulk/'))
+            self.assertEqual(response.db, 'default')
+            self.assertEqual(response.cookies[db_router.STICKY_COOKIE]['max-age'], settings.DB_REPLICA_STICKY_SECONDS)
+            self.assertEqual(middleware(factory.get('/projects/', HTTP_COOKIE='db_primary=1')).db, 'default')
+            self.assertIn(middleware(factory.get('/projects/')).db, settings.DATABASE_REPLICAS)
+
+    def test_async_views_are_pinned_too(self):
+        async def view(request):
+            response = HttpResponse()
+            # El ORM de las vistas asíncronas elige la base de datos en el hilo de sync_to_async
+            response.db = await sync_to_async(self.router.db_for_read)(Task)
+            return response
+
+        middleware = db_router.PrimaryStickinessMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(AsyncRequestFactory().post('/tasks/bulk/'))
+        self.assertEqual(response.db, 'default')
+        self.assertIn(db_router.STICKY_COOKIE, response.cookies)
+
+
+
+@skipUnless(connection.vendor == 'sqlite', "La réplica es una copia del fichero de SQLite")
+class ReplicaFragmentsTests(TransactionTestCase):
+    # Pruebas de la caché de fragmentos con una réplica con retraso: otra base de datos SQLite con una
+    # copia de la principal que no recibe los cambios posteriores
+
+    def setUp(self):
+        cache.clear()
+        db_router._health.clear()
+        self.addCleanup(db_router._health.clear)
+        self.user = User.objects.create_user(username='owner', password='test')
+        self.project = Project.objects.create(title="Antes", description="-", deadline=date.today(), owner=self.user)
+        self.task = Task.objects.create(project=self.project, title="Tarea antigua")
+        # La sesión también se lee de la réplica
+        self.client.force_login(self.user)
+        self.copy_to_replica()
+
+    def copy_to_replica(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        name = os.path.join(directory.name, 'replica1.sqlite3')
+        connection.ensure_connection()
+        replica = sqlite3.connect(name)
+        connection.connection.backup(replica)
+        replica.close()
+        connections['replica1'] = SQLiteDatabaseWrapper({**connection.settings_dict, 'NAME': name}, 'replica1')
+        self.addCleanup(connections.__delitem__, 'replica1')
+        self.addCleanup(lambda: connections['replica1'].close())
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_fragments_are_rendered_from_the_primary(self):
+        self.project.title = "Después"
+        self.project.save()
+        self.task.title = "Tarea nueva"
+        self.task.save()
+        self.project.collaborators.add(User.objects.create_user(username='nuevo', password='test'))
+        with mock.patch('mysite.db_router.replica_lag', return_value=0):
+            # Sin la cookie de la principal las lecturas van a la réplica, que aún no tiene los cambios
+            self.assertEqual(db_router.ReplicaRouter().db_for_read(Project), 'replica1')
+            self.assertEqual(Project.objects.get(pk=self.project.pk).title, "Antes")
+
+            card = self.client.get(reverse('project_list')).context['owned_cards'][0]
+            self.assertIn("Después", card)
+            self.assertIn("nuevo", card)
+            article = self.client.get(reverse('task_list', args=[self.project.pk])).context['task_cards'][0]
+            self.assertIn("Tarea nueva", article)
+            self.assertIn("Proyecto: Después", article)
+
+
+@override_settings(WHITENOISE_USE_FINDERS=True, WHITENOISE_AUTOREFRESH=False)
+class ASGIStaticFilesTests(SimpleTestCase):
+    # Pruebas de los ficheros estáticos servidos con ASGI fuera de la cadena de middleware
+
+    async def django(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 204, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    def get(self, path, headers=()):
+        async def request():
+            scope = {'type': 'http', 'method': 'GET', 'path': path, 'headers': list(headers)}
+            communicator = ApplicationCommunicator(ASGIStaticFiles(self.django), scope)
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output()
+            body = b''
+            while True:
+                message = await communicator.receive_output()
+                body += message['body']
+                if not message.get('more_body'):
+                    return start['status'], dict(start['headers']), body
+        return async_to_sync(request)()
+
+    def test_serves_static_files_and_passes_the_rest(self):
+        status, headers, body = self.get('/static/css/styles_base.css')
+        self.assertEqual(status, 200)
+        self.assertTrue(headers[b'content-type'].startswith(b'text/css'))
+        self.assertEqual(int(headers[b'content-length']), len(body))
+
+        status, _, body = self.get('/static/css/styles_base.css', [(b'range', b'bytes=0-9')])
+        self.assertEqual((status, len(body)), (206, 10))
+        self.assertEqual(self.get('/projects/')[0], 204)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.urls import path
-from .views import HomeView, TaskCreateView, TasksDeleteView, LoginView, RegisterView, ProjectListView, ProjectCreateView, ProjectDeleteView, ProjectUpdateView, TaskUpdateStatus, TaskUpdateView, ProjectDetailView
+from .views import HomeView, TaskCreateView, TasksDeleteView, LoginView, RegisterView, ProjectListView, ProjectCreateView, ProjectDeleteView, ProjectDeletionView, ProjectUpdateView, TaskUpdateStatus, TaskBulkUpdateView, TaskUpdateView, ProjectDetailView, TaskExportView, TaskImportView, TaskBoardView, TaskMoveView, SearchView, AutocompleteView, ReportsView, MetricsView
+from .views import ApiProjectListView, ApiProjectView, ApiProjectTasksView, ApiTaskView, ApiProjectHistoryView, ApiTaskHistoryView
+from .views import AsyncProjectListView, AsyncProjectDetailView, AsyncTaskUpdateStatus, TaskEventsView
 from django.contrib.auth import views as auth_views
 
+# Con ASYNC_VIEWS las vistas más usadas se sirven con sus versiones asíncronas (ver README)
+if settings.ASYNC_VIEWS:
+    ProjectListView, ProjectDetailView, TaskUpdateStatus = AsyncProjectListView, AsyncProjectDetailView, AsyncTaskUpdateStatus
+
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('login/', LoginView.as_view(), name='login'),
@@ -10,10 +17,28 @@ urlpatterns = [
     path('projects/', ProjectListView.as_view(), name='project_list'),
     path('projects/tasks/<int:pk>', ProjectDetailView.as_view(), name='task_list'),
     path('projects/tasks/<int:pk>/status/<str_status>', TaskUpdateStatus.as_view(), name='task_status'),
+    path('projects/tasks/<int:pk>/export/', TaskExportView.as_view(), name='task_export'),
+    path('tasks/export/', TaskExportView.as_view(), name='task_export_all'),
+    path('tasks/import/', TaskImportView.as_view(), name='task_import'),
+    path('projects/tasks/<int:pk>/board/', TaskBoardView.as_view(), name='task_board'),
+    path('tasks/<int:pk>/move/', TaskMoveView.as_view(), name='task_move'),
+    path('projects/tasks/<int:pk>/events/', TaskEventsView.as_view(), name='task_events'),
+    path('tasks/bulk/', TaskBulkUpdateView.as_view(), name='task_bulk'),
     path('tasks/create/', TaskCreateView.as_view(), name='task_create'),
     path('tasks/delete/<pk>', TasksDeleteView.as_view(), name='tasks_delete'),
     path('projects/tasks/update/<pk>', TaskUpdateView.as_view(), name='task_update'),
     path('projects/delete/<pk>', ProjectDeleteView.as_view(), name='project_delete'),
+    path('projects/deletions/<int:pk>/', ProjectDeletionView.as_view(), name='project_deletion'),
     path('projects/update/<pk>', ProjectUpdateView.as_view(), name='project_update'),
     path('projects/create/', ProjectCreateView.as_view(), name='project_create'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('autocomplete/<str:kind>/', AutocompleteView.as_view(), name='autocomplete'),
+    path('reports/', ReportsView.as_view(), name='reports'),
+    path('api/projects/', ApiProjectListView.as_view(), name='api_projects'),
+    path('api/projects/<int:pk>/', ApiProjectView.as_view(), name='api_project'),
+    path('api/projects/<int:pk>/tasks/', ApiProjectTasksView.as_view(), name='api_project_tasks'),
+    path('api/projects/<int:pk>/history/', ApiProjectHistoryView.as_view(), name='api_project_history'),
+    path('api/tasks/<int:pk>/', ApiTaskView.as_view(), name='api_task'),
+    path('api/tasks/<int:pk>/history/', ApiTaskHistoryView.as_view(), name='api_task_history'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
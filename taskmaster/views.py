@@ -1,19 +1,36 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import io
+import csv
+import json
+import asyncio
+from collections import defaultdict
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.views.generic import View, ListView, CreateView, DeleteView, UpdateView, DetailView
-from .models import Project, Task
+from .models import Project, ProjectDeletion, Task, TaskHistory
+from .instrumentation import metrics
+from .membership import accessible_project_ids, aaccessible_project_ids, can_access, is_member, member_project_ids
+from . import api, board, conditional, deletion, events, fragments, history, reports, search
+from .importer import FORMATS, TaskImporter, guess_format, read_rows
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.mixins import UserPassesTestMixin, LoginRequiredMixin
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django import forms
 from django.utils import timezone
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import reverse, reverse_lazy
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from django.conf import settings
+from mysite.db_pool import pool_stats
 
 # Create your views here.
 def error404(request, exception):
     # Nos permite personalizar la página del error 404
-    return render(request, '404.html')
+    return render(request, '404.html', status=404)
 
 class HomeView(View):
     # Clase que muestra la página de inicio
@@ -23,6 +40,22 @@ class HomeView(View):
         # Nos permite visualizar la página
         return render(request, self.template_name)
 
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    # Clase que hace lo mismo que LoginRequiredMixin en las vistas asíncronas, cargando el usuario
+    # de la sesión con request.auser() para no bloquear el bucle de eventos
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        return await View.dispatch(self, request, *args, **kwargs)
+
+def project_cards_context(items, cards):
+    # Separamos las tarjetas de los proyectos propios de las de colaboraciones
+    return {
+        'owned_cards': [card for card, item in zip(cards, items) if item[2] == 'owned'],
+        'collaborated_cards': [card for card, item in zip(cards, items) if item[2] == 'collaborated'],
+    }
+
 class ProjectListView(LoginRequiredMixin, ListView):
     # Clase que muestra los proyectos del usuario y en los que colabora
     model = Project
@@ -30,16 +63,103 @@ class ProjectListView(LoginRequiredMixin, ListView):
     context_object_name = "projects"
     login_url = '/login/'
 
+    def get(self, request, *args, **kwargs):
+        # Si el cliente ya tiene la página respondemos 304 sin cargar los proyectos ni renderizar
+        validators = conditional.project_list_validators(request, accessible_project_ids(request.user))
+        response = conditional.not_modified(request, *validators)
+        if response is None:
+            response = conditional.set_validators(super().get(request, *args, **kwargs), *validators)
+        return response
+
     def get_queryset(self):
-        # Mostramos los proyectos del usuario y en los que colabore
-        return Project.objects.filter(Q(owner=self.request.user) | Q(collaborators=self.request.user)).order_by("deadline")
+        # Mostramos los proyectos del usuario y en los que colabore. Aquí solo pedimos el orden y el
+        # creador; el resto de datos solo se cargan para las tarjetas que no estén en caché
+        return (
+            Project.objects
+            .filter(id__in=accessible_project_ids(self.request.user))
+            .order_by("deadline")
+            .values_list('id', 'owner_id', named=True)
+        )
+
+    def get_context_data(self, **kwargs):
+        # Separamos en Python los proyectos propios de las colaboraciones
+        context = super().get_context_data(**kwargs)
+        items = [
+            (project.id, project.id, 'owned' if project.owner_id == self.request.user.id else 'collaborated')
+            for project in context['projects']
+        ]
+        cards = fragments.render_fragments(self.request, 'project', items, 'project_card.html', self.load_projects, 'project')
+        context.update(project_cards_context(items, cards))
+        return context
+
+    def load_projects(self, ids):
+        # Los contadores de tareas ya vienen guardados en cada proyecto, así que no se lanza ningún COUNT
+        return fragments.project_cards(ids)
+
+class AsyncProjectListView(AsyncLoginRequiredMixin, View):
+    # Versión asíncrona de ProjectListView: mientras espera a la base de datos o a la caché,
+    # el mismo worker puede seguir atendiendo otras peticiones
+    template_name = "project_list.html"
+    login_url = '/login/'
+
+    async def get(self, request):
+        project_ids = await aaccessible_project_ids(request.user)
+        validators = await conditional.aproject_list_validators(request, project_ids)
+        response = conditional.not_modified(request, *validators)
+        if response is not None:
+            return response
+        projects = [
+            project async for project in
+            Project.objects.filter(id__in=project_ids).order_by("deadline").values_list('id', 'owner_id', named=True)
+        ]
+        items = [
+            (project.id, project.id, 'owned' if project.owner_id == request.user.id else 'collaborated')
+            for project in projects
+        ]
+        cards = await fragments.arender_fragments(request, 'project', items, 'project_card.html', self.aload_projects, 'project')
+        response = TemplateResponse(request, self.template_name, {'projects': projects, **project_cards_context(items, cards)})
+        return conditional.set_validators(response, *validators)
+
+    async def aload_projects(self, ids):
+        return [project async for project in fragments.project_cards(ids)]
+
+class AutocompleteMixin:
+    # Clase que solo pinta las opciones elegidas; el resto las pide autocomplete.js a AutocompleteView
+    # según se escribe, así la página no lleva todos los usuarios o proyectos
+    def __init__(self, url, forward=None, attrs=None):
+        attrs = {'data-autocomplete-url': url, **(attrs or {})}
+        if forward:
+            # Campo del formulario cuyo valor se manda también (por ejemplo el proyecto de la tarea)
+            attrs['data-autocomplete-forward'] = forward
+        super().__init__(attrs=attrs)
+
+    class Media:
+        js = [forms.Script('js/autocomplete.js', defer=True)]
+
+    def optgroups(self, name, value, attrs=None):
+        # Consultamos solo los ids elegidos en vez de recorrer todo el queryset del campo
+        ids = [item for item in value if str(item).isdigit()]
+        objects = self.choices.queryset.filter(pk__in=ids) if ids else []
+        options = [self.create_option(name, obj.pk, str(obj), True, index, attrs=attrs) for index, obj in enumerate(objects)]
+        if not self.allow_multiple_selected:
+            options.insert(0, self.create_option(name, '', self.choices.field.empty_label, not ids, len(options), attrs=attrs))
+        return [(None, options, 0)]
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
 
 class ProjectForm(forms.ModelForm):
     # Clase que crea los formularios de los proyectos
     class Meta:
         model = Project
         fields = ['title', 'description', 'deadline', 'collaborators']
-        widgets = {'deadline': forms.DateInput(attrs={'type': 'date'})}
+        widgets = {
+            'deadline': forms.DateInput(attrs={'type': 'date'}),
+            'collaborators': AutocompleteSelectMultiple(reverse_lazy('autocomplete', args=['users'])),
+        }
     
     def __init__(self, *args, **kwargs):
         # Cogemos al usuario
@@ -92,6 +212,30 @@ class ProjectDeleteView(LoginRequiredMixin, DeleteView):
     success_url = '/projects/'
     login_url = '/login/'
 
+    def get_queryset(self):
+        # Solo el dueño puede borrar el proyecto
+        return Project.objects.filter(owner_id=self.request.user.id, deleting=False)
+
+    def form_valid(self, form):
+        # El proyecto se oculta ya y sus tareas se borran por lotes en segundo plano (ver deletion.py)
+        deletion.schedule(self.object, self.request.user)
+        return redirect(self.get_success_url())
+
+class ProjectDeletionView(LoginRequiredMixin, View):
+    # Clase que devuelve en JSON el progreso del borrado de un proyecto pedido por el usuario
+    login_url = '/login/'
+
+    def get(self, request, pk):
+        job = get_object_or_404(ProjectDeletion, project_id=pk, requested_by=request.user)
+        return JsonResponse({
+            'project_id': job.project_id,
+            'title': job.title,
+            'total_tasks': job.total_tasks,
+            'tasks_deleted': job.tasks_deleted,
+            'progress': job.progress(),
+            'finished': job.finished_at is not None,
+        })
+
 class ProjectUpdateView(LoginRequiredMixin, UpdateView):
     # Clase que actualiza los proyectos
     model = Project
@@ -100,40 +244,208 @@ class ProjectUpdateView(LoginRequiredMixin, UpdateView):
     success_url = "/projects/"
     login_url = '/login/'
 
+    def get_queryset(self):
+        # Solo el creador puede cambiar el proyecto
+        return Project.objects.filter(owner_id=self.request.user.id, deleting=False)
+
     def get_form_kwargs(self):
         # Recogemos los datos del formulario
         kwargs = super().get_form_kwargs()
         kwargs['user'] = self.request.user
         return kwargs
 
+def filter_tasks(tasks, params):
+    # Aplicamos los filtros opcionales de estado, prioridad y asignado que lleguen en la URL
+    filters = {}
+    status = params.get('status')
+    if status in dict(Task.STATUS_CHOICES):
+        filters['status'] = status
+    priority = params.get('priority')
+    if priority in dict(Task.PRIORITY_CHOICES):
+        filters['priority'] = priority
+    assigned_to = params.get('assigned_to', '')
+    if assigned_to.isdigit():
+        filters['assigned_to_id'] = int(assigned_to)
+    return tasks.filter(**filters), filters
+
+
+def paginate_tasks(tasks, params, page_size):
+    # Paginación por cursor sobre el id: cada página pide las filas siguientes a la última vista
+    # (id > after) o anteriores a la primera (id < before), sin OFFSET, así que cuesta lo mismo
+    # la primera página que la última
+    return build_page(list(page_queryset(tasks, params, page_size)), params, page_size)
+
+
+async def apaginate_tasks(tasks, params, page_size):
+    # Versión asíncrona de paginate_tasks
+    return build_page([task async for task in page_queryset(tasks, params, page_size)], params, page_size)
+
+
+def page_queryset(tasks, params, page_size):
+    # Pedimos una fila de más para saber si hay otra página
+    before = params.get('before', '')
+    if before.isdigit():
+        return tasks.filter(id__lt=int(before)).order_by('-id')[:page_size + 1]
+    after = params.get('after', '')
+    if after.isdigit():
+        tasks = tasks.filter(id__gt=int(after))
+    return tasks.order_by('id')[:page_size + 1]
+
+
+def build_page(rows, params, page_size):
+    after = params.get('after', '')
+    before = params.get('before', '')
+    if before.isdigit():
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after.isdigit()
+
+    page = {'tasks': rows, 'next_query': None, 'previous_query': None}
+    if rows:
+        if has_next:
+            page['next_query'] = _cursor_query(params, 'after', rows[-1].id)
+        if has_previous:
+            page['previous_query'] = _cursor_query(params, 'before', rows[0].id)
+    return page
+
+
+def _cursor_query(params, key, value):
+    # Conservamos los filtros y el tamaño de página al movernos entre páginas
+    query = params.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    query[key] = value
+    return query.urlencode()
+
+
+def get_page_size(params):
+    # Tamaño de página configurable por URL, limitado al máximo de los ajustes
+    page_size = params.get('page_size', '')
+    if page_size.isdigit() and int(page_size) > 0:
+        return min(int(page_size), settings.TASKS_MAX_PAGE_SIZE)
+    return settings.TASKS_PAGE_SIZE
+
+
+def task_list_context(project, page, task_cards, filters):
+    # Contexto de task_list.html común a la vista síncrona y a la asíncrona
+    context = {
+        'tasks': page['tasks'],
+        'task_cards': task_cards,
+        'next_query': page['next_query'],
+        'previous_query': page['previous_query'],
+        'filters': filters,
+        'status_choices': Task.STATUS_CHOICES,
+        'status_labels': dict(Task.STATUS_CHOICES),
+        'priority_choices': Task.PRIORITY_CHOICES,
+        'members': [project.owner, *project.collaborators.all()],
+        # Los eventos en tiempo real solo funcionan con el servidor ASGI
+        'events_url': reverse('task_events', args=[project.id]) if settings.ASYNC_VIEWS else None,
+    }
+    # Leemos los contadores guardados en el proyecto en lugar de contar las tareas
+    total = project.total_tasks()
+    context['total_tasks'] = total
+    if total > 0:
+        # Para que no nos de un error de división entre 0
+        context['done_tasks'] = project.total_tasks_done() * 100 / total
+    else:
+        context['done_tasks'] = 0
+    context['labels'] = ["Completadas", "No completadas"]
+    return context
+
+
 class ProjectDetailView(LoginRequiredMixin, DetailView):
     # Clase que muestra el detalle de los proyectos (tareas asociadas)
     model = Project
     template_name = "task_list.html"
     context_object_name = "project"
     login_url = '/login/'
+
+    def get(self, request, *args, **kwargs):
+        # Igual que en la lista de proyectos, 304 antes de cargar las tareas si no ha cambiado nada
+        validators = (None, None)
+        if kwargs['pk'] in accessible_project_ids(request.user):
+            validators = conditional.project_detail_validators(request, kwargs['pk'])
+        response = conditional.not_modified(request, *validators)
+        if response is None:
+            response = conditional.set_validators(super().get(request, *args, **kwargs), *validators)
+        return response
+
+    def get_queryset(self):
+        # Solo se pueden ver los proyectos propios o en los que se colabora.
+        # Cargamos el creador y los colaboradores una sola vez para todas las tareas
+        return (
+            Project.objects
+            .filter(id__in=accessible_project_ids(self.request.user))
+            .select_related('owner')
+            .prefetch_related('collaborators')
+        )
     
     def get_context_data(self, **kwargs):
         # Recogemos los datos para mostrarlos
         context = super().get_context_data(**kwargs)
         project = self.object
-        
-        context['tasks'] = project.tasks.order_by("project__deadline")
-        total = project.tasks.count()
-        context['total_tasks'] = total
-        if total > 0:
-            # Para que no nos de un error de división entre 0
-            context['done_tasks'] = project.tasks.filter(status='DONE').count() * 100 / project.tasks.count()
-        else:
-            context['done_tasks'] = 0
-        context['labels'] = ["Completadas", "No completadas"]
+        params = self.request.GET
+
+        # La página solo pide los ids; el resto de cada tarea se carga si su artículo no está en caché
+        tasks, filters = filter_tasks(project.tasks.only('id', 'project_id'), params)
+        page = paginate_tasks(tasks, params, get_page_size(params))
+        variant = 'owner' if project.owner_id == self.request.user.id else 'member'
+        items = [(task.id, project.id, variant) for task in page['tasks']]
+        task_cards = fragments.render_fragments(self.request, 'task', items, 'task_article.html', self.load_tasks, 'task')
+        context.update(task_list_context(project, page, task_cards, filters))
         return context
 
+    def load_tasks(self, ids):
+        # No reutilizamos self.object: puede venir de una réplica (ver fragments.task_articles)
+        return fragments.task_articles(ids)
+
+class AsyncProjectDetailView(AsyncLoginRequiredMixin, View):
+    # Versión asíncrona de ProjectDetailView
+    template_name = "task_list.html"
+    login_url = '/login/'
+
+    async def get(self, request, pk):
+        # Los permisos salen de la caché, así que el proyecto y la página de tareas no dependen
+        # el uno del otro y los pedimos a la vez
+        if pk not in await aaccessible_project_ids(request.user):
+            raise Http404("No existe el proyecto")
+        validators = await conditional.aproject_detail_validators(request, pk)
+        response = conditional.not_modified(request, *validators)
+        if response is not None:
+            return response
+        params = request.GET
+        tasks, filters = filter_tasks(Task.objects.filter(project_id=pk).only('id', 'project_id'), params)
+        self.object, page = await asyncio.gather(
+            Project.objects.select_related('owner').prefetch_related('collaborators').filter(pk=pk).afirst(),
+            apaginate_tasks(tasks, params, get_page_size(params)),
+        )
+        project = self.object
+        if project is None:
+            raise Http404("No existe el proyecto")
+
+        variant = 'owner' if project.owner_id == request.user.id else 'member'
+        items = [(task.id, project.id, variant) for task in page['tasks']]
+        task_cards = await fragments.arender_fragments(request, 'task', items, 'task_article.html', self.aload_tasks, 'task')
+        context = {'project': project, 'object': project, 'view': self}
+        context.update(task_list_context(project, page, task_cards, filters))
+        return conditional.set_validators(TemplateResponse(request, self.template_name, context), *validators)
+
+    async def aload_tasks(self, ids):
+        return [task async for task in fragments.task_articles(ids)]
+
 class TaskForm(forms.ModelForm):
     # Clase que crea los formularios de las tareas
     class Meta:
         model = Task
         fields = ['project', 'title', 'description', 'status', 'priority', 'assigned_to']
+        widgets = {
+            'project': AutocompleteSelect(reverse_lazy('autocomplete', args=['projects'])),
+            'assigned_to': AutocompleteSelect(reverse_lazy('autocomplete', args=['users']), forward='project'),
+        }
     
     def __init__(self, *args, **kwargs):
         # Cogemos al usuario
@@ -142,10 +454,9 @@ class TaskForm(forms.ModelForm):
 
         self.fields['description'].required = False
 
-        # Quitamos los que no son ni propietarios ni colaboradores
+        # Solo se valida el proyecto enviado; que el asignado sea creador o colaborador se comprueba en clean
         if self.user:
-            self.fields['project'].queryset = Project.objects.filter(Q(owner=self.user) | Q(collaborators=self.user)).distinct()
-            self.fields['assigned_to'].queryset = User.objects.filter(Q(owned_projects__in=self.fields['project'].queryset) | Q(collaborated_projects__in=self.fields['project'].queryset)).distinct()
+            self.fields['project'].queryset = Project.objects.filter(id__in=accessible_project_ids(self.user))
         
     def clean(self):
         cleaned_data = super().clean()
@@ -154,10 +465,7 @@ class TaskForm(forms.ModelForm):
 
         if project and assigned_to:
             # Verificamos que el usuario asignado sea el creador o un colaborador
-            is_owner = (project.owner == assigned_to)
-            is_collaborator = project.collaborators.filter(id=assigned_to.id).exists()
-
-            if not is_owner and not is_collaborator:
+            if not is_member(assigned_to.id, project.id):
                 raise forms.ValidationError("No puedes asignarle la tarea a alguien que no sea el creador o colaborador")
 
 class TaskCreateView(LoginRequiredMixin, CreateView):
@@ -175,7 +483,7 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
     
     def get_success_url(self):
         # Volvemos a la página justo anterior
-        return f'/projects/tasks/{self.object.project.id}'
+        return f'/projects/tasks/{self.object.project_id}'
 
     def form_valid(self, form):
         # Validamos el formulario
@@ -187,9 +495,30 @@ class TasksDeleteView(LoginRequiredMixin, DeleteView):
     template_name = "confirm_delete.html"
     login_url = '/login/'
 
+    def get_queryset(self):
+        # Solo las tareas de los proyectos del usuario
+        return Task.objects.filter(project_id__in=accessible_project_ids(self.request.user))
+
     def get_success_url(self):
         # Volvemos a la página justo anterior
-        return f'/projects/tasks/{self.object.project.id}'
+        return f'/projects/tasks/{self.object.project_id}'
+
+def wants_json(request):
+    # Los clientes que piden JSON (fetch desde task_list.html o la API) no reciben redirecciones
+    return request.content_type == 'application/json' or 'application/json' in request.headers.get('Accept', '')
+
+def status_response(request, task=None, counters=None, error=None, status=200, fallback=None):
+    # Respuesta del cambio de estado: JSON con la tarea y el progreso del proyecto, o volver a la página
+    if not wants_json(request):
+        return redirect(fallback or request.META.get('HTTP_REFERER', '/projects/'))
+    if error:
+        return JsonResponse({'error': error}, status=status)
+    total = sum(counters.values())
+    return JsonResponse({
+        'task': events.task_data(task),
+        'total_tasks': total,
+        'done_tasks': counters['done_count'] * 100 / total if total else 0,
+    })
 
 class TaskUpdateStatus(LoginRequiredMixin, View):
     # Clase que actualiza el estado de las tareas
@@ -198,12 +527,221 @@ class TaskUpdateStatus(LoginRequiredMixin, View):
     def post(self, request, pk, str_status):
         # Actualizamos el estado de la tarea
         task = get_object_or_404(Task, pk=pk)
-        if not (task.project.owner == request.user or task.project.collaborators.filter(id=request.user.id).exists()):
+        if not can_access(request.user, task.project_id):
             # Si el usuario no es el creador o un colaborador, no lo puede modificar
-            return redirect('/projects/')
+            return status_response(request, error="No tienes permiso para cambiar esta tarea", status=403, fallback='/projects/')
+        if str_status not in dict(Task.STATUS_CHOICES):
+            # Si el estado no existe no tocamos la tarea
+            return status_response(request, error="El estado no es válido", status=400)
         task.status = str_status
-        task.save()
-    
+        # Solo guardamos el estado, Task.save se encarga de actualizar los contadores del proyecto
+        task.save(update_fields=['status', 'updated_at'])
+
+        if wants_json(request):
+            counters = Project.objects.filter(pk=task.project_id).values(*Project.COUNTER_FIELDS.values()).first()
+            return status_response(request, task, counters)
+        return status_response(request)
+
+class AsyncTaskUpdateStatus(AsyncLoginRequiredMixin, View):
+    # Versión asíncrona de TaskUpdateStatus
+    login_url = '/login/'
+
+    async def post(self, request, pk, str_status):
+        task = await aget_object_or_404(Task, pk=pk)
+        if task.project_id not in await aaccessible_project_ids(request.user):
+            return status_response(request, error="No tienes permiso para cambiar esta tarea", status=403, fallback='/projects/')
+        if str_status not in dict(Task.STATUS_CHOICES):
+            return status_response(request, error="El estado no es válido", status=400)
+        task.status = str_status
+        await task.asave(update_fields=['status', 'updated_at'])
+
+        if wants_json(request):
+            counters = await Project.objects.filter(pk=task.project_id).values(*Project.COUNTER_FIELDS.values()).afirst()
+            return status_response(request, task, counters)
+        return status_response(request)
+
+class TaskBoardView(LoginRequiredMixin, View):
+    # Clase que muestra el tablero kanban de un proyecto: una columna por estado en el orden de Task.rank
+    template_name = "task_board.html"
+    login_url = '/login/'
+
+    def get(self, request, pk):
+        if pk not in accessible_project_ids(request.user):
+            raise Http404
+        project = get_object_or_404(Project, pk=pk)
+        tasks = board.columns(pk, settings.BOARD_COLUMN_SIZE)
+        # Los totales salen de los contadores del proyecto, sin contar las tareas
+        columns = [
+            {'status': status, 'label': label, 'tasks': tasks[status], 'total': getattr(project, Project.COUNTER_FIELDS[status])}
+            for status, label in Task.STATUS_CHOICES
+        ]
+        return render(request, self.template_name, {'project': project, 'columns': columns})
+
+class TaskMoveView(LoginRequiredMixin, View):
+    # Clase que mueve una tarea en el tablero: a otra columna y/o entre las tareas previous y next
+    login_url = '/login/'
+
+    def post(self, request, pk):
+        task = get_object_or_404(Task, pk=pk)
+        if not can_access(request.user, task.project_id):
+            return status_response(request, error="No tienes permiso para cambiar esta tarea", status=403, fallback='/projects/')
+        try:
+            data = json.loads(request.body or '{}') if request.content_type == 'application/json' else request.POST
+            neighbours = [int(data[key]) if data.get(key) else None for key in ('previous', 'next')]
+        except (ValueError, TypeError, AttributeError):
+            return status_response(request, error="Las tareas vecinas no son válidas", status=400)
+        status = data.get('status') or task.status
+        if not isinstance(status, str) or status not in dict(Task.STATUS_CHOICES):
+            return status_response(request, error="El estado no es válido", status=400)
+        try:
+            board.move(task, status, *neighbours)
+        except board.MoveError as error:
+            return status_response(request, error=str(error), status=400)
+
+        if wants_json(request):
+            counters = Project.objects.filter(pk=task.project_id).values(*Project.COUNTER_FIELDS.values()).first()
+            return status_response(request, task, counters)
+        return status_response(request, fallback=reverse('task_board', args=[task.project_id]))
+
+class TaskEventsView(AsyncLoginRequiredMixin, View):
+    # Clase que envía por Server-Sent Events los cambios en las tareas de un proyecto. Solo con el
+    # servidor ASGI: cada conexión abierta es una corrutina esperando, no un worker bloqueado
+    login_url = '/login/'
+
+    async def get(self, request, pk):
+        if pk not in await aaccessible_project_ids(request.user):
+            raise Http404("No existe el proyecto")
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({'error': "Los eventos solo están disponibles con el servidor ASGI"}, status=501)
+        response = StreamingHttpResponse(events.stream(pk, request.user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Para que nginx no acumule los eventos antes de enviarlos
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+class TaskBulkUpdateView(LoginRequiredMixin, View):
+    # Clase que cambia el estado, la prioridad o el asignado de varias tareas en una sola petición
+    login_url = '/login/'
+    max_tasks = 1000
+
+    def post(self, request):
+        data = self.get_data(request)
+        task_ids, error = self.get_task_ids(data)
+        if not error:
+            changes, error = self.get_changes(data)
+        if not error and not task_ids:
+            error = "No has seleccionado ninguna tarea"
+        if not error and len(task_ids) > self.max_tasks:
+            error = f"No se pueden cambiar más de {self.max_tasks} tareas a la vez"
+        if error:
+            return self.respond(request, {'error': error}, status=400)
+
+        results = {task_id: "La tarea no existe o no tienes permiso" for task_id in task_ids}
+        with transaction.atomic():
+            # Los permisos salen de la caché de proyectos del usuario; la consulta solo bloquea las tareas
+            rows = list(
+                Task.objects.select_for_update()
+                .filter(id__in=task_ids, project_id__in=accessible_project_ids(request.user))
+                .values_list('id', 'project_id', 'status', 'assigned_to_id', 'priority')
+            )
+
+            if changes.get('assigned_to_id') is not None:
+                # El asignado tiene que ser creador o colaborador de cada proyecto afectado
+                allowed_projects = member_project_ids(changes['assigned_to_id'])
+                for task_id, project_id, _, _, _ in rows:
+                    if project_id not in allowed_projects:
+                        results[task_id] = "No puedes asignarle la tarea a alguien que no sea el creador o colaborador"
+                rows = [row for row in rows if row[1] in allowed_projects]
+
+            if rows:
+                Task.objects.filter(id__in=[task_id for task_id, _, _, _, _ in rows]).update(**changes, updated_at=timezone.now())
+
+            # update() no lanza señales, así que cambiamos a mano la versión de los fragmentos y avisamos
+            # a los que estén viendo los proyectos
+            fragments.bump(*{project_id for _, project_id, _, _, _ in rows})
+            for task_id, project_id, _, _, _ in rows:
+                events.publish(project_id, 'task.updated', task={'id': task_id, **changes})
+
+            if 'status' in changes:
+                # Mantenemos los contadores del proyecto con los estados anteriores de cada tarea
+                deltas = defaultdict(lambda: defaultdict(int))
+                for _, project_id, old_status, _, _ in rows:
+                    if old_status != changes['status']:
+                        deltas[project_id][old_status] -= 1
+                        deltas[project_id][changes['status']] += 1
+                Project.apply_task_counter_deltas(deltas)
+
+            if {'status', 'assigned_to_id'} & set(changes):
+                # Y el resumen de los informes, que también depende del asignado
+                report_deltas = defaultdict(int)
+                for _, project_id, old_status, old_assigned_to_id, _ in rows:
+                    report_deltas[(project_id, old_assigned_to_id, old_status)] -= 1
+                    report_deltas[(project_id, changes.get('assigned_to_id', old_assigned_to_id), changes.get('status', old_status))] += 1
+                reports.apply_deltas(report_deltas)
+
+            # Y el historial, con los valores anteriores de cada tarea
+            history.record(history.task_changes(
+                [
+                    (task_id, project_id, {'status': status, 'priority': priority, 'assigned_to': assigned_to_id})
+                    for task_id, project_id, status, assigned_to_id, priority in rows
+                ],
+                {('assigned_to' if field == 'assigned_to_id' else field): value for field, value in changes.items()},
+            ))
+
+        for task_id, _, _, _, _ in rows:
+            results[task_id] = "ok"
+        return self.respond(request, {'results': {str(task_id): result for task_id, result in sorted(results.items())}})
+
+    def get_data(self, request):
+        # Aceptamos tanto un formulario como un cuerpo JSON
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                return {}
+            return data if isinstance(data, dict) else {}
+        data = {key: request.POST.get(key) for key in ('status', 'priority', 'assigned_to') if request.POST.get(key)}
+        data['task_ids'] = request.POST.getlist('task_ids')
+        return data
+
+    def get_task_ids(self, data):
+        # Una lista de ids: enteros en JSON o cadenas de dígitos en el formulario
+        task_ids = data.get('task_ids', [])
+        if not isinstance(task_ids, list):
+            return set(), "Las tareas tienen que ser una lista de ids"
+        for task_id in task_ids:
+            if isinstance(task_id, bool) or not (isinstance(task_id, int) or (isinstance(task_id, str) and task_id.isdigit())):
+                return set(), "Los ids de las tareas no son válidos"
+        return {int(task_id) for task_id in task_ids}, None
+
+    def get_changes(self, data):
+        # Validamos los cambios pedidos y los devolvemos como argumentos para update()
+        changes = {}
+        for field in ('status', 'priority'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                return changes, "El estado no es válido" if field == 'status' else "La prioridad no es válida"
+        if data.get('status') is not None:
+            if data['status'] not in dict(Task.STATUS_CHOICES):
+                return changes, "El estado no es válido"
+            changes['status'] = data['status']
+        if data.get('priority') is not None:
+            if data['priority'] not in dict(Task.PRIORITY_CHOICES):
+                return changes, "La prioridad no es válida"
+            changes['priority'] = data['priority']
+        if 'assigned_to' in data:
+            # Un null en JSON deja la tarea sin asignar
+            assigned_to = data['assigned_to']
+            if assigned_to is not None and (isinstance(assigned_to, bool) or not isinstance(assigned_to, (int, str)) or not str(assigned_to).isdigit()):
+                return changes, "El usuario asignado no es válido"
+            changes['assigned_to_id'] = int(assigned_to) if assigned_to is not None else None
+        if not changes:
+            return changes, "No hay ningún cambio que aplicar"
+        return changes, None
+
+    def respond(self, request, content, status=200):
+        # Respondemos en JSON a los clientes que lo piden y si no volvemos a la página anterior
+        if wants_json(request):
+            return JsonResponse(content, status=status)
         return redirect(request.META.get('HTTP_REFERER', '/projects/'))
 
 class TaskUpdateView(LoginRequiredMixin, UpdateView):
@@ -213,6 +751,10 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
     form_class = TaskForm
     login_url = '/login/'
 
+    def get_queryset(self):
+        # Solo las tareas de los proyectos del usuario
+        return Task.objects.filter(project_id__in=accessible_project_ids(self.request.user))
+
     def get_form_kwargs(self):
         # Recogemos los datos del formulario
         kwargs = super().get_form_kwargs()
@@ -221,7 +763,382 @@ class TaskUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_success_url(self):
         # Volvemos a la página justo anterior
-        return f'/projects/tasks/{self.object.project.id}'
+        return f'/projects/tasks/{self.object.project_id}'
+
+class Echo:
+    # Clase que hace de fichero para csv.writer: devuelve cada línea en lugar de guardarla
+    def write(self, value):
+        return value
+
+class TaskExportView(LoginRequiredMixin, View):
+    # Clase que exporta las tareas de un proyecto (o de todos los del usuario) en CSV o NDJSON.
+    # Las filas se leen por bloques con iterator() (aiterator() con ASGI), sin crear instancias del modelo,
+    # y se envían según llegan, así que la memoria no crece con el número de tareas
+    login_url = '/login/'
+    columns = ['id', 'project_id', 'project__title', 'title', 'description', 'status', 'priority', 'assigned_to__username']
+    headers = ['id', 'project_id', 'project', 'title', 'description', 'status', 'priority', 'assigned_to']
+    formats = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+    def get(self, request, pk=None):
+        project_ids = accessible_project_ids(request.user)
+        if pk is not None and pk not in project_ids:
+            raise Http404("No existe el proyecto")
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in self.formats:
+            return JsonResponse({'error': "El formato tiene que ser csv o ndjson"}, status=400)
+
+        tasks = Task.objects.filter(project_id=pk) if pk is not None else Task.objects.filter(project_id__in=project_ids)
+        tasks, _ = filter_tasks(tasks, request.GET)
+        tasks = tasks.order_by('id')
+
+        if isinstance(request, ASGIRequest):
+            # Con ASGI un iterador síncrono se leería entero antes de enviar nada: usamos uno asíncrono.
+            # values() y no values_list(), cuyo aiterator() lanza la consulta desde el bucle de eventos
+            rows = tasks.values(*self.columns).aiterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+            lines = self.acsv_lines(rows) if export_format == 'csv' else self.andjson_lines(rows)
+        else:
+            rows = tasks.values_list(*self.columns).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+            lines = self.csv_lines(rows) if export_format == 'csv' else self.ndjson_lines(rows)
+        response = StreamingHttpResponse(lines, content_type=self.formats[export_format])
+        filename = f"tareas_{pk}" if pk is not None else "tareas"
+        response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+        return response
+
+    def csv_lines(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.headers)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def ndjson_lines(self, rows):
+        for row in rows:
+            yield self.ndjson_line(row)
+
+    async def acsv_lines(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.headers)
+        async for row in rows:
+            yield writer.writerow([row[column] for column in self.columns])
+
+    async def andjson_lines(self, rows):
+        async for row in rows:
+            yield self.ndjson_line([row[column] for column in self.columns])
+
+    def ndjson_line(self, row):
+        return json.dumps(dict(zip(self.headers, row)), ensure_ascii=False) + '\n'
+
+class TaskImportView(LoginRequiredMixin, View):
+    # Clase que importa las tareas de un fichero CSV o NDJSON subido y devuelve el informe de cada fila.
+    # El fichero se lee según se valida, por lotes, sin cargarlo entero en memoria
+    login_url = '/login/'
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return JsonResponse({'error': "No has subido ningún fichero"}, status=400)
+        file_format = request.POST.get('format') or guess_format(upload.name)
+        if file_format not in FORMATS:
+            return JsonResponse({'error': "El formato tiene que ser csv o ndjson"}, status=400)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            report = TaskImporter(request.user, settings.IMPORT_BATCH_SIZE).run(read_rows(stream, file_format))
+        except UnicodeDecodeError:
+            return JsonResponse({'error': "El fichero tiene que estar en UTF-8"}, status=400)
+        return JsonResponse(report)
+
+class SearchView(LoginRequiredMixin, View):
+    # Clase que busca proyectos y tareas por su título y descripción en los proyectos del usuario.
+    # Las tareas van de más a menos relevante y paginadas; los proyectos solo en la primera página
+    template_name = "search.html"
+    login_url = '/login/'
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        terms = search.tokenize(query)
+        page = request.GET.get('page', '')
+        page = int(page) if page.isdigit() and int(page) > 0 else 1
+        page_size = settings.SEARCH_PAGE_SIZE
+
+        projects, tasks, has_next = [], [], False
+        if terms:
+            project_ids = accessible_project_ids(request.user)
+            # Pedimos una tarea de más para saber si hay otra página
+            task_ids = search.search_tasks(terms, project_ids, (page - 1) * page_size, page_size + 1)
+            has_next = len(task_ids) > page_size
+            tasks = self.in_order(Task.objects.select_related('project', 'assigned_to'), task_ids[:page_size])
+            if page == 1:
+                projects = self.in_order(Project.objects.select_related('owner'), search.search_projects(terms, project_ids, page_size))
+
+        if wants_json(request):
+            return JsonResponse({
+                'query': query,
+                'projects': [{'id': project.id, 'title': project.title} for project in projects],
+                'tasks': [{**events.task_data(task), 'project_id': task.project_id} for task in tasks],
+                'next_page': page + 1 if has_next else None,
+            })
+        return render(request, self.template_name, {
+            'query': query,
+            'projects': projects,
+            'tasks': tasks,
+            'next_query': self.page_query(request, page + 1) if has_next else None,
+            'previous_query': self.page_query(request, page - 1) if page > 1 else None,
+        })
+
+    def in_order(self, queryset, ids):
+        # Cargamos los objetos de una vez y los devolvemos en el orden de la búsqueda
+        objects = queryset.in_bulk(ids)
+        return [objects[object_id] for object_id in ids if object_id in objects]
+
+    def page_query(self, request, page):
+        query = request.GET.copy()
+        query['page'] = page
+        return query.urlencode()
+
+class AutocompleteView(LoginRequiredMixin, View):
+    # Clase que devuelve en JSON los usuarios o proyectos que empiezan por lo escrito, para los formularios
+    login_url = '/login/'
+
+    def get(self, request, kind):
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = min(max(int(request.GET.get('limit', settings.AUTOCOMPLETE_LIMIT)), 1), settings.AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            limit = settings.AUTOCOMPLETE_LIMIT
+        if kind == 'users':
+            results = self.users(request, query, limit)
+        elif kind == 'projects':
+            results = self.projects(request, query, limit)
+        else:
+            raise Http404
+        return JsonResponse({'results': [{'id': pk, 'text': text} for pk, text in results]})
+
+    def users(self, request, query, limit):
+        users = User.objects.all()
+        project = request.GET.get('project', '')
+        if project:
+            # Para asignar una tarea solo sirven el creador y los colaboradores del proyecto
+            if not project.isdigit() or int(project) not in accessible_project_ids(request.user):
+                return []
+            owner = Project.objects.filter(id=project).values('owner_id')
+            collaborators = Project.collaborators.through.objects.filter(project_id=project).values('user_id')
+            users = users.filter(Q(id__in=owner) | Q(id__in=collaborators))
+        elif not query:
+            return []
+        else:
+            # Uno mismo no puede ser colaborador de su proyecto
+            users = users.exclude(id=request.user.id)
+        # username tiene índice único, así que LIKE 'texto%' no recorre la tabla
+        return users.filter(username__istartswith=query).order_by('username').values_list('id', 'username')[:limit]
+
+    def projects(self, request, query, limit):
+        project_ids = accessible_project_ids(request.user)
+        terms = search.tokenize(query)
+        if not terms:
+            return Project.objects.filter(id__in=project_ids).order_by('title').values_list('id', 'title')[:limit]
+        ids = search.search_projects(terms, project_ids, limit, prefix=True)
+        titles = dict(Project.objects.filter(id__in=ids).values_list('id', 'title'))
+        return [(pk, titles[pk]) for pk in ids if pk in titles]
+
+@method_decorator(gzip_page, name='dispatch')
+class ApiView(LoginRequiredMixin, View):
+    # Clase base de la API JSON (ver api.py): respuestas comprimidas con gzip si el cliente lo acepta,
+    # y errores en JSON en lugar de redirecciones o páginas HTML
+    def handle_no_permission(self):
+        return api.error_response("Hace falta iniciar sesión", status=401)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return api.error_response("No existe", status=404)
+        except api.ApiError as error:
+            return api.error_response(str(error), status=error.status)
+
+    def owned_project(self, pk):
+        # Solo el creador puede cambiar o borrar el proyecto
+        project = get_object_or_404(Project, pk=pk, id__in=accessible_project_ids(self.request.user))
+        if project.owner_id != self.request.user.id:
+            raise api.ApiError("Solo el creador puede cambiar el proyecto", status=403)
+        return project
+
+    def project_response(self, pk, status=200):
+        # El proyecto con los campos pedidos y sus usuarios
+        fields = api.sparse_fields(self.request.GET, 'projects', primary=True)
+        projects = Project.objects.filter(pk=pk, id__in=accessible_project_ids(self.request.user))
+        rows = api.project_rows(projects, fields)
+        if not rows:
+            raise Http404
+        users = api.referenced_users(rows, api.sparse_fields(self.request.GET, 'users'))
+        return api.response({'project': rows[0], 'users': users}, status=status)
+
+    def task_response(self, pk, status=200):
+        fields = api.sparse_fields(self.request.GET, 'tasks', primary=True)
+        tasks = Task.objects.filter(pk=pk, project_id__in=accessible_project_ids(self.request.user))
+        row = tasks.values(*fields).first()
+        if row is None:
+            raise Http404
+        return api.response({'task': row}, status=status)
+
+class ApiProjectListView(ApiView):
+    # Clase que lista los proyectos del usuario y en los que colabora, y crea proyectos nuevos
+    def get(self, request):
+        fields = api.sparse_fields(request.GET, 'projects', primary=True)
+        projects = Project.objects.filter(id__in=accessible_project_ids(request.user)).order_by('deadline', 'id')
+        rows = api.project_rows(projects, fields)
+        return api.response({'projects': rows, 'users': api.referenced_users(rows, api.sparse_fields(request.GET, 'users'))})
+
+    def post(self, request):
+        form = ProjectForm(api.read_body(request), user=request.user)
+        if not form.is_valid():
+            return api.error_response("Datos no válidos", errors=api.form_errors(form))
+        form.instance.owner = request.user
+        project = form.save()
+        return self.project_response(project.pk, status=201)
+
+class ApiProjectView(ApiView):
+    # Clase que lee, cambia (PATCH, solo los campos enviados) o borra un proyecto
+    def get(self, request, pk):
+        return self.project_response(pk)
+
+    def patch(self, request, pk):
+        project = self.owned_project(pk)
+        data = api.form_data(project, ProjectForm, api.read_body(request))
+        form = ProjectForm(data, instance=project, user=request.user)
+        if not form.is_valid():
+            return api.error_response("Datos no válidos", errors=api.form_errors(form))
+        form.save()
+        return self.project_response(pk)
+
+    def delete(self, request, pk):
+        # El borrado sigue en segundo plano, como desde la página del proyecto
+        job = deletion.schedule(self.owned_project(pk), request.user)
+        # El progreso se consulta por el id del proyecto, como desde la página del proyecto
+        url = reverse('project_deletion', args=[job.project_id])
+        return api.response({'deletion': {'project_id': job.project_id, 'url': url}}, status=202)
+
+class ApiProjectTasksView(ApiView):
+    # Clase que devuelve una página de tareas de un proyecto (con los mismos filtros y cursor que task_list)
+    # y crea tareas en él. El proyecto y los usuarios van una sola vez, no dentro de cada tarea
+    def get(self, request, pk):
+        params = request.GET
+        if pk not in accessible_project_ids(request.user):
+            raise Http404
+        fields = api.sparse_fields(params, 'tasks', primary=True)
+        project = api.project_rows(Project.objects.filter(pk=pk), api.sparse_fields(params, 'projects'))
+        if not project:
+            raise Http404
+
+        page_size = get_page_size(params)
+        tasks, _ = filter_tasks(Task.objects.filter(project_id=pk), params)
+        after = params.get('after', '')
+        if after.isdigit():
+            tasks = tasks.filter(id__gt=int(after))
+        rows = list(tasks.order_by('id').values(*fields)[:page_size + 1])
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_url = f"{request.path}?{_cursor_query(params, 'after', rows[-1]['id'])}"
+
+        users = api.referenced_users(project + rows, api.sparse_fields(params, 'users'))
+        return api.response({'project': project[0], 'users': users, 'tasks': rows, 'next': next_url})
+
+    def post(self, request, pk):
+        if pk not in accessible_project_ids(request.user):
+            raise Http404
+        form = TaskForm({**api.read_body(request), 'project': pk}, user=request.user)
+        if not form.is_valid():
+            return api.error_response("Datos no válidos", errors=api.form_errors(form))
+        task = form.save()
+        return self.task_response(task.pk, status=201)
+
+class ApiTaskView(ApiView):
+    # Clase que lee, cambia (PATCH, solo los campos enviados) o borra una tarea
+    def get_task(self, pk):
+        return get_object_or_404(Task, pk=pk, project_id__in=accessible_project_ids(self.request.user))
+
+    def get(self, request, pk):
+        return self.task_response(pk)
+
+    def patch(self, request, pk):
+        task = self.get_task(pk)
+        form = TaskForm(api.form_data(task, TaskForm, api.read_body(request)), instance=task, user=request.user)
+        if not form.is_valid():
+            return api.error_response("Datos no válidos", errors=api.form_errors(form))
+        form.save()
+        return self.task_response(pk)
+
+    def delete(self, request, pk):
+        self.get_task(pk).delete()
+        return HttpResponse(status=204)
+
+class ApiHistoryView(ApiView):
+    # Clase base del historial de cambios: de lo más reciente a lo más antiguo, por páginas con cursor
+    def history_page(self, entries):
+        params = self.request.GET
+        fields = api.sparse_fields(params, 'history', primary=True)
+        before = params.get('before', '')
+        if before.isdigit():
+            # Las entradas anteriores a la última vista por (fecha, id), en la misma consulta
+            timestamp = Subquery(TaskHistory.objects.filter(pk=int(before)).values('timestamp'))
+            entries = entries.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=int(before)))
+        page_size = settings.HISTORY_PAGE_SIZE
+        rows = list(entries.order_by('-timestamp', '-id').values(*fields)[:page_size + 1])
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_url = f"{self.request.path}?{_cursor_query(params, 'before', rows[-1]['id'])}"
+        users = api.referenced_users(rows, api.sparse_fields(params, 'users'))
+        return api.response({'history': rows, 'users': users, 'next': next_url})
+
+class ApiTaskHistoryView(ApiHistoryView):
+    # Clase que devuelve el historial de una tarea. El permiso se comprueba con el proyecto guardado en
+    # cada entrada, así que también sirve para las tareas ya borradas
+    def get(self, request, pk):
+        return self.history_page(TaskHistory.objects.filter(task_id=pk, project_id__in=accessible_project_ids(request.user)))
+
+class ApiProjectHistoryView(ApiHistoryView):
+    # Clase que devuelve el historial de un proyecto y de todas sus tareas
+    def get(self, request, pk):
+        if pk not in accessible_project_ids(request.user):
+            raise Http404
+        return self.history_page(TaskHistory.objects.filter(project_id=pk))
+
+class ReportsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    # Clase que muestra los informes de carga de trabajo y avance de toda la organización (solo para el staff).
+    # Solo lee el resumen de reports.py, no las tareas
+    template_name = "reports.html"
+    login_url = '/login/'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        limit = settings.REPORTS_ROWS
+        context = {
+            'totals': reports.totals(),
+            'users': reports.workload_by_user(limit),
+            'projects': reports.progress_by_project(limit),
+            'overdue': reports.overdue(timezone.localdate(), limit),
+        }
+        if wants_json(request):
+            return JsonResponse(context)
+        return render(request, self.template_name, context)
+
+class MetricsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    # Clase que muestra las métricas de la instrumentación (solo para el staff)
+    login_url = '/login/'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        data = metrics.snapshot()
+        pools = pool_stats()
+        if pools:
+            # Tamaño, conexiones en uso y esperas de los pools de conexiones
+            data['db_pools'] = pools
+        return JsonResponse(data)
 
 class AnonymousMixin(UserPassesTestMixin):
     # Clase que verifica que el usuario no ha iniciado sesión